@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+
+"""Benchmarks of the RTDE client library.
+
+Three groups are measured: micro (recipe parsing, packing and unpacking),
+loopback (receive, receive_buffered and send against a local mock server)
+and writer (record.py output throughput). Results are written as JSON so
+they can be compared between versions with --compare.
+"""
+
+import argparse
+import json
+import os
+import platform
+import struct
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.append("..")
+import rtde.rtde as rtde
+import rtde.rtde_config as rtde_config
+import rtde.serialize as serialize
+import rtde.csv_writer as csv_writer
+import rtde.csv_binary_writer as csv_binary_writer
+from rtde.mock_server import MockRTDEServer
+
+SMALL_RECIPE = ["timestamp"]
+MEDIUM_RECIPE = [
+    "timestamp",
+    "actual_q",
+    "actual_qd",
+    "actual_TCP_pose",
+    "actual_TCP_speed",
+    "robot_mode",
+    "safety_mode",
+    "runtime_state",
+    "speed_scaling",
+    "actual_digital_input_bits",
+]
+
+
+def get_recipes(config_file):
+    conf = rtde_config.ConfigFile(config_file)
+    names, types = conf.get_recipe("out")
+    type_of = dict(zip(names, types))
+    recipes = {}
+    for key, recipe in (("small", SMALL_RECIPE), ("medium", MEDIUM_RECIPE)):
+        recipes[key] = (recipe, [type_of[name] for name in recipe])
+    recipes["full"] = (names, types)
+    return recipes
+
+
+def make_config(names, types, recipe_id=1):
+    config = serialize.DataConfig.unpack_recipe(
+        bytes(bytearray([recipe_id])) + ",".join(types).encode("utf-8")
+    )
+    config.names = names
+    return config
+
+
+def make_payload(config):
+    values = []
+    for code in config.fmt[2:]:
+        if code == "d":
+            values.append(0.5)
+        elif code == "?":
+            values.append(True)
+        else:
+            values.append(1)
+    return struct.pack(config.fmt, config.id, *values)
+
+
+def make_state(config):
+    state = serialize.DataObject()
+    state.recipe_id = config.id
+    data = config.unpack(make_payload(config))
+    for name in config.names:
+        setattr(state, name, getattr(data, name))
+    return state
+
+
+def measure(func, repeat=5):
+    """Best time per call over repeat rounds of at least 0.2 seconds"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat, number)) / number
+    return {"usec_per_op": best * 1e6, "ops_per_sec": 1.0 / best}
+
+
+def bench_micro(recipes):
+    results = []
+    header = struct.pack(">HB", 3, rtde.Command.RTDE_DATA_PACKAGE)
+    result = measure(lambda: serialize.ControlHeader.unpack(header))
+    result.update(name="ControlHeader.unpack", group="micro", recipe=None)
+    results.append(result)
+    for key, (names, types) in recipes.items():
+        recipe = bytes(bytearray([1])) + ",".join(types).encode("utf-8")
+        config = make_config(names, types)
+        payload = make_payload(config)
+        state = make_state(config)
+        for name, func in (
+            (
+                "DataConfig.unpack_recipe",
+                lambda: serialize.DataConfig.unpack_recipe(recipe),
+            ),
+            ("DataConfig.unpack", lambda: config.unpack(payload)),
+            ("DataConfig.pack", lambda: config.pack(state)),
+        ):
+            result = measure(func)
+            result.update(name=name, group="micro", recipe=key)
+            results.append(result)
+    return results
+
+
+def bench_loopback(recipes, rate, duration):
+    results = []
+    names, types = recipes["full"]
+    with MockRTDEServer(rate=rate) as server:
+        for method in ("receive", "receive_buffered"):
+            con = rtde.RTDE("127.0.0.1", server.port)
+            con.connect()
+            con.negotiate_protocol_version()
+            con.send_output_setup(names, types, frequency=rate)
+            con.send_start()
+            receive = getattr(con, method)
+            count = 0
+            cpu = time.process_time()
+            start = time.perf_counter()
+            while time.perf_counter() - start < duration:
+                if receive() is not None:
+                    count += 1
+            elapsed = time.perf_counter() - start
+            cpu = time.process_time() - cpu
+            con.send_pause()
+            con.disconnect()
+            results.append(
+                {
+                    "name": "RTDE." + method,
+                    "group": "loopback",
+                    "recipe": "full",
+                    "rate": rate,
+                    "ops_per_sec": count / elapsed,
+                    "usec_per_op": elapsed / count * 1e6 if count else None,
+                    "cpu_usec_per_op": cpu / count * 1e6 if count else None,
+                    "skipped": con.stats.skipped_packages,
+                }
+            )
+
+        con = rtde.RTDE("127.0.0.1", server.port)
+        con.connect()
+        con.negotiate_protocol_version()
+        setp = con.send_input_setup(["input_double_register_0", "input_int_register_0"])
+        setp.input_double_register_0 = 0.5
+        setp.input_int_register_0 = 1
+        con.send_start()
+        result = measure(lambda: con.send(setp))
+        result.update(name="RTDE.send", group="loopback", recipe="inputs")
+        results.append(result)
+        con.send_pause()
+        con.disconnect()
+    return results
+
+
+def bench_writer(recipes, rows):
+    results = []
+    names, types = recipes["full"]
+    config = make_config(names, types)
+    state = config.unpack(make_payload(config))
+    # a binary record is the data package payload without the recipe id
+    binary = make_payload(config)[1:]
+    for key, mode in (("csv", "w"), ("binary", "wb")):
+        with tempfile.TemporaryFile(mode) as output:
+            if key == "csv":
+                writer = csv_writer.CSVWriter(output, names, types)
+                row = state
+            else:
+                writer = csv_binary_writer.CSVBinaryWriter(output, names, types)
+                row = binary
+            # the header is written once and not part of the throughput
+            writer.writeheader()
+            start = time.perf_counter()
+            for _ in range(rows):
+                writer.writerow(row)
+            output.flush()
+            elapsed = time.perf_counter() - start
+        results.append(
+            {
+                "name": "record." + key,
+                "group": "writer",
+                "recipe": "full",
+                "ops_per_sec": rows / elapsed,
+                "usec_per_op": elapsed / rows * 1e6,
+            }
+        )
+    return results
+
+
+def compare(results, baseline_file):
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    key = lambda r: (r["group"], r["name"], r["recipe"])
+    before = dict((key(r), r) for r in baseline["results"])
+    for result in results:
+        old = before.get(key(result))
+        if old is None or not old["ops_per_sec"]:
+            continue
+        ratio = result["ops_per_sec"] / old["ops_per_sec"]
+        sys.stderr.write(
+            "{:8} {:28} {:7} {:12.0f} ops/s {:6.2f}x\n".format(
+                result["group"],
+                result["name"],
+                str(result["recipe"]),
+                result["ops_per_sec"],
+                ratio,
+            )
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--groups",
+        default="micro,loopback,writer",
+        help="comma separated benchmark groups to run (micro,loopback,writer)",
+    )
+    parser.add_argument(
+        "--config",
+        default=os.path.join(os.path.dirname(__file__), "record_configuration.xml"),
+        help="data configuration file with the full recipe",
+    )
+    parser.add_argument(
+        "--rate", type=int, default=500, help="loopback data rate in Herz (500)"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=2.0, help="seconds per loopback benchmark"
+    )
+    parser.add_argument(
+        "--rows", type=int, default=20000, help="rows per writer benchmark"
+    )
+    parser.add_argument("--output", help="JSON file to write, stdout if omitted")
+    parser.add_argument("--compare", help="JSON results of a previous run")
+    args = parser.parse_args()
+
+    recipes = get_recipes(args.config)
+    groups = args.groups.split(",")
+    results = []
+    if "micro" in groups:
+        results += bench_micro(recipes)
+    if "loopback" in groups:
+        results += bench_loopback(recipes, args.rate, args.duration)
+    if "writer" in groups:
+        results += bench_writer(recipes, args.rows)
+
+    report = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
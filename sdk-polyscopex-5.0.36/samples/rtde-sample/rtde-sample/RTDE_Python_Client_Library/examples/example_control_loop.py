@@ -30,7 +30,6 @@ import logging
 import rtde.rtde as rtde
 import rtde.rtde_config as rtde_config
 
-
 # logging.basicConfig(level=logging.INFO)
 
 ROBOT_HOST = "localhost"
@@ -112,8 +111,8 @@ while keep_running:
         move_completed = True
         watchdog.input_int_register_0 = 0
 
-    # kick watchdog
-    con.send(watchdog)
+    # kick watchdog, an unchanged value is resent at least every 100 ms
+    con.send(watchdog, keepalive=0.1)
 
 con.send_pause()
 
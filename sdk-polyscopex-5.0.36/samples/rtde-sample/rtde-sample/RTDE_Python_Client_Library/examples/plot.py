@@ -30,7 +30,40 @@ import sys
 
 sys.path.append("..")
 
-import rtde.csv_reader as csv_reader
+import rtde.columnar as columnar
+import rtde.program_runs as program_runs
+
+# recorded fields shown by each plot type, robot and safety mode are always shown
+plot_columns = {
+    "q": ["target_q", "actual_q"],
+    "qd": ["target_qd", "actual_qd"],
+    "qdd": ["target_qdd"],
+    "i": ["target_current", "actual_current", "actual_current_window"],
+    "x": ["target_TCP_pose", "actual_TCP_pose"],
+    "xd": ["target_TCP_speed", "actual_TCP_speed"],
+    "joint": [
+        "target_q",
+        "actual_q",
+        "target_qd",
+        "actual_qd",
+        "target_qdd",
+        "target_current",
+        "actual_current",
+        "actual_current_window",
+        "joint_mode",
+        "joint_control_output",
+    ],
+}
+
+
+def get_plot_columns(plot_types):
+    columns = ["robot_mode", "safety_mode"]
+    for plot_type in plot_types:
+        key = "joint" if plot_type.isdigit() else plot_type
+        for column in plot_columns.get(key, []):
+            if column not in columns:
+                columns.append(column)
+    return columns
 
 
 class Plotter(object):
@@ -51,13 +84,27 @@ class Plotter(object):
         parser = argparse.ArgumentParser()
         parser.add_argument("type", help="plot type (x,xd,q,qd,qdd,i,0:5)", nargs="+")
         parser.add_argument(
-            "--file", default=["robot_data.csv"], help="data file", nargs="+"
+            "--file",
+            default=["robot_data.csv"],
+            help="data file, CSV, binary or columnar (" + columnar.EXTENSION + ")",
+            nargs="+",
         )
         parser.add_argument(
             "--filter",
             help="exclude data when no program is running",
             action="store_true",
         )
+        parser.add_argument(
+            "--start", type=float, help="plot from this timestamp in seconds"
+        )
+        parser.add_argument(
+            "--end", type=float, help="plot until this timestamp in seconds"
+        )
+        parser.add_argument(
+            "--cycle",
+            type=int,
+            help="plot only this program run, counting from 0, see rtde/program_runs.py",
+        )
 
         args = parser.parse_args()
 
@@ -109,7 +156,7 @@ class Plotter(object):
         plot_name = name
         cnt = 0
         for p in self.plot_data:
-            y = p.__dict__[name]
+            y = getattr(p, name)
             if len(self.plot_data) > 1:
                 plot_name = name + " " + p.get_name()
             plot_color = self.get_plot_color(style, cnt)
@@ -161,12 +208,12 @@ class Plotter(object):
                 self.addYtext(subplots, naming)
                 for i in range(6):
                     name = "target_current_" + str(i)
-                    target_current = self.plot_data[0].__dict__[name]
+                    target_current = getattr(self.plot_data[0], name)
                     self.makesubplot(subplots[i], name, "rx-")
                     name = "actual_current_" + str(i)
                     self.makesubplot(subplots[i], name, "b+-")
                     name = "actual_current_window_" + str(i)
-                    current_window = self.plot_data[0].__dict__[name]
+                    current_window = getattr(self.plot_data[0], name)
                     self.makesubplot_withdata(
                         subplots[i],
                         target_current + current_window,
@@ -266,12 +313,12 @@ class Plotter(object):
                 name = "target_qdd_" + str(idx)
                 self.makesubplot(subplots[2], name, "rx-", 40)
                 name = "target_current_" + str(idx)
-                target_current = self.plot_data[0].__dict__[name]
+                target_current = getattr(self.plot_data[0], name)
                 self.makesubplot(subplots[3], name, "rx-")
                 name = "actual_current_" + str(idx)
                 self.makesubplot(subplots[3], name, "b+-")
                 name = "actual_current_window_" + str(idx)
-                current_window = self.plot_data[0].__dict__[name]
+                current_window = getattr(self.plot_data[0], name)
                 self.makesubplot_withdata(
                     subplots[3], target_current + current_window, "current max", "--"
                 )
@@ -304,11 +351,19 @@ class Plotter(object):
 
     def get_plot_data(self, args):
         for file in args.file:
-            with open(file) as csvfile:
-                data = csv_reader.CSVReader(csvfile, filter_running_program=args.filter)
-                self.plot_samples, self.plot_data = self.fill_plot_data(
-                    data, self.plot_samples, self.plot_data
-                )
+            window = {"start": args.start, "end": args.end}
+            if args.cycle is not None:
+                run = program_runs.get_program_runs(file)[args.cycle]
+                window = {"rows": slice(run.start, run.end)}
+            data = program_runs.open_recording(
+                file,
+                get_plot_columns(args.type),
+                filter_running_program=args.filter,
+                **window
+            )
+            self.plot_samples, self.plot_data = self.fill_plot_data(
+                data, self.plot_samples, self.plot_data
+            )
 
 
 if __name__ == "__main__":
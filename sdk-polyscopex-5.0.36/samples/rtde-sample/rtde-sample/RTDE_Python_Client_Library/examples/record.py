@@ -31,6 +31,8 @@ import rtde.rtde as rtde
 import rtde.rtde_config as rtde_config
 import rtde.csv_writer as csv_writer
 import rtde.csv_binary_writer as csv_binary_writer
+import rtde.columnar as columnar
+import rtde.timestamp_index as timestamp_index
 
 # parameters
 parser = argparse.ArgumentParser()
@@ -60,9 +62,30 @@ parser.add_argument(
     help="Use buffered receive which doesn't skip data",
     action="store_true",
 )
+parser.add_argument(
+    "--buffer-policy",
+    choices=["drop_oldest", "drop_newest", "block", "spill_to_disk"],
+    help="what buffered receive does when --buffer-packets are held",
+)
+parser.add_argument(
+    "--buffer-packets",
+    type=int,
+    default=10000,
+    help="packages held by buffered receive under a buffer policy (10000)",
+)
 parser.add_argument(
     "--binary", help="save the data in binary format", action="store_true"
 )
+parser.add_argument(
+    "--columnar",
+    help="save the data in the compressed columnar format, see rtde/columnar.py",
+    action="store_true",
+)
+parser.add_argument(
+    "--reconnect",
+    help="reconnect and resume recording when the connection is lost",
+    action="store_true",
+)
 args = parser.parse_args()
 
 if args.verbose:
@@ -71,7 +94,9 @@ if args.verbose:
 conf = rtde_config.ConfigFile(args.config)
 output_names, output_types = conf.get_recipe("out")
 
-con = rtde.RTDE(args.host, args.port)
+con = rtde.RTDE(args.host, args.port, auto_reconnect=args.reconnect)
+if args.buffer_policy:
+    con.set_buffer_policy(args.buffer_policy, args.buffer_packets)
 con.connect()
 
 # get controller version
@@ -87,14 +112,21 @@ if not con.send_start():
     logging.error("Unable to start synchronization")
     sys.exit()
 
-writeModes = "wb" if args.binary else "w"
+writeModes = "wb" if args.binary or args.columnar else "w"
 with open(args.output, writeModes) as csvfile:
     writer = None
+    indexer = None
 
     if args.binary:
-        writer = csv_binary_writer.CSVBinaryWriter(csvfile, output_names, output_types)
+        writer = csv_binary_writer.CSVBinaryWriter(
+            csvfile, output_names, output_types, args.frequency
+        )
+    elif args.columnar:
+        writer = columnar.ColumnarWriter(csvfile, output_names, output_types)
     else:
         writer = csv_writer.CSVWriter(csvfile, output_names, output_types)
+        if timestamp_index.timestamp in output_names:
+            indexer = timestamp_index.TimestampIndexer(csvfile)
 
     writer.writeheader()
 
@@ -119,17 +151,38 @@ with open(args.output, writeModes) as csvfile:
             else:
                 state = con.receive(args.binary)
             if state is not None:
+                if indexer is not None:
+                    indexer.update(state.timestamp)
                 writer.writerow(state)
                 i += 1
 
         except KeyboardInterrupt:
             keep_running = False
         except rtde.RTDEException:
+            if args.columnar:
+                writer.close()
             con.disconnect()
             sys.exit()
 
+    if args.columnar:
+        # writes the footer index, the file is unreadable without it
+        writer.close()
+
+if indexer is not None:
+    # lets readers seek to a time window, see rtde/timestamp_index.py
+    indexer.save(args.output)
 
 sys.stdout.write("\rComplete!            \n")
+if con.stats.reconnects:
+    logging.warning(
+        "Reconnected %d times, %d samples missed",
+        con.stats.reconnects,
+        con.stats.missed_packages,
+    )
+if con.stats.dropped_packages:
+    logging.warning(
+        "%d samples dropped by the buffer policy", con.stats.dropped_packages
+    )
 
 con.send_pause()
 con.disconnect()
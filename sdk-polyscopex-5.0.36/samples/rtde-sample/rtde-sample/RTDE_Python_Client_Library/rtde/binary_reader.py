@@ -0,0 +1,120 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import json
+
+import numpy as np
+
+from rtde import csv_binary_writer
+from rtde import fields
+from rtde import timestamp_index
+from rtde.fields import runtime_state, runtime_state_running, timestamp
+
+
+def is_binary_recording(filename):
+    with open(filename, "rb") as f:
+        return f.read(len(csv_binary_writer.MAGIC)) == csv_binary_writer.MAGIC
+
+
+class BinaryReader(object):
+    """Maps a binary recording, see csv_binary_writer, into memory.
+
+    records is a read-only structured array backed by the file, one field
+    per output variable, so opening does not read the data. Columns are
+    also exposed like csv_reader.CSVReader, one float array attribute per
+    column with vector fields split into name_0 to name_5.
+
+    start and end restrict records to start <= timestamp <= end, found
+    through a sparse timestamp index, see timestamp_index. rows instead
+    selects records by position, a slice.
+    """
+
+    def __init__(
+        self, filename, filter_running_program=False, start=None, end=None, rows=None
+    ):
+        self.__filename = filename
+        with open(filename, "rb") as f:
+            magic = f.read(len(csv_binary_writer.MAGIC))
+            if magic != csv_binary_writer.MAGIC:
+                raise ValueError("Not a binary RTDE recording: " + filename)
+            (size,) = csv_binary_writer._SIZE32.unpack(
+                f.read(csv_binary_writer._SIZE32.size)
+            )
+            header = json.loads(f.read(size).decode("utf-8"))
+            offset = f.tell()
+            f.seek(0, 2)
+            file_size = f.tell()
+        self.names = header["names"]
+        self.types = header["types"]
+        self.fmt = header["fmt"]
+        self.frequency = header["frequency"]
+        config = csv_binary_writer.get_record_config(self.names, self.types)
+        dtype = config.get_dtype()
+        if dtype.itemsize != header["record_size"]:
+            raise ValueError("Record size mismatch in " + filename)
+        # a record cut short by an interrupted recording is ignored
+        count = (file_size - offset) // dtype.itemsize
+        if count:
+            self.records = np.memmap(
+                filename, dtype=dtype, mode="r", offset=offset, shape=(count,)
+            )
+        else:
+            self.records = np.empty(0, dtype)
+        if rows is not None:
+            if start is not None or end is not None:
+                raise ValueError("Select samples by rows or by start and end")
+            self.records = self.records[rows]
+            count = len(self.records)
+        elif start is not None or end is not None:
+            if timestamp not in self.names:
+                raise ValueError("No timestamp field to select a window by")
+            index = timestamp_index.get_binary_index(filename, self.records)
+            self.records = self.records[
+                timestamp_index.find_records(self.records, start, end, index)
+            ]
+            count = len(self.records)
+        self.__mask = None
+        if filter_running_program:
+            if runtime_state not in self.names:
+                raise ValueError(
+                    "Unable to filter data since runtime_state field is missing"
+                )
+            self.__mask = self.records[runtime_state] == runtime_state_running
+        self.__samples = count
+        if self.__mask is not None:
+            self.__samples = int(self.__mask.sum())
+
+    def get_samples(self):
+        return self.__samples
+
+    def get_name(self):
+        return self.__filename
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        values = fields.read_column(
+            self.names, name, self.records.__getitem__, self.__mask
+        )
+        self.__dict__[name] = values
+        return values
@@ -0,0 +1,166 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import collections
+
+# Residuals larger than this, in seconds, mean a clock jumped or restarted
+# and the model starts over.
+RESET_THRESHOLD = 1.0
+
+
+class ClockModel(object):
+    """Online model of host time as a linear function of controller time.
+
+    host_time = timestamp + offset + drift * (timestamp - origin)
+
+    offset and drift are estimated by recursive least squares over pairs of
+    controller timestamps and host receive times, forgetting samples older
+    than about window seconds. Receive times are only ever late, by network
+    and scheduling delay or because packages were read together, so samples
+    later than the model by more than outlier_factor times the typical
+    residual are rejected. The estimate therefore follows the fastest
+    deliveries and includes the minimum transport latency.
+
+    With a frequency configured, timestamp increments larger than one
+    period are counted as gaps. Packages the client skipped or dropped on
+    purpose are reported with skip() and not counted as missing.
+    """
+
+    def __init__(
+        self,
+        frequency=None,
+        window=60.0,
+        outlier_factor=4.0,
+        min_scale=0.0002,
+        max_gaps=1000,
+    ):
+        self.window = window
+        self.outlier_factor = outlier_factor
+        self.min_scale = min_scale
+        self.gaps = collections.deque(maxlen=max_gaps)
+        self.configure(frequency)
+        self.reset()
+
+    def configure(self, frequency):
+        """Set the output frequency of the recipe"""
+        self.frequency = frequency
+        self.period = 1.0 / frequency if frequency else None
+        self.__forgetting = 1.0 - 1.0 / (self.window * (frequency or 125))
+
+    def reset(self):
+        self.origin = None
+        self.offset = 0.0
+        self.drift = 0.0
+        self.scale = None
+        self.samples = 0
+        self.rejected_samples = 0
+        self.resets = 0
+        self.gap_count = 0
+        self.missed_packages = 0
+        self.gaps.clear()
+        self.__p = None
+        self.__last_timestamp = None
+        self.__skipped = 0
+
+    def host_time(self, timestamp):
+        """Host time estimate of a controller timestamp, None before any sample"""
+        if self.origin is None:
+            return None
+        return timestamp + self.offset + self.drift * (timestamp - self.origin)
+
+    def skip(self, count=1):
+        """count packages were received but not passed to update()"""
+        self.__skipped += count
+
+    def update(self, timestamp, host_time):
+        """Add a controller timestamp and the host time it was received at.
+        Returns the host time estimate of timestamp.
+        """
+        self.__check_gap(timestamp)
+        if self.origin is None:
+            self.__start(timestamp, host_time)
+            return host_time
+
+        x = timestamp - self.origin
+        residual = host_time - self.host_time(timestamp)
+        if abs(residual) > RESET_THRESHOLD:
+            self.resets += 1
+            self.__start(timestamp, host_time)
+            return host_time
+        if residual > self.outlier_factor * self.scale:
+            self.rejected_samples += 1
+            return self.host_time(timestamp)
+
+        # recursive least squares on (1, x) with exponential forgetting
+        lam = self.__forgetting
+        p00, p01, p11 = self.__p
+        k0 = p00 + p01 * x
+        k1 = p01 + p11 * x
+        denominator = lam + k0 + k1 * x
+        k0 /= denominator
+        k1 /= denominator
+        self.offset += k0 * residual
+        self.drift += k1 * residual
+        self.__p = (
+            (p00 - k0 * (p00 + p01 * x)) / lam,
+            (p01 - k0 * (p01 + p11 * x)) / lam,
+            (p11 - k1 * (p01 + p11 * x)) / lam,
+        )
+        self.scale = max(self.min_scale, 0.99 * self.scale + 0.01 * abs(residual))
+        self.samples += 1
+        return self.host_time(timestamp)
+
+    def __start(self, timestamp, host_time):
+        self.origin = timestamp
+        self.offset = host_time - timestamp
+        self.drift = 0.0
+        self.scale = self.min_scale * self.outlier_factor
+        self.__p = (1.0, 0.0, 1.0)
+        self.samples += 1
+
+    def __check_gap(self, timestamp):
+        last = self.__last_timestamp
+        skipped = self.__skipped
+        self.__last_timestamp = timestamp
+        self.__skipped = 0
+        if last is None or self.period is None or timestamp <= last:
+            return
+        missed = int(round((timestamp - last) / self.period)) - 1 - skipped
+        if missed > 0:
+            self.gap_count += 1
+            self.missed_packages += missed
+            self.gaps.append((last, missed))
+
+    def summary(self):
+        """The model state as a dictionary"""
+        return {
+            "frequency": self.frequency,
+            "offset": self.offset,
+            "drift": self.drift,
+            "scale": self.scale,
+            "samples": self.samples,
+            "rejected_samples": self.rejected_samples,
+            "resets": self.resets,
+            "gap_count": self.gap_count,
+            "missed_packages": self.missed_packages,
+        }
@@ -0,0 +1,297 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Columnar recording format, written in row groups with a footer index.
+
+A file consists of
+
+    magic b"RTDECOL1"
+    uint32 header size, header: UTF-8 JSON object with
+        "names", "types": the output recipe
+        "columns": per field the NumPy dtype string and shape of one value
+        "compression": "zlib" or "none"
+    row groups, one after another
+    footer: UTF-8 JSON object with "row_groups", a list of objects with
+        "offset": file offset of the row group
+        "rows": number of rows
+        "columns": [offset, size] of each column chunk, relative to the
+            row group, in field order
+        "min_timestamp", "max_timestamp": range of the timestamp field,
+            null if the recipe has no timestamp
+    uint64 footer size
+    magic b"RTDECOL1"
+
+All integers are little-endian. A column chunk holds the values of one
+field for the rows of the group as a C-ordered array of the column dtype,
+compressed with zlib unless compression is "none". The file is readable
+with NumPy alone: read the footer from the end, then np.frombuffer each
+decompressed chunk.
+"""
+
+import json
+import struct
+import zlib
+
+import numpy as np
+
+from rtde import fields
+from rtde import serialize
+from rtde.fields import runtime_state, runtime_state_running, timestamp
+
+MAGIC = b"RTDECOL1"
+EXTENSION = ".rtdc"
+DEFAULT_ROWS_PER_GROUP = 8192
+_SIZE32 = struct.Struct("<I")
+_SIZE64 = struct.Struct("<Q")
+
+
+def get_column_type(data_type):
+    """Little-endian NumPy dtype string and shape of one value of data_type"""
+    np_type, shape = serialize.get_numpy_type(data_type)
+    return np.dtype(np_type).newbyteorder("<").str, shape
+
+
+class ColumnarWriter(object):
+    """Writes data objects column by column, with the writeheader and
+    writerow contract of csv_writer.CSVWriter. The file must be opened in
+    binary mode; close() writes the last row group and the footer.
+    """
+
+    def __init__(
+        self,
+        file,
+        names,
+        types,
+        rows_per_group=DEFAULT_ROWS_PER_GROUP,
+        compression="zlib",
+    ):
+        if len(names) != len(types):
+            raise ValueError("List sizes are not identical.")
+        if compression not in ("zlib", "none"):
+            raise ValueError("Unknown compression: " + str(compression))
+        self.__file = file
+        self.__names = list(names)
+        self.__types = list(types)
+        self.__rows_per_group = rows_per_group
+        self.__compression = compression
+        self.__columns = []
+        self.__buffers = []
+        for data_type in self.__types:
+            dtype, shape = get_column_type(data_type)
+            self.__columns.append({"dtype": dtype, "shape": list(shape)})
+            self.__buffers.append(np.zeros((rows_per_group,) + shape, dtype=dtype))
+        self.__timestamp = None
+        if timestamp in self.__names:
+            self.__timestamp = self.__buffers[self.__names.index(timestamp)]
+        self.__row = 0
+        self.__row_groups = []
+        self.__offset = 0
+        self.__closed = False
+
+    def writeheader(self):
+        header = json.dumps(
+            {
+                "names": self.__names,
+                "types": self.__types,
+                "columns": self.__columns,
+                "compression": self.__compression,
+            }
+        ).encode("utf-8")
+        self.__write(MAGIC + _SIZE32.pack(len(header)) + header)
+
+    def writerow(self, data_object):
+        row = self.__row
+        for name, buffer in zip(self.__names, self.__buffers):
+            buffer[row] = getattr(data_object, name)
+        self.__row = row + 1
+        if self.__row == self.__rows_per_group:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered rows as a row group"""
+        rows = self.__row
+        if rows == 0:
+            return
+        group = {"offset": self.__offset, "rows": rows, "columns": []}
+        position = 0
+        chunks = []
+        for buffer in self.__buffers:
+            chunk = buffer[:rows].tobytes()
+            if self.__compression == "zlib":
+                chunk = zlib.compress(chunk, 1)
+            group["columns"].append([position, len(chunk)])
+            position += len(chunk)
+            chunks.append(chunk)
+        if self.__timestamp is not None:
+            group["min_timestamp"] = float(self.__timestamp[:rows].min())
+            group["max_timestamp"] = float(self.__timestamp[:rows].max())
+        else:
+            group["min_timestamp"] = group["max_timestamp"] = None
+        self.__write(b"".join(chunks))
+        self.__row_groups.append(group)
+        self.__row = 0
+
+    def close(self):
+        """Write the remaining rows and the footer, the file is left open"""
+        if self.__closed:
+            return
+        self.flush()
+        footer = json.dumps({"row_groups": self.__row_groups}).encode("utf-8")
+        self.__write(footer + _SIZE64.pack(len(footer)) + MAGIC)
+        self.__file.flush()
+        self.__closed = True
+
+    def __write(self, data):
+        self.__file.write(data)
+        self.__offset += len(data)
+
+
+class ColumnarReader(object):
+    """Reads a columnar recording.
+
+    Columns are exposed like csv_reader.CSVReader, one attribute per
+    column with vector fields split into name_0 to name_5, and are read
+    from the file on first access.
+
+    start and end restrict rows to start <= timestamp <= end. Only the row
+    groups whose timestamp range in the footer overlaps are read, their
+    timestamps need not be monotonic. rows instead selects rows by
+    position, a slice, reading only the row groups it covers.
+    """
+
+    def __init__(
+        self, filename, filter_running_program=False, start=None, end=None, rows=None
+    ):
+        self.__filename = filename
+        with open(filename, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("Not a columnar RTDE recording: " + filename)
+            (size,) = _SIZE32.unpack(f.read(_SIZE32.size))
+            header = json.loads(f.read(size).decode("utf-8"))
+            f.seek(-(_SIZE64.size + len(MAGIC)), 2)
+            (size,) = _SIZE64.unpack(f.read(_SIZE64.size))
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("Recording was not closed: " + filename)
+            f.seek(-(size + _SIZE64.size + len(MAGIC)), 2)
+            footer = json.loads(f.read(size).decode("utf-8"))
+        self.names = header["names"]
+        self.types = header["types"]
+        self.__columns = header["columns"]
+        self.__compression = header["compression"]
+        self.row_groups = footer["row_groups"]
+        self.__groups = self.row_groups
+        self.__rows = slice(None)
+        if rows is not None:
+            if start is not None or end is not None:
+                raise ValueError("Select samples by rows or by start and end")
+            self.__select_rows(rows)
+        elif start is not None or end is not None:
+            self.__select(start, end)
+        self.__mask = None
+        if filter_running_program:
+            if runtime_state not in self.names:
+                raise ValueError(
+                    "Unable to filter data since runtime_state field is missing"
+                )
+            state = self.read_field(runtime_state, self.__groups)[self.__rows]
+            self.__mask = state == runtime_state_running
+        rows = sum(group["rows"] for group in self.__groups)
+        if isinstance(self.__rows, slice):
+            self.__samples = len(range(rows)[self.__rows])
+        else:
+            self.__samples = int(self.__rows.sum())
+        if self.__mask is not None:
+            self.__samples = int(self.__mask.sum())
+
+    def __select_rows(self, rows):
+        first = rows.start or 0
+        stop = rows.stop
+        self.__groups = []
+        base = offset = 0
+        for group in self.row_groups:
+            if offset + group["rows"] > first and (stop is None or offset < stop):
+                if not self.__groups:
+                    base = offset
+                self.__groups.append(group)
+            offset += group["rows"]
+        self.__rows = slice(first - base, None if stop is None else stop - base)
+
+    def __select(self, start, end):
+        if timestamp not in self.names:
+            raise ValueError("No timestamp field to select a window by")
+        self.__groups = [
+            group
+            for group in self.row_groups
+            if (start is None or group["max_timestamp"] >= start)
+            and (end is None or group["min_timestamp"] <= end)
+        ]
+        times = self.read_field(timestamp, self.__groups)
+        if not np.all(np.diff(times) >= 0):
+            # timestamps start over, e.g. after a controller restart
+            rows = np.ones(len(times), dtype=bool)
+            if start is not None:
+                rows &= times >= start
+            if end is not None:
+                rows &= times <= end
+            self.__rows = rows
+            return
+        lo = 0 if start is None else int(np.searchsorted(times, start, "left"))
+        hi = len(times) if end is None else int(np.searchsorted(times, end, "right"))
+        self.__rows = slice(lo, max(lo, hi))
+
+    def get_samples(self):
+        return self.__samples
+
+    def get_name(self):
+        return self.__filename
+
+    def read_field(self, name, groups=None):
+        """Values of a field as one array, from all or the given row groups"""
+        index = self.names.index(name)
+        column = self.__columns[index]
+        dtype = np.dtype(column["dtype"])
+        shape = tuple(column["shape"])
+        if groups is None:
+            groups = self.row_groups
+        parts = []
+        with open(self.__filename, "rb") as f:
+            for group in groups:
+                offset, size = group["columns"][index]
+                f.seek(group["offset"] + offset)
+                chunk = f.read(size)
+                if self.__compression == "zlib":
+                    chunk = zlib.decompress(chunk)
+                parts.append(np.frombuffer(chunk, dtype).reshape((-1,) + shape))
+        if not parts:
+            return np.empty((0,) + shape, dtype)
+        return np.concatenate(parts)
+
+    def __read(self, field):
+        return self.read_field(field, self.__groups)[self.__rows]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        values = fields.read_column(self.names, name, self.__read, self.__mask)
+        self.__dict__[name] = values
+        return values
@@ -0,0 +1,179 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import collections
+import logging
+import time
+
+from rtde import rtde
+from rtde.rtde import RTDEException
+
+_log = logging.getLogger(rtde.LOGNAME)
+
+# What ControlLoop sends when the callback finishes after the deadline
+SEND_LATE = "send_late"  # send the inputs anyway
+SKIP = "skip"  # send nothing this cycle, the controller keeps the last inputs
+STOP = "stop"  # send the safe inputs, if any, and stop the loop
+
+DEFAULT_WATCHDOG_INTERVAL = 0.1
+DEFAULT_HISTORY = 10000
+
+
+class ControlLoopOverrun(RTDEException):
+    def __init__(self, msg):
+        super(ControlLoopOverrun, self).__init__(msg)
+
+
+class ControlLoop(object):
+    """Runs a control callback for every data package of a started connection.
+
+    callback(state) is called with the newest data package and returns the
+    input objects to send, a single one, a list or None. The cycle time is
+    measured from the return of receive() until the inputs are sent and
+    compared with deadline, by default the period of the output frequency.
+
+    overrun_policy decides what happens to the inputs of a cycle that missed
+    its deadline: SEND_LATE, SKIP, STOP, or a callable
+    policy(loop, state, inputs, cycle_time) returning the inputs to send.
+
+    If watchdog is given it is sent every watchdog_interval seconds after
+    the inputs of a cycle, outside the measured cycle time. The kick stops
+    when the callback hangs, so the controller's watchdog still trips.
+    """
+
+    def __init__(
+        self,
+        con,
+        callback,
+        deadline=None,
+        watchdog=None,
+        watchdog_interval=DEFAULT_WATCHDOG_INTERVAL,
+        overrun_policy=SEND_LATE,
+        safe_inputs=None,
+        history=DEFAULT_HISTORY,
+    ):
+        self.con = con
+        self.callback = callback
+        self.deadline = deadline
+        self.watchdog = watchdog
+        self.watchdog_interval = watchdog_interval
+        self.overrun_policy = overrun_policy
+        self.safe_inputs = safe_inputs
+        self.cycle_times = collections.deque(maxlen=history)
+        self.reset()
+        self.__running = False
+
+    def reset(self):
+        self.cycles = 0
+        self.overruns = 0
+        self.worst_cycle_time = 0.0
+        self.cycle_times.clear()
+
+    def stop(self):
+        """Stop after the current cycle"""
+        self.__running = False
+
+    def run(self, cycles=None):
+        """Run until stop() is called, cycles cycles were run or the
+        connection stops delivering data. STOP raises ControlLoopOverrun.
+        """
+        deadline = self.deadline
+        if deadline is None:
+            frequency = self.con.output_frequency
+            deadline = 1.0 / frequency if frequency else None
+        last_kick = 0.0
+        self.__running = True
+        while self.__running and (cycles is None or self.cycles < cycles):
+            state = self.con.receive()
+            if state is None:
+                break
+            start = time.perf_counter()
+            inputs = self.callback(state)
+            cycle_time = time.perf_counter() - start
+            if deadline is not None and cycle_time > deadline:
+                self.overruns += 1
+                inputs = self.__on_overrun(state, inputs, cycle_time)
+            self.__send(inputs)
+            cycle_time = time.perf_counter() - start
+            self.__record(cycle_time)
+
+            if self.watchdog is not None:
+                now = time.perf_counter()
+                if now - last_kick >= self.watchdog_interval:
+                    self.con.send(self.watchdog)
+                    last_kick = now
+
+    def __on_overrun(self, state, inputs, cycle_time):
+        policy = self.overrun_policy
+        if policy == SEND_LATE:
+            return inputs
+        if policy == SKIP:
+            return None
+        if policy == STOP:
+            self.__send(self.safe_inputs)
+            self.__running = False
+            raise ControlLoopOverrun(
+                "Cycle %d took %.6f s, deadline exceeded" % (self.cycles, cycle_time)
+            )
+        return policy(self, state, inputs, cycle_time)
+
+    def __send(self, inputs):
+        if inputs is None:
+            return
+        if isinstance(inputs, (list, tuple)):
+            if len(inputs) == 1:
+                self.con.send(inputs[0])
+            elif inputs:
+                self.con.send_batch(inputs)
+            return
+        self.con.send(inputs)
+
+    def __record(self, cycle_time):
+        self.cycles += 1
+        self.cycle_times.append(cycle_time)
+        if cycle_time > self.worst_cycle_time:
+            self.worst_cycle_time = cycle_time
+
+    def percentile(self, percent):
+        """Cycle time below which percent of the recent cycles finished"""
+        if not self.cycle_times:
+            return None
+        times = sorted(self.cycle_times)
+        index = min(len(times) - 1, int(len(times) * percent / 100.0))
+        return times[index]
+
+    def summary(self):
+        """Cycle statistics as a dictionary, percentiles of recent cycles"""
+        mean = None
+        if self.cycle_times:
+            mean = sum(self.cycle_times) / len(self.cycle_times)
+        return {
+            "cycles": self.cycles,
+            "overruns": self.overruns,
+            "skipped_packages": self.con.skipped_package_count,
+            "worst_cycle_time": self.worst_cycle_time,
+            "mean_cycle_time": mean,
+            "p50_cycle_time": self.percentile(50),
+            "p99_cycle_time": self.percentile(99),
+            "p99.9_cycle_time": self.percentile(99.9),
+        }
@@ -21,173 +21,81 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-import sys
+"""Fixed-width binary recording format.
 
-sys.path.append("..")
+A file consists of
 
-import struct
-from rtde import serialize
+    magic b"RTDEBIN1"
+    uint32 header size, little-endian
+    header: UTF-8 JSON object, padded with spaces so records start at a
+        multiple of 64 bytes, with
+        "names", "types": the output recipe
+        "fmt": struct format of a data package, starting with the recipe id
+        "frequency": output frequency in Hz, null if unknown
+        "record_size": bytes per record
+    records, one per data package
 
+A record is the data package payload without the recipe id: the fields in
+recipe order, big-endian, exactly as sent by the controller. The records
+can be mapped as a NumPy structured array, see binary_reader.
+"""
 
-class CSVBinaryWriter(object):
-    def __init__(self, file, names, types, delimiter=" "):
-        if len(names) != len(types):
-            raise ValueError("List sizes are not identical.")
-        self.__file = file
-        self.__names = names
-        self.__types = types
-        self.__delimiter = delimiter
-        self.__header_names = []
-        self.__columns = 0
-        for i in range(len(self.__names)):
-            size = serialize.get_item_size(self.__types[i])
-            self.__columns += size
-            if size > 1:
-                for j in range(size):
-                    name = self.__names[i] + "_" + str(j)
-                    self.__header_names.append(name)
-            else:
-                name = self.__names[i]
-                self.__header_names.append(name)
+import json
+import struct
 
-    def getType(self, vtype):
-        if vtype == "VECTOR3D":
-            return "DOUBLE" + self.__delimiter + "DOUBLE" + self.__delimiter + "DOUBLE"
-        elif vtype == "VECTOR6D":
-            return (
-                "DOUBLE"
-                + self.__delimiter
-                + "DOUBLE"
-                + self.__delimiter
-                + "DOUBLE"
-                + self.__delimiter
-                + "DOUBLE"
-                + self.__delimiter
-                + "DOUBLE"
-                + self.__delimiter
-                + "DOUBLE"
-            )
-        elif vtype == "VECTOR6INT32":
-            return (
-                "INT32"
-                + self.__delimiter
-                + "INT32"
-                + self.__delimiter
-                + "INT32"
-                + self.__delimiter
-                + "INT32"
-                + self.__delimiter
-                + "INT32"
-                + self.__delimiter
-                + "INT32"
-            )
-        elif vtype == "VECTOR6UINT32":
-            return (
-                "UINT32"
-                + self.__delimiter
-                + "UINT32"
-                + self.__delimiter
-                + "UINT32"
-                + self.__delimiter
-                + "UINT32"
-                + self.__delimiter
-                + "UINT32"
-                + self.__delimiter
-                + "UINT32"
-            )
-        else:
-            return str(vtype)
+from rtde import serialize
 
-    def writeheader(self):
-        # Header names
-        headerStr = str("")
-        for i in range(len(self.__header_names)):
-            if i != 0:
-                headerStr += self.__delimiter
+MAGIC = b"RTDEBIN1"
+_SIZE32 = struct.Struct("<I")
+ALIGNMENT = 64
 
-            headerStr += self.__header_names[i]
 
-        headerStr += "\n"
-        self.__file.write(struct.pack(str(len(headerStr)) + "s", headerStr))
+def get_record_config(names, types):
+    """DataConfig of the recipe, for packing and for the record dtype"""
+    config = serialize.DataConfig.unpack_recipe(
+        b"\x00" + ",".join(types).encode("utf-8")
+    )
+    config.names = list(names)
+    return config
 
-        # Header types
-        typeStr = str("")
-        for i in range(len(self.__names)):
-            if i != 0:
-                typeStr += self.__delimiter
 
-            typeStr += self.getType(self.__types[i])
+class CSVBinaryWriter(object):
+    """Writes data packages as fixed-width binary records.
+    writerow takes the bytes of a binary receive or a data object. The file
+    must be opened in binary mode.
+    """
 
-        typeStr += "\n"
-        self.__file.write(struct.pack(str(len(typeStr)) + "s", typeStr))
+    def __init__(self, file, names, types, frequency=None):
+        if len(names) != len(types):
+            raise ValueError("List sizes are not identical.")
+        self.__file = file
+        self.__names = list(names)
+        self.__types = list(types)
+        self.__frequency = frequency
+        self.__config = get_record_config(names, types)
+        self.__record_size = struct.calcsize(self.__config.fmt) - 1
 
-    def packToBinary(self, vtype, value):
-        print(vtype)
-        if vtype == "BOOL":
-            print("isBOOL" + str(value))
-        if vtype == "UINT8":
-            print("isUINT8" + str(value))
-        elif vtype == "INT32":
-            print("isINT32" + str(value))
-        elif vtype == "INT64":
-            print("isINT64" + str(value))
-        elif vtype == "UINT32":
-            print("isUINT32" + str(value))
-        elif vtype == "UINT64":
-            print("isUINT64" + str(value))
-        elif vtype == "DOUBLE":
-            print(
-                "isDOUBLE" + str(value) + str(type(value)) + str(sys.getsizeof(value))
-            )
-        elif vtype == "VECTOR3D":
-            print(
-                "isVECTOR3D" + str(value[0]) + "," + str(value[1]) + "," + str(value[2])
-            )
-        elif vtype == "VECTOR6D":
-            print(
-                "isVECTOR6D"
-                + str(value[0])
-                + ","
-                + str(value[1])
-                + ","
-                + str(value[2])
-                + ","
-                + str(value[3])
-                + ","
-                + str(value[4])
-                + ","
-                + str(value[5])
-            )
-        elif vtype == "VECTOR6INT32":
-            print(
-                "isVECTOR6INT32"
-                + str(value[0])
-                + ","
-                + str(value[1])
-                + ","
-                + str(value[2])
-                + ","
-                + str(value[3])
-                + ","
-                + str(value[4])
-                + ","
-                + str(value[5])
-            )
-        elif vtype == "VECTOR6UINT32":
-            print(
-                "isVECTOR6UINT32"
-                + str(value[0])
-                + ","
-                + str(value[1])
-                + ","
-                + str(value[2])
-                + ","
-                + str(value[3])
-                + ","
-                + str(value[4])
-                + ","
-                + str(value[5])
-            )
+    def writeheader(self):
+        header = json.dumps(
+            {
+                "names": self.__names,
+                "types": self.__types,
+                "fmt": self.__config.fmt,
+                "frequency": self.__frequency,
+                "record_size": self.__record_size,
+            }
+        ).encode("utf-8")
+        size = len(MAGIC) + _SIZE32.size + len(header)
+        header += b" " * (-size % ALIGNMENT)
+        self.__file.write(MAGIC + _SIZE32.pack(len(header)) + header)
 
     def writerow(self, data_object):
-        self.__file.write(data_object)
+        if isinstance(data_object, (bytes, bytearray, memoryview)):
+            if len(data_object) != self.__record_size:
+                raise ValueError(
+                    "Record size mismatch: %d instead of %d bytes"
+                    % (len(data_object), self.__record_size)
+                )
+            self.__file.write(data_object)
+        else:
+            self.__file.write(self.__config.pack(data_object)[1:])
@@ -22,68 +22,308 @@
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import csv
+import hashlib
+import itertools
+import json
+import os
+import shutil
 import numpy as np
 import logging
 
 from .rtde import LOGNAME
+from . import timestamp_index
+from .fields import runtime_state, runtime_state_running, timestamp
 
 _log = logging.getLogger(LOGNAME)
 
+DEFAULT_CHUNK_ROWS = 10000
 
-runtime_state = "runtime_state"
-runtime_state_running = "2"
+CACHE_EXTENSION = ".cache"
+_CACHE_META = "meta.json"
+
+
+def get_projection(header, columns):
+    """Indices of the header columns to read. A vector field name selects
+    all its columns, e.g. actual_q selects actual_q_0 to actual_q_5.
+    """
+    if columns is None:
+        return list(range(len(header)))
+    indices = []
+    for column in columns:
+        if column in header:
+            matches = [header.index(column)]
+        else:
+            prefix = column + "_"
+            matches = [
+                i
+                for i, name in enumerate(header)
+                if name.startswith(prefix) and name[len(prefix) :].isdigit()
+            ]
+        if not matches:
+            _log.warning("Column " + column + " not found in data set")
+        for i in matches:
+            if i not in indices:
+                indices.append(i)
+    return sorted(indices)
+
+
+class ColumnCache(object):
+    """Sidecar directory next to a recording holding one .npy file per
+    parsed column, unfiltered. meta.json stores the key the columns were
+    parsed under, file size, mtime and a hash of the header, and the cache
+    is discarded when any of them changes.
+    """
+
+    def __init__(self, filename, key):
+        self.path = filename + CACHE_EXTENSION
+        self.key = key
+        self.samples = None
+        self.columns = []
+        try:
+            with open(os.path.join(self.path, _CACHE_META)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+        if meta.get("key") == key:
+            self.samples = meta["samples"]
+            self.columns = meta["columns"]
+
+    def load(self, name):
+        return np.load(os.path.join(self.path, name + ".npy"), mmap_mode="r")
+
+    def store(self, columns, samples):
+        """Adds parsed columns, a dict of name to array. Returns False if
+        the cache directory is not writable.
+        """
+        try:
+            if self.samples is None:
+                shutil.rmtree(self.path, ignore_errors=True)
+                os.makedirs(self.path)
+            for name, values in columns.items():
+                tmp = os.path.join(self.path, name + ".tmp.npy")
+                np.save(tmp, values)
+                os.replace(tmp, os.path.join(self.path, name + ".npy"))
+            self.samples = samples
+            self.columns = self.columns + [
+                name for name in columns if name not in self.columns
+            ]
+            tmp = os.path.join(self.path, _CACHE_META + ".tmp")
+            with open(tmp, "w") as f:
+                json.dump(
+                    {"key": self.key, "samples": samples, "columns": self.columns}, f
+                )
+            os.replace(tmp, os.path.join(self.path, _CACHE_META))
+        except OSError as e:
+            _log.warning("Unable to write cache " + self.path + ": " + str(e))
+            return False
+        return True
 
 
 class CSVReader(object):
+    """Reads a recording into one float array attribute per column.
+    The file is parsed in chunks of chunk_size rows with NumPy, so memory
+    stays bounded by the columns read. columns restricts parsing to the
+    given columns or vector fields.
+
+    With cache enabled the parsed columns are saved to a sidecar directory,
+    see ColumnCache. Later reads of the unchanged file only parse columns
+    not cached yet and map the cached ones lazily on first attribute access.
+
+    start and end select the samples with start <= timestamp <= end. The
+    file is seeked to start using its timestamp index, see timestamp_index,
+    and parsing stops after end, unless the index finds the timestamps are
+    not monotonic. Windowed reads bypass the cache.
+
+    rows instead selects samples by position, a slice of the samples of
+    the whole file, found through the timestamp index too.
+    """
+
     __samples = None
     __filename = None
+    __cache = None
+    __cached = ()
+    __mask = None
 
     def get_header_data(self, __reader):
         header = next(__reader)
         return header
 
-    def __init__(self, csvfile, delimiter=" ", filter_running_program=False):
+    def __init__(
+        self,
+        csvfile,
+        delimiter=" ",
+        filter_running_program=False,
+        columns=None,
+        chunk_size=DEFAULT_CHUNK_ROWS,
+        cache=True,
+        start=None,
+        end=None,
+        rows=None,
+    ):
         self.__filename = csvfile.name
 
-        csvfile = [
-            csvfile for csvfile in csvfile.readlines() if csvfile.strip()
-        ]  # remove any empty lines
+        lines = (line for line in csvfile if line.strip())  # skip empty lines
+        header_line = next(lines, "")
+        header = self.get_header_data(csv.reader([header_line], delimiter=delimiter))
+        usecols = get_projection(header, columns)
 
-        reader = csv.reader(csvfile, delimiter=delimiter)
-        header = self.get_header_data(reader)
-
-        # read csv file
-        data = [row for row in reader]
-
-        if len(data) == 0:
-            _log.warn("No data read from file: " + self.__filename)
-
-        # filter data
+        state_idx = None
         if filter_running_program:
             if runtime_state not in header:
                 _log.warn(
                     "Unable to filter data since runtime_state field is missing in data set"
                 )
             else:
-                idx = header.index(runtime_state)
-                data = [row for row in data if row[idx] == runtime_state_running]
+                state_idx = header.index(runtime_state)
+                if state_idx not in usecols:
+                    usecols.append(state_idx)
 
-        self.__samples = len(data)
+        window = start is not None or end is not None
+        monotonic = False
+        if window:
+            if timestamp not in header:
+                raise ValueError("No timestamp column to select a window by")
+            time_idx = header.index(timestamp)
+            if time_idx not in usecols:
+                usecols.append(time_idx)
+            if os.path.isfile(str(self.__filename)):
+                index = timestamp_index.get_csv_index(self.__filename, delimiter)
+                monotonic = index.monotonic
+                offset = None if start is None else index.lookup(start)
+                if offset is not None:
+                    csvfile.seek(offset)
+                    lines = (line for line in csvfile if line.strip())
+
+        if rows is not None:
+            if window:
+                raise ValueError("Select samples by rows or by start and end")
+            first = rows.start or 0
+            skip = first
+            if os.path.isfile(str(self.__filename)):
+                index = timestamp_index.get_csv_index(self.__filename, delimiter)
+                offset, skip = index.seek_row(first)
+                if offset is not None:
+                    csvfile.seek(offset)
+                    lines = (line for line in csvfile if line.strip())
+            stop = None if rows.stop is None else skip + max(rows.stop - first, 0)
+            lines = itertools.islice(lines, skip, stop)
+
+        if (
+            cache
+            and not window
+            and rows is None
+            and isinstance(self.__filename, str)
+            and os.path.isfile(self.__filename)
+        ):
+            st = os.stat(self.__filename)
+            key = [
+                st.st_size,
+                st.st_mtime_ns,
+                delimiter,
+                hashlib.sha1(header_line.encode("utf-8")).hexdigest(),
+            ]
+            self.__cache = ColumnCache(self.__filename, key)
+
+        if self.__cache is None:
+            state_col = None if state_idx is None else usecols.index(state_idx)
+            time_col = None
+            if window:
+                # small chunks so little is parsed past end
+                time_col = usecols.index(time_idx)
+                chunk_size = min(chunk_size, timestamp_index.DEFAULT_STRIDE)
+            data = self.__parse(
+                lines,
+                delimiter,
+                usecols,
+                chunk_size,
+                state_col,
+                time_col,
+                start,
+                end,
+                monotonic,
+            )
+            self.__samples = len(data)
+            values = {header[usecols[i]]: data[:, i] for i in range(len(usecols))}
+        else:
+            # the cache holds unfiltered columns, parse the ones missing
+            missing = [i for i in usecols if header[i] not in self.__cache.columns]
+            values = {}
+            if missing or self.__cache.samples is None:
+                data = self.__parse(lines, delimiter, missing, chunk_size)
+                values = {header[missing[i]]: data[:, i] for i in range(len(missing))}
+                self.__cache.store(values, len(data))
+                self.__samples = len(data)
+            else:
+                self.__samples = self.__cache.samples
+            self.__cached = [header[i] for i in usecols if header[i] not in values]
+            if state_idx is not None:
+                state = values.get(runtime_state)
+                if state is None:
+                    state = self.__cache.load(runtime_state)
+                self.__mask = state == float(runtime_state_running)
+                self.__samples = int(self.__mask.sum())
+                values = {name: v[self.__mask] for name, v in values.items()}
 
         if self.__samples == 0:
             _log.warn("No data left from file: " + self.__filename + " after filtering")
 
-        # transpose data
-        data = list(zip(*data))
-
         # create dictionary from  header elements (keys) to float arrays
         self.__dict__.update(
-            {
-                header[i]: np.array(list(map(float, data[:][i])))
-                for i in range(len(header))
-            }
+            {name: np.ascontiguousarray(v) for name, v in values.items()}
         )
 
+    def __parse(
+        self,
+        lines,
+        delimiter,
+        usecols,
+        chunk_size,
+        state_col=None,
+        time_col=None,
+        start=None,
+        end=None,
+        monotonic=False,
+    ):
+        # parse chunk by chunk, keeping only the parsed columns
+        running = float(runtime_state_running)
+        chunks = []
+        done = not usecols
+        while not done:
+            chunk = list(itertools.islice(lines, chunk_size))
+            if not chunk:
+                break
+            block = np.loadtxt(
+                chunk, delimiter=delimiter, usecols=usecols, ndmin=2, dtype=float
+            )
+            if time_col is not None:
+                times = block[:, time_col]
+                if end is not None:
+                    # no later sample can be in the window if monotonic
+                    done = bool(monotonic and len(times) and times[-1] > end)
+                    block = block[times <= end]
+                    times = block[:, time_col]
+                if start is not None:
+                    block = block[times >= start]
+            if state_col is not None:
+                block = block[block[:, state_col] == running]
+            chunks.append(block)
+
+        if len(chunks) == 0:
+            if usecols:
+                _log.warn("No data read from file: " + self.__filename)
+            return np.empty((0, len(usecols)))
+        return np.concatenate(chunks)
+
+    def __getattr__(self, name):
+        # cached columns are mapped on first access
+        if name.startswith("_") or name not in self.__cached:
+            raise AttributeError(name)
+        values = self.__cache.load(name)
+        if self.__mask is not None:
+            values = values[self.__mask]
+        self.__dict__[name] = values
+        return values
+
     def get_samples(self):
         return self.__samples
 
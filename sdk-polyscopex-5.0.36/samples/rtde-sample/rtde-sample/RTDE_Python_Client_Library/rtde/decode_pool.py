@@ -0,0 +1,169 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import collections
+import concurrent.futures
+import logging
+import selectors
+import socket
+
+from rtde import rtde
+from rtde import ring_buffer
+from rtde import serialize
+from rtde.rtde import RTDEException
+
+_log = logging.getLogger(rtde.LOGNAME)
+
+# dtypes of the recipes seen by a worker process
+_dtypes = {}
+
+
+def decode_frames(names, types, frames):
+    """Decode complete data package frames into a dict of columns.
+    Runs in the worker processes; the columns are NumPy arrays in native
+    byte order with one row per package.
+    """
+    import numpy as np
+
+    key = (tuple(names), tuple(types))
+    frame_dtype = _dtypes.get(key)
+    if frame_dtype is None:
+        config = serialize.DataConfig.unpack_recipe(
+            b"\x00" + ",".join(types).encode("utf-8")
+        )
+        config.names = names
+        frame_size = ring_buffer.HEADER_SIZE + config.get_dtype().itemsize + 1
+        frame_dtype = config.get_dtype(ring_buffer.HEADER_SIZE + 1, frame_size)
+        _dtypes[key] = frame_dtype
+    records = np.frombuffer(frames, dtype=frame_dtype)
+    columns = {}
+    for name in names:
+        column = records[name]
+        columns[name] = column.astype(column.dtype.newbyteorder("="))
+    return columns
+
+
+class _Source(object):
+    __slots__ = ["con", "callback", "names", "types", "pending"]
+
+    def __init__(self, con, callback):
+        config = con.output_config
+        self.con = con
+        self.callback = callback
+        self.names = list(config.names)
+        self.types = list(config.types)
+        self.pending = collections.deque()
+
+
+class DecodePool(object):
+    """Reads data packages of many connections on one thread and decodes
+    them in worker processes.
+
+    Every poll() reads the ready connections once and submits the raw
+    frames of each to a process pool. Decoded batches are passed to
+    callback(con, columns) in the order they were read, columns being a
+    dict of NumPy arrays with one row per package. Connections are set up
+    and started as usual before they are registered.
+    """
+
+    def __init__(self, max_workers=None, executor=None):
+        if executor is None:
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers)
+        self.__executor = executor
+        self.__selector = selectors.DefaultSelector()
+        self.__sources = []
+        self.__running = False
+
+    def register(self, con, callback):
+        if con.output_config is None:
+            raise RTDEException("Output configuration not initialized")
+        source = _Source(con, callback)
+        self.__selector.register(con.fileno(), selectors.EVENT_READ, source)
+        self.__sources.append(source)
+
+    def unregister(self, con):
+        """Stop reading con, batches already submitted are still delivered"""
+        for key in list(self.__selector.get_map().values()):
+            if key.data.con is con:
+                self.__selector.unregister(key.fileobj)
+                return
+
+    @property
+    def pending_count(self):
+        """Batches submitted and not yet delivered"""
+        return sum(len(source.pending) for source in self.__sources)
+
+    def poll(self, timeout=rtde.DEFAULT_TIMEOUT):
+        """Submit the data of the connections that are ready within timeout
+        and deliver the batches that are decoded. Returns the number of
+        packages submitted.
+        """
+        submitted = 0
+        for key, _ in self.__selector.select(timeout):
+            source = key.data
+            try:
+                count, frames = source.con.receive_frames()
+            except (RTDEException, socket.error) as e:
+                _log.error("Connection to " + source.con.hostname + " lost: " + str(e))
+                self.__selector.unregister(key.fileobj)
+                continue
+            if count:
+                future = self.__executor.submit(
+                    decode_frames, source.names, source.types, frames
+                )
+                source.pending.append(future)
+                submitted += count
+        self.__deliver(False)
+        return submitted
+
+    def __deliver(self, wait):
+        for source in list(self.__sources):
+            pending = source.pending
+            while pending and (wait or pending[0].done()):
+                source.callback(source.con, pending.popleft().result())
+            if not pending and not self.__registered(source):
+                self.__sources.remove(source)
+
+    def __registered(self, source):
+        return any(key.data is source for key in self.__selector.get_map().values())
+
+    def flush(self):
+        """Wait for and deliver all submitted batches"""
+        self.__deliver(True)
+
+    def run(self, timeout=rtde.DEFAULT_TIMEOUT):
+        """Poll until stop() is called or no connections are left"""
+        self.__running = True
+        while self.__running and self.__selector.get_map():
+            self.poll(timeout)
+        self.flush()
+
+    def stop(self):
+        self.__running = False
+
+    def close(self):
+        """Deliver pending batches and shut the workers down, the
+        connections are left open"""
+        self.flush()
+        self.__selector.close()
+        self.__executor.shutdown()
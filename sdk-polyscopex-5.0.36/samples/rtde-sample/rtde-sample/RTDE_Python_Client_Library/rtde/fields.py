@@ -0,0 +1,50 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Field names and column access shared by the recording readers"""
+
+runtime_state = "runtime_state"
+runtime_state_running = 2
+timestamp = "timestamp"
+
+
+def read_column(names, name, read_field, mask=None):
+    """Column name of a recording with fields names as a float array, as
+    csv_reader.CSVReader exposes it: vector fields are split into name_0
+    to name_5. read_field(field) returns the values of a field, mask
+    selects rows. Raises AttributeError if there is no such column.
+    """
+    field, column = name, None
+    if field not in names:
+        field, _, suffix = name.rpartition("_")
+        if field not in names or not suffix.isdigit():
+            raise AttributeError(name)
+        column = int(suffix)
+    values = read_field(field)
+    if column is not None and (values.ndim != 2 or column >= values.shape[1]):
+        raise AttributeError(name)
+    if mask is not None:
+        values = values[mask]
+    if column is not None:
+        values = values[:, column]
+    return values.astype(float)
@@ -0,0 +1,527 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Stand-in for the RTDE server of a controller, for benchmarks and CI.
+
+Implements the RTDE protocol commands and streams synthetic data packages
+for any output recipe. Faults can be injected to exercise the client:
+slow reads of client data, dropped connections and bursty delivery.
+
+    python -m rtde.mock_server --port 30004 --rate 500
+"""
+
+import argparse
+import logging
+import math
+import re
+import socket
+import struct
+import threading
+import time
+
+from rtde import serialize
+from rtde.rtde import Command, LOGNAME, pack_packet
+
+_log = logging.getLogger(LOGNAME)
+
+VARIABLE_TYPES = {
+    "timestamp": "DOUBLE",
+    "target_q": "VECTOR6D",
+    "target_qd": "VECTOR6D",
+    "target_qdd": "VECTOR6D",
+    "target_current": "VECTOR6D",
+    "target_moment": "VECTOR6D",
+    "actual_q": "VECTOR6D",
+    "actual_qd": "VECTOR6D",
+    "actual_current": "VECTOR6D",
+    "actual_current_window": "VECTOR6D",
+    "joint_control_output": "VECTOR6D",
+    "actual_TCP_pose": "VECTOR6D",
+    "actual_TCP_speed": "VECTOR6D",
+    "actual_TCP_force": "VECTOR6D",
+    "target_TCP_pose": "VECTOR6D",
+    "target_TCP_speed": "VECTOR6D",
+    "actual_digital_input_bits": "UINT64",
+    "joint_temperatures": "VECTOR6D",
+    "actual_execution_time": "DOUBLE",
+    "robot_mode": "INT32",
+    "joint_mode": "VECTOR6INT32",
+    "safety_mode": "INT32",
+    "safety_status": "INT32",
+    "actual_tool_accelerometer": "VECTOR3D",
+    "speed_scaling": "DOUBLE",
+    "target_speed_fraction": "DOUBLE",
+    "actual_momentum": "DOUBLE",
+    "actual_main_voltage": "DOUBLE",
+    "actual_robot_voltage": "DOUBLE",
+    "actual_robot_current": "DOUBLE",
+    "actual_joint_voltage": "VECTOR6D",
+    "actual_digital_output_bits": "UINT64",
+    "runtime_state": "UINT32",
+    "elbow_position": "VECTOR3D",
+    "elbow_velocity": "VECTOR3D",
+    "robot_status_bits": "UINT32",
+    "safety_status_bits": "UINT32",
+    "analog_io_types": "UINT32",
+    "standard_analog_input0": "DOUBLE",
+    "standard_analog_input1": "DOUBLE",
+    "standard_analog_output0": "DOUBLE",
+    "standard_analog_output1": "DOUBLE",
+    "io_current": "DOUBLE",
+    "tool_mode": "UINT32",
+    "tool_analog_input_types": "UINT32",
+    "tool_analog_input0": "DOUBLE",
+    "tool_analog_input1": "DOUBLE",
+    "tool_output_voltage": "INT32",
+    "tool_output_current": "DOUBLE",
+    "tool_temperature": "DOUBLE",
+    "tcp_force_scalar": "DOUBLE",
+    "payload": "DOUBLE",
+    "payload_cog": "VECTOR3D",
+    "payload_inertia": "VECTOR6D",
+    "script_control_line": "UINT32",
+    "speed_slider_mask": "UINT32",
+    "speed_slider_fraction": "DOUBLE",
+    "standard_digital_output_mask": "UINT8",
+    "standard_digital_output": "UINT8",
+    "configurable_digital_output_mask": "UINT8",
+    "configurable_digital_output": "UINT8",
+}
+
+REGISTER_TYPES = [
+    (re.compile(r"^(input|output)_double_register_\d+$"), "DOUBLE"),
+    (re.compile(r"^(input|output)_int_register_\d+$"), "INT32"),
+    (re.compile(r"^(input|output)_bit_register_\d+$"), "BOOL"),
+    (re.compile(r"^(input|output)_bit_registers\d+_to_\d+$"), "UINT32"),
+]
+
+PROGRAM_RUNNING = 2
+PROGRAM_STOPPED = 1
+
+
+def get_variable_type(name):
+    """The RTDE type of a variable, NOT_FOUND if the server does not know it"""
+    if name in VARIABLE_TYPES:
+        return VARIABLE_TYPES[name]
+    for pattern, data_type in REGISTER_TYPES:
+        if pattern.match(name):
+            return data_type
+    return "NOT_FOUND"
+
+
+def _make_recipe(recipe_id, names, types):
+    config = serialize.DataConfig.unpack_recipe(
+        bytes(bytearray([recipe_id])) + ",".join(types).encode("utf-8")
+    )
+    config.names = names
+    return config
+
+
+def _synthetic_value(name, data_type, index, n, t):
+    """Deterministic value of field index at package n and time t"""
+    size = serialize.get_item_size(data_type)
+    if name == "timestamp":
+        return t
+    if name == "runtime_state":
+        # programs run for 8 seconds and are stopped for 2
+        return PROGRAM_RUNNING if int(t) % 10 < 8 else PROGRAM_STOPPED
+    if name == "robot_mode":
+        return 7
+    if name == "safety_mode":
+        return 1
+    if data_type.endswith("D") or data_type == "DOUBLE":
+        values = [math.sin(t + index + j) for j in range(size)]
+    elif data_type == "BOOL":
+        return n % 2 == 0
+    elif data_type == "UINT8":
+        return n % 256
+    else:
+        values = [(n + j) % 1000 for j in range(size)]
+    if size > 1:
+        return values
+    return values[0]
+
+
+class _Client(object):
+    def __init__(self, server, sock, address):
+        self.server = server
+        self.sock = sock
+        self.address = address
+        self.send_lock = threading.Lock()
+        self.protocol_version = 1
+        self.output_config = None
+        self.frequency = None
+        self.input_configs = {}
+        self.next_input_id = 1
+        self.next_output_id = 1
+        self.started = threading.Event()
+        self.closed = False
+        self.packages_sent = 0
+
+    def send(self, command, payload=b""):
+        self.send_raw(pack_packet(command, payload))
+
+    def send_raw(self, data):
+        with self.send_lock:
+            self.sock.sendall(data)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.started.set()
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+            self.sock.close()
+
+    def serve(self):
+        streamer = threading.Thread(target=self.stream, daemon=True)
+        streamer.start()
+        buf = b""
+        try:
+            while not self.closed:
+                if self.server.read_delay:
+                    time.sleep(self.server.read_delay)
+                more = self.sock.recv(4096)
+                if not more:
+                    break
+                buf += more
+                while len(buf) >= 3:
+                    size, command = struct.unpack_from(">HB", buf)
+                    if len(buf) < size:
+                        break
+                    payload, buf = buf[3:size], buf[size:]
+                    self.on_packet(command, payload)
+        except socket.error:
+            pass
+        finally:
+            self.close()
+            self.server._remove(self)
+
+    def on_packet(self, command, payload):
+        if command == Command.RTDE_REQUEST_PROTOCOL_VERSION:
+            version = struct.unpack_from(">H", payload)[0]
+            accepted = version in (1, 2)
+            if accepted:
+                self.protocol_version = version
+            self.send(command, struct.pack(">B", accepted))
+        elif command == Command.RTDE_GET_URCONTROL_VERSION:
+            self.send(command, struct.pack(">IIII", *self.server.controller_version))
+        elif command == Command.RTDE_CONTROL_PACKAGE_SETUP_OUTPUTS:
+            self.setup_outputs(payload)
+        elif command == Command.RTDE_CONTROL_PACKAGE_SETUP_INPUTS:
+            self.setup_inputs(payload)
+        elif command == Command.RTDE_CONTROL_PACKAGE_START:
+            accepted = self.output_config is not None or bool(self.input_configs)
+            if self.output_config is not None:
+                self.started.set()
+            self.send(command, struct.pack(">B", accepted))
+        elif command == Command.RTDE_CONTROL_PACKAGE_PAUSE:
+            self.started.clear()
+            self.send(command, struct.pack(">B", True))
+        elif command == Command.RTDE_DATA_PACKAGE:
+            self.on_input(payload)
+        elif command == Command.RTDE_TEXT_MESSAGE:
+            _log.info("Message from client %s: %r", self.address, payload)
+        else:
+            _log.error("Mock server: unknown package command: " + str(command))
+
+    def setup_outputs(self, payload):
+        if self.protocol_version >= 2:
+            frequency = struct.unpack_from(">d", payload)[0]
+            payload = payload[8:]
+        else:
+            frequency = 125.0
+        names = payload.decode("utf-8").split(",")
+        types = [get_variable_type(name) for name in names]
+        recipe_id = 0
+        if "NOT_FOUND" not in types:
+            recipe_id = self.next_output_id
+            self.next_output_id += 1
+            self.output_config = _make_recipe(recipe_id, names, types)
+            self.frequency = frequency
+        reply = bytes(bytearray([recipe_id])) + ",".join(types).encode("utf-8")
+        self.send(Command.RTDE_CONTROL_PACKAGE_SETUP_OUTPUTS, reply)
+
+    def setup_inputs(self, payload):
+        names = payload.decode("utf-8").split(",")
+        in_use = set()
+        for config in self.input_configs.values():
+            in_use.update(config.names)
+        types = []
+        for name in names:
+            if name in in_use or not name.startswith(
+                ("input_", "standard_", "speed_", "configurable_")
+            ):
+                types.append("IN_USE" if name in in_use else "NOT_FOUND")
+            else:
+                types.append(get_variable_type(name))
+        recipe_id = 0
+        if "IN_USE" not in types and "NOT_FOUND" not in types:
+            recipe_id = self.next_input_id
+            self.next_input_id += 1
+            self.input_configs[recipe_id] = _make_recipe(recipe_id, names, types)
+        reply = bytes(bytearray([recipe_id])) + ",".join(types).encode("utf-8")
+        self.send(Command.RTDE_CONTROL_PACKAGE_SETUP_INPUTS, reply)
+
+    def on_input(self, payload):
+        recipe_id = bytearray(payload[:1])[0]
+        config = self.input_configs.get(recipe_id)
+        if config is None:
+            _log.error("Mock server: unknown input recipe id %d", recipe_id)
+            return
+        data = config.unpack(payload)
+        values = dict((name, getattr(data, name)) for name in config.names)
+        self.server._on_input(values)
+
+    def stream(self):
+        n = 0
+        next_time = None
+        while not self.closed:
+            if not self.started.is_set():
+                next_time = None
+                self.started.wait()
+                continue
+            config = self.output_config
+            rate = self.server.rate or self.frequency
+            burst = self.server.burst
+            now = time.perf_counter()
+            if next_time is None:
+                next_time = now
+            if now < next_time:
+                time.sleep(next_time - now)
+                continue
+            # catch up if behind, in bursts of at least burst packages, but
+            # by at most 10 ms at a time when packing cannot keep up
+            due = int((now - next_time) * rate) + 1
+            due = max(burst, min(due, int(rate * 0.01) + 1))
+            packets = []
+            for _ in range(due):
+                t = self.server.time_offset + n / float(rate)
+                packets.append(
+                    pack_packet(
+                        Command.RTDE_DATA_PACKAGE, self.server._encode(config, n, t)
+                    )
+                )
+                n += 1
+            next_time += due / float(rate)
+            try:
+                self.send_raw(b"".join(packets))
+            except socket.error:
+                break
+            self.packages_sent += due
+            self.server._on_sent(self, due)
+        self.close()
+
+
+class MockRTDEServer(object):
+    """Pure Python stand-in for the RTDE server of a controller.
+
+    rate overrides the frequency requested by the client, in packages per
+    second. Fault injection: burst sends that many packages per write,
+    read_delay sleeps before every read of client data, disconnect_after
+    drops a client after it was sent that many data packages.
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        rate=None,
+        burst=1,
+        read_delay=0.0,
+        disconnect_after=None,
+        controller_version=(5, 11, 0, 0),
+        time_offset=0.0,
+    ):
+        self.host = host
+        self.port = port
+        self.rate = rate
+        self.burst = burst
+        self.read_delay = read_delay
+        self.disconnect_after = disconnect_after
+        self.controller_version = controller_version
+        self.time_offset = time_offset
+        self.inputs = {}
+        self.packages_sent = 0
+        self.__values = {}
+        self.__clients = []
+        self.__lock = threading.Lock()
+        self.__sock = None
+        self.__thread = None
+
+    def start(self):
+        self.__sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.__sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.__sock.bind((self.host, self.port))
+        self.__sock.listen(8)
+        self.port = self.__sock.getsockname()[1]
+        self.__thread = threading.Thread(
+            target=self.__accept, args=(self.__sock,), daemon=True
+        )
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        sock, self.__sock = self.__sock, None
+        if sock is not None:
+            # closing alone does not wake a thread blocked in accept()
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+            sock.close()
+            self.__thread.join()
+            self.__thread = None
+        self.drop_connections()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def set_value(self, name, value):
+        """Stream a fixed value for an output variable instead of a synthetic one"""
+        self.__values[name] = value
+
+    def send_message(
+        self, message, source="Mock server", level=serialize.Message.INFO_MESSAGE
+    ):
+        """Send a text message to all clients"""
+        message = message.encode("utf-8")
+        source = source.encode("utf-8")
+        for client in self.clients:
+            if client.protocol_version >= 2:
+                payload = struct.pack(
+                    ">B%dsB%dsB" % (len(message), len(source)),
+                    len(message),
+                    message,
+                    len(source),
+                    source,
+                    level,
+                )
+            else:
+                payload = struct.pack(">B", level) + message
+            client.send(Command.RTDE_TEXT_MESSAGE, payload)
+
+    def drop_connections(self):
+        """Close all client connections, as a controller restart would"""
+        for client in self.clients:
+            client.close()
+
+    @property
+    def clients(self):
+        with self.__lock:
+            return list(self.__clients)
+
+    def __accept(self, listener):
+        while self.__sock is listener:
+            try:
+                sock, address = listener.accept()
+            except socket.error:
+                break
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client = _Client(self, sock, address)
+            with self.__lock:
+                self.__clients.append(client)
+            threading.Thread(target=client.serve, daemon=True).start()
+
+    def _remove(self, client):
+        with self.__lock:
+            if client in self.__clients:
+                self.__clients.remove(client)
+
+    def _on_input(self, values):
+        self.inputs.update(values)
+
+    def _on_sent(self, client, count):
+        self.packages_sent += count
+        if (
+            self.disconnect_after is not None
+            and client.packages_sent >= self.disconnect_after
+        ):
+            _log.info("Mock server: dropping client %s", client.address)
+            client.close()
+
+    def _encode(self, config, n, t):
+        values = [config.id]
+        for index in range(len(config.names)):
+            name = config.names[index]
+            data_type = config.types[index]
+            if name in self.__values:
+                value = self.__values[name]
+            else:
+                value = _synthetic_value(name, data_type, index, n, t)
+            if serialize.get_item_size(data_type) > 1:
+                values.extend(value)
+            else:
+                values.append(value)
+        return struct.pack(config.fmt, *values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RTDE mock server")
+    parser.add_argument("--host", default="127.0.0.1", help="address to bind to")
+    parser.add_argument("--port", type=int, default=30004, help="port number (30004)")
+    parser.add_argument(
+        "--rate", type=float, help="data packages per second, overrides the recipe"
+    )
+    parser.add_argument(
+        "--burst", type=int, default=1, help="data packages sent per write"
+    )
+    parser.add_argument(
+        "--read-delay", type=float, default=0.0, help="seconds to wait before reads"
+    )
+    parser.add_argument(
+        "--disconnect-after",
+        type=int,
+        help="drop clients after this many data packages",
+    )
+    parser.add_argument(
+        "--verbose", help="increase output verbosity", action="store_true"
+    )
+    args = parser.parse_args()
+
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO)
+
+    server = MockRTDEServer(
+        args.host,
+        args.port,
+        rate=args.rate,
+        burst=args.burst,
+        read_delay=args.read_delay,
+        disconnect_after=args.disconnect_after,
+    ).start()
+    print("RTDE mock server listening on %s:%d" % (args.host, server.port))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import collections
+import math
+import struct
+import tempfile
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+BLOCK = "block"
+SPILL_TO_DISK = "spill_to_disk"
+POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK, SPILL_TO_DISK)
+
+DEFAULT_MAX_PACKETS = 10000
+
+# outcome of PacketQueue.put
+QUEUED = 0
+DROPPED = 1
+SPILLED = 2
+
+_LENGTH = struct.Struct(">H")
+_ARRIVAL = struct.Struct(">d")
+
+
+class PacketQueue(object):
+    """Bounded FIFO of data package payloads, limited in packets.
+
+    When max_packets payloads are queued a put() either replaces the oldest
+    payload (drop_oldest), discards the new one (drop_newest) or appends it
+    to a temporary spill file in spill_dir (spill_to_disk). Spilled payloads
+    are read back in order as the queue drains. With the block policy the
+    caller checks full() and stops receiving, leaving data in the socket.
+    The arrival time given to put() is kept with the payload and is in
+    arrival after get().
+    """
+
+    def __init__(self, policy, max_packets=DEFAULT_MAX_PACKETS, spill_dir=None):
+        if policy not in POLICIES:
+            raise ValueError("Unknown buffer policy: " + str(policy))
+        if max_packets is None or max_packets < 1:
+            raise ValueError("max_packets must be at least 1")
+        self.policy = policy
+        self.max_packets = max_packets
+        self.__spill_dir = spill_dir
+        self.__queue = collections.deque()
+        self.__spill = None
+        self.__spill_read = 0
+        self.__spill_write = 0
+        self.__spilled = 0
+        self.arrival = None
+
+    def __len__(self):
+        return len(self.__queue) + self.__spilled
+
+    @property
+    def spilled(self):
+        """Payloads currently in the spill file"""
+        return self.__spilled
+
+    def full(self):
+        return len(self.__queue) >= self.max_packets
+
+    def put(self, payload, arrival=None):
+        """Queue a copy of payload, returns QUEUED, DROPPED or SPILLED.
+        drop_oldest returns DROPPED when an older payload had to make room.
+        """
+        if self.__spilled:
+            self.__spill_packet(payload, arrival)
+            return SPILLED
+        if len(self.__queue) < self.max_packets:
+            self.__queue.append((bytes(payload), arrival))
+            return QUEUED
+        if self.policy == DROP_OLDEST:
+            self.__queue.popleft()
+            self.__queue.append((bytes(payload), arrival))
+            return DROPPED
+        if self.policy == SPILL_TO_DISK:
+            self.__spill_packet(payload, arrival)
+            return SPILLED
+        return DROPPED
+
+    def get(self):
+        """The oldest payload, None if the queue is empty"""
+        if not self.__queue and self.__spilled:
+            self.__unspill()
+        if self.__queue:
+            payload, self.arrival = self.__queue.popleft()
+            return payload
+        return None
+
+    def clear(self):
+        self.__queue.clear()
+        self.close()
+
+    def close(self):
+        """Remove the spill file, spilled payloads are lost"""
+        if self.__spill is not None:
+            self.__spill.close()
+            self.__spill = None
+        self.__spill_read = self.__spill_write = self.__spilled = 0
+
+    def __spill_packet(self, payload, arrival):
+        if self.__spill is None:
+            self.__spill = tempfile.TemporaryFile(
+                prefix="rtde-spill-", dir=self.__spill_dir
+            )
+        self.__spill.seek(self.__spill_write)
+        self.__spill.write(_LENGTH.pack(len(payload)))
+        self.__spill.write(payload)
+        self.__spill.write(_ARRIVAL.pack(float("nan") if arrival is None else arrival))
+        self.__spill_write = self.__spill.tell()
+        self.__spilled += 1
+
+    def __unspill(self):
+        """Move up to max_packets payloads from the spill file to the queue"""
+        spill = self.__spill
+        spill.seek(self.__spill_read)
+        while self.__spilled and len(self.__queue) < self.max_packets:
+            (length,) = _LENGTH.unpack(spill.read(_LENGTH.size))
+            payload = spill.read(length)
+            (arrival,) = _ARRIVAL.unpack(spill.read(_ARRIVAL.size))
+            if math.isnan(arrival):
+                arrival = None
+            self.__queue.append((payload, arrival))
+            self.__spilled -= 1
+        self.__spill_read = spill.tell()
+        if not self.__spilled:
+            # reuse the file from the start once it is read back completely
+            spill.seek(0)
+            spill.truncate()
+            self.__spill_read = self.__spill_write = 0
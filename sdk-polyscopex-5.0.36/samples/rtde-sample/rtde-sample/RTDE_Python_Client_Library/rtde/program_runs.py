@@ -0,0 +1,206 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Program runs in a recording.
+
+A program run is a contiguous range of samples with runtime_state
+running. A timestamp going back, as after reconnecting to a restarted
+controller, also ends a run. The runs of a recording are found in one vectorized pass over
+its timestamp and runtime_state columns and kept next to it in
+<recording>.runs, a UTF-8 JSON object with
+    "key": [file size, mtime in ns] of the recording, see timestamp_index
+    "runs": [start, end, start_time, end_time] per run, samples end
+        exclusive, timestamps of the first and last sample
+so later analysis can go straight to cycle N of a program.
+"""
+
+import json
+import logging
+import os
+
+import numpy as np
+
+from .rtde import LOGNAME
+from . import binary_reader
+from . import columnar
+from . import csv_reader
+from . import timestamp_index
+from .fields import runtime_state, runtime_state_running, timestamp
+
+_log = logging.getLogger(LOGNAME)
+
+RUNS_EXTENSION = ".runs"
+
+
+class ProgramRun(object):
+    def __init__(self, index, start, end, start_time, end_time):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.start_time = start_time
+        self.end_time = end_time
+
+    @property
+    def samples(self):
+        return self.end - self.start
+
+    @property
+    def duration(self):
+        return self.end_time - self.start_time
+
+    def select(self, values):
+        """The samples of this run from a column of the whole recording"""
+        return values[self.start : self.end]
+
+    def __repr__(self):
+        return "ProgramRun(%d, samples %d:%d, time %.3f:%.3f)" % (
+            self.index,
+            self.start,
+            self.end,
+            self.start_time,
+            self.end_time,
+        )
+
+
+def find_program_runs(state, timestamps):
+    """Runs of contiguous running samples, given the runtime_state and
+    timestamp columns
+    """
+    running = np.asarray(state) == runtime_state_running
+    edges = np.diff(np.concatenate(([0], running.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    # split runs where the timestamps start over
+    restarts = np.flatnonzero(np.diff(timestamps) < 0) + 1
+    restarts = restarts[running[restarts] & running[restarts - 1]]
+    starts = np.sort(np.concatenate((starts, restarts)))
+    ends = np.sort(np.concatenate((ends, restarts)))
+    return [
+        ProgramRun(i, int(s), int(e), float(timestamps[s]), float(timestamps[e - 1]))
+        for i, (s, e) in enumerate(zip(starts, ends))
+    ]
+
+
+def get_running_mask(runs, samples):
+    """Boolean mask of the samples in the runs"""
+    mask = np.zeros(samples, dtype=bool)
+    for run in runs:
+        mask[run.start : run.end] = True
+    return mask
+
+
+def open_recording(filename, columns=None, **kwargs):
+    """Reader for a recording of any format. columns limits what is parsed
+    of CSV recordings, the others read columns on access. kwargs are passed
+    on to the reader.
+    """
+    if filename.endswith(columnar.EXTENSION):
+        return columnar.ColumnarReader(filename, **kwargs)
+    if binary_reader.is_binary_recording(filename):
+        return binary_reader.BinaryReader(filename, **kwargs)
+    with open(filename) as csvfile:
+        return csv_reader.CSVReader(csvfile, columns=columns, **kwargs)
+
+
+def load_program_runs(filename):
+    """The saved runs of the recording filename, None if there are none or
+    the recording changed after they were found.
+    """
+    try:
+        with open(filename + RUNS_EXTENSION) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get("key") != timestamp_index.get_file_key(filename):
+        return None
+    return [ProgramRun(i, *run) for i, run in enumerate(index["runs"])]
+
+
+def save_program_runs(filename, runs):
+    try:
+        tmp = filename + RUNS_EXTENSION + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(
+                {
+                    "key": timestamp_index.get_file_key(filename),
+                    "runs": [
+                        [run.start, run.end, run.start_time, run.end_time]
+                        for run in runs
+                    ],
+                },
+                f,
+            )
+        os.replace(tmp, filename + RUNS_EXTENSION)
+    except OSError as e:
+        _log.warning("Unable to write program runs: " + str(e))
+        return False
+    return True
+
+
+def get_program_runs(filename):
+    """The program runs of a recording, found and saved if not known yet"""
+    runs = load_program_runs(filename)
+    if runs is None:
+        reader = open_recording(filename, columns=[timestamp, runtime_state])
+        runs = find_program_runs(
+            getattr(reader, runtime_state), getattr(reader, timestamp)
+        )
+        save_program_runs(filename, runs)
+    return runs
+
+
+class ProgramCycles(object):
+    """The program runs, or cycles, of a recording. Indexing returns a
+    reader of the samples of one cycle, selected by their positions
+    without reading the rest of the file. columns is passed on to
+    open_recording.
+    """
+
+    def __init__(self, filename, columns=None):
+        self.filename = filename
+        self.runs = get_program_runs(filename)
+        self.__columns = columns
+
+    def __len__(self):
+        return len(self.runs)
+
+    def __getitem__(self, n):
+        run = self.runs[n]
+        return open_recording(
+            self.filename, self.__columns, rows=slice(run.start, run.end)
+        )
+
+    def __iter__(self):
+        for n in range(len(self.runs)):
+            yield self[n]
+
+    def compare(self, n, m, names):
+        """Differences cycle n minus cycle m of the given columns, sample
+        by sample from the start of the cycles and cut to the shorter one
+        """
+        a, b = self[n], self[m]
+        samples = min(a.get_samples(), b.get_samples())
+        return {
+            name: getattr(a, name)[:samples] - getattr(b, name)[:samples]
+            for name in names
+        }
@@ -0,0 +1,189 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import collections
+import struct
+import time
+
+HEADER = struct.Struct(">HB")
+HEADER_SIZE = HEADER.size
+
+# A packet size is encoded as an unsigned short, so a buffer of this size
+# can always hold at least one complete packet.
+MIN_BUFFER_SIZE = 1 << 16
+DEFAULT_BUFFER_SIZE = 1 << 20
+
+
+class RingBuffer(object):
+    """Preallocated receive buffer for RTDE packets.
+
+    Socket data is received directly into a fixed size bytearray and packets
+    are parsed in place by offset. Unconsumed bytes are only moved to the
+    front of the buffer when the write position reaches the end of it.
+
+    With track_arrival enabled every packet consumed gets the monotonic time
+    of the receive that completed it, in arrival after next_packet and in
+    arrivals, one per packet, after next_run.
+    """
+
+    __slots__ = [
+        "_buf",
+        "_view",
+        "_read",
+        "_write",
+        "_base",
+        "_stamps",
+        "arrival",
+        "arrivals",
+    ]
+
+    def __init__(self, size=DEFAULT_BUFFER_SIZE):
+        if size < MIN_BUFFER_SIZE:
+            raise ValueError(
+                "Buffer size must be at least " + str(MIN_BUFFER_SIZE) + " bytes"
+            )
+        self._buf = bytearray(size)
+        self._view = memoryview(self._buf)
+        self._read = 0
+        self._write = 0
+        # stream offset of _buf[0] and (stream end offset, time) per receive
+        self._base = 0
+        self._stamps = None
+        self.arrival = None
+        self.arrivals = None
+
+    def __len__(self):
+        return self._write - self._read
+
+    @property
+    def capacity(self):
+        return len(self._buf)
+
+    def clear(self):
+        self._read = 0
+        self._write = 0
+        if self._stamps is not None:
+            self._stamps.clear()
+
+    def track_arrival(self, enabled=True):
+        """Start or stop stamping received data with its arrival time"""
+        self._stamps = collections.deque() if enabled else None
+        self.arrival = None
+        self.arrivals = None
+
+    def __stamp(self):
+        self._stamps.append((self._base + self._write, time.monotonic()))
+
+    def __arrival_at(self, end):
+        """Arrival time of the data up to buffer offset end"""
+        end += self._base
+        stamps = self._stamps
+        while stamps and stamps[0][0] < end:
+            stamps.popleft()
+        return stamps[0][1] if stamps else None
+
+    def __restart(self):
+        # nothing left, restart at the front without copying
+        self._base += self._write
+        self._read = 0
+        self._write = 0
+
+    def is_full(self):
+        return self._write - self._read == len(self._buf)
+
+    def __compact(self):
+        count = self._write - self._read
+        if count:
+            self._buf[0:count] = self._view[self._read : self._write]
+        self._base += self._read
+        self._read = 0
+        self._write = count
+
+    def get_buffer(self):
+        """Returns a writable view of the free space at the end of the buffer.
+        Must not be called when the buffer is full.
+        """
+        if self._write == len(self._buf):
+            self.__compact()
+        return self._view[self._write :]
+
+    def buffer_updated(self, nbytes):
+        """Marks nbytes written into the view returned by get_buffer as data"""
+        self._write += nbytes
+        if self._stamps is not None:
+            self.__stamp()
+
+    def recv_into(self, sock):
+        """Receive as much data as fits into the buffer from sock.
+        Returns the number of bytes received, 0 means the peer closed the
+        connection. Must not be called when the buffer is full.
+        """
+        nbytes = sock.recv_into(self.get_buffer())
+        self._write += nbytes
+        if nbytes and self._stamps is not None:
+            self.__stamp()
+        return nbytes
+
+    def next_packet(self):
+        """Consume the next complete packet.
+        Returns a (command, payload) tuple or None if no complete packet is
+        buffered. The payload is a view into the buffer and is only valid
+        until the next call to recv_into.
+        """
+        available = self._write - self._read
+        if available < HEADER_SIZE:
+            return None
+        size, command = HEADER.unpack_from(self._buf, self._read)
+        if available < size:
+            return None
+        start = self._read
+        self._read = start + size
+        if self._stamps is not None:
+            self.arrival = self.__arrival_at(self._read)
+        if self._read == self._write:
+            self.__restart()
+        return command, self._view[start + HEADER_SIZE : start + size]
+
+    def next_run(self, command, size, max_count=None):
+        """Consume consecutive complete packets with the same command and size.
+        Returns a (count, view) tuple where view covers the packets including
+        their headers, so they can be decoded with a fixed stride. The view is
+        only valid until the next call to recv_into.
+        """
+        start = self._read
+        end = start
+        count = 0
+        while (max_count is None or count < max_count) and self._write - end >= size:
+            packet_size, packet_command = HEADER.unpack_from(self._buf, end)
+            if packet_command != command or packet_size != size:
+                break
+            end += size
+            count += 1
+        self._read = end
+        if self._stamps is not None:
+            self.arrivals = [
+                self.__arrival_at(start + size * (i + 1)) for i in range(count)
+            ]
+        if self._read == self._write:
+            self.__restart()
+        return count, self._view[start:end]
@@ -26,13 +26,27 @@ import socket
 import select
 import sys
 import logging
+import threading
+import collections
+import time
 
 if sys.version_info[0] < 3:
     import serialize
+    import ring_buffer
+    import timing
+    import packet_queue
+    import clock
 else:
     from rtde import serialize
+    from rtde import ring_buffer
+    from rtde import timing
+    from rtde import packet_queue
+    from rtde import clock
 
 DEFAULT_TIMEOUT = 1.0
+DEFAULT_BUFFER_SIZE = ring_buffer.DEFAULT_BUFFER_SIZE
+RECONNECT_BACKOFF = 0.5
+RECONNECT_MAX_BACKOFF = 30.0
 
 LOGNAME = "rtde"
 _log = logging.getLogger(LOGNAME)
@@ -60,6 +74,53 @@ class ConnectionState:
     PAUSED = 3
 
 
+class ReceiveStats(object):
+    """Counters for the receive path, reset on connect"""
+
+    __slots__ = [
+        "decoded_packages",
+        "skipped_packages",
+        "text_messages",
+        "reconnects",
+        "missed_packages",
+        "dropped_packages",
+        "spilled_packages",
+    ]
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.decoded_packages = 0
+        self.skipped_packages = 0
+        self.text_messages = 0
+        self.reconnects = 0
+        self.missed_packages = 0
+        self.dropped_packages = 0
+        self.spilled_packages = 0
+
+    @property
+    def received_packages(self):
+        """Data packages received, whether decoded, skipped or dropped"""
+        return self.decoded_packages + self.skipped_packages + self.dropped_packages
+
+    def __repr__(self):
+        return (
+            "ReceiveStats(received=%d, decoded=%d, skipped=%d, text_messages=%d, "
+            "reconnects=%d, missed=%d, dropped=%d, spilled=%d)"
+            % (
+                self.received_packages,
+                self.decoded_packages,
+                self.skipped_packages,
+                self.text_messages,
+                self.reconnects,
+                self.missed_packages,
+                self.dropped_packages,
+                self.spilled_packages,
+            )
+        )
+
+
 class RTDEException(Exception):
     def __init__(self, msg):
         self.msg = msg
@@ -73,28 +134,185 @@ class RTDETimeoutException(RTDEException):
         super(RTDETimeoutException, self).__init__(msg)
 
 
+def pack_packet(command, payload=b""):
+    """Frame payload as an RTDE packet with a (size, command) header"""
+    size = ring_buffer.HEADER_SIZE + len(payload)
+    return ring_buffer.HEADER.pack(size, command) + payload
+
+
+def unpack_packet(cmd, payload, output_config, protocol_version):
+    """Decode the payload of a received packet.
+    Data packages are decoded straight from payload, which may be a view
+    into the receive buffer; other packages are copied first.
+    """
+    if cmd == Command.RTDE_DATA_PACKAGE:
+        return _unpack_data_package(payload, output_config)
+    payload = bytes(payload)
+    if cmd == Command.RTDE_REQUEST_PROTOCOL_VERSION:
+        return _unpack_protocol_version_package(payload)
+    elif cmd == Command.RTDE_GET_URCONTROL_VERSION:
+        return _unpack_urcontrol_version_package(payload)
+    elif cmd == Command.RTDE_TEXT_MESSAGE:
+        return _unpack_text_message(payload, protocol_version)
+    elif cmd == Command.RTDE_CONTROL_PACKAGE_SETUP_OUTPUTS:
+        return _unpack_setup_outputs_package(payload)
+    elif cmd == Command.RTDE_CONTROL_PACKAGE_SETUP_INPUTS:
+        return _unpack_setup_inputs_package(payload)
+    elif cmd == Command.RTDE_CONTROL_PACKAGE_START:
+        return _unpack_start_package(payload)
+    elif cmd == Command.RTDE_CONTROL_PACKAGE_PAUSE:
+        return _unpack_pause_package(payload)
+    else:
+        _log.error("Unknown package command: " + str(cmd))
+
+
+def _unpack_protocol_version_package(payload):
+    if len(payload) != 1:
+        _log.error("RTDE_REQUEST_PROTOCOL_VERSION: Wrong payload size")
+        return None
+    result = serialize.ReturnValue.unpack(payload)
+    return result.success
+
+
+def _unpack_urcontrol_version_package(payload):
+    if len(payload) != 16:
+        _log.error("RTDE_GET_URCONTROL_VERSION: Wrong payload size")
+        return None
+    version = serialize.ControlVersion.unpack(payload)
+    return version
+
+
+def _unpack_text_message(payload, protocol_version):
+    if len(payload) < 1:
+        _log.error("RTDE_TEXT_MESSAGE: No payload")
+        return None
+    if protocol_version == RTDE_PROTOCOL_VERSION_1:
+        msg = serialize.MessageV1.unpack(payload)
+    else:
+        msg = serialize.Message.unpack(payload)
+
+    if (
+        msg.level == serialize.Message.EXCEPTION_MESSAGE
+        or msg.level == serialize.Message.ERROR_MESSAGE
+    ):
+        _log.error(msg.source + ": " + msg.message)
+    elif msg.level == serialize.Message.WARNING_MESSAGE:
+        _log.warning(msg.source + ": " + msg.message)
+    elif msg.level == serialize.Message.INFO_MESSAGE:
+        _log.info(msg.source + ": " + msg.message)
+
+
+def _unpack_setup_outputs_package(payload):
+    if len(payload) < 1:
+        _log.error("RTDE_CONTROL_PACKAGE_SETUP_OUTPUTS: No payload")
+        return None
+    output_config = serialize.DataConfig.unpack_recipe(payload)
+    return output_config
+
+
+def _unpack_setup_inputs_package(payload):
+    if len(payload) < 1:
+        _log.error("RTDE_CONTROL_PACKAGE_SETUP_INPUTS: No payload")
+        return None
+    input_config = serialize.DataConfig.unpack_recipe(payload)
+    return input_config
+
+
+def _unpack_start_package(payload):
+    if len(payload) != 1:
+        _log.error("RTDE_CONTROL_PACKAGE_START: Wrong payload size")
+        return None
+    result = serialize.ReturnValue.unpack(payload)
+    return result.success
+
+
+def _unpack_pause_package(payload):
+    if len(payload) != 1:
+        _log.error("RTDE_CONTROL_PACKAGE_PAUSE: Wrong payload size")
+        return None
+    result = serialize.ReturnValue.unpack(payload)
+    return result.success
+
+
+def _unpack_data_package(payload, output_config):
+    if output_config is None:
+        _log.error("RTDE_DATA_PACKAGE: Missing output configuration")
+        return None
+    output = output_config.unpack(payload)
+    return output
+
+
+def list_equals(l1, l2):
+    if len(l1) != len(l2):
+        return False
+    for i in range(len((l1))):
+        if l1[i] != l2[i]:
+            return False
+    return True
+
+
 class RTDE(object):
-    def __init__(self, hostname, port=30004):
+    def __init__(
+        self,
+        hostname,
+        port=30004,
+        buffer_size=DEFAULT_BUFFER_SIZE,
+        auto_reconnect=False,
+    ):
         self.hostname = hostname
         self.port = port
+        self.__auto_reconnect = auto_reconnect
+        self.__buf = ring_buffer.RingBuffer(buffer_size)
         self.__conn_state = ConnectionState.DISCONNECTED
         self.__sock = None
         self.__output_config = None
         self.__input_config = {}
-        self.__skipped_package_count = 0
+        self.__input_packets = {}
+        self.__input_packed = {}
+        self.__input_sent_at = {}
+        self.__suppressed_send_count = 0
+        self.__stats = ReceiveStats()
+        self.__timing = None
+        self.__clock = None
+        self.__batch_arrivals = None
+        self.__queue = None
         self.__protocolVersion = RTDE_PROTOCOL_VERSION_1
+        self.__reader = None
+        self.__reader_stop = threading.Event()
+        self.__reader_cond = threading.Condition()
+        self.__reader_error = None
+        self.__latest = None
+        self.__latest_unread = False
+        self.__latest_overwritten_count = 0
+        self.__history = None
+        self.__history_overwritten_count = 0
+        self.__output_setup = None
+        self.__input_setups = []
+        self.__lost_state = None
+        self.__lost_at = None
+        self.__lost_reader = None
+        self.__track_timestamp = False
+        self.__timestamp_decoder = None
+        self.__last_timestamp = None
+        self.__gap_start = None
 
     def connect(self):
         if self.__sock:
             return
 
-        self.__buf = b""  # buffer data in binary format
+        self.__stats.reset()
+        self.__lost_state = None
+        if self.__queue is not None:
+            self.__queue.clear()
+        self.__open()
+
+    def __open(self):
+        self.__buf.clear()
         try:
             self.__sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.__sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.__sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             self.__sock.settimeout(DEFAULT_TIMEOUT)
-            self.__skipped_package_count = 0
             self.__sock.connect((self.hostname, self.port))
             self.__conn_state = ConnectionState.CONNECTED
         except (socket.timeout, socket.error):
@@ -104,11 +322,80 @@ class RTDE(object):
             raise RTDEException("Unable to negotiate protocol version")
 
     def disconnect(self):
+        self.stop_reader()
         if self.__sock:
             self.__sock.close()
             self.__sock = None
         self.__conn_state = ConnectionState.DISCONNECTED
 
+    def reconnect(self, max_attempts=None):
+        """Reconnect and restore the session after the connection was lost.
+        Protocol negotiation is repeated, the output and input setups are
+        replayed in their original order and synchronization and the reader
+        are restarted if they were running. Retries with exponential backoff
+        and raises RTDEException after max_attempts failed attempts.
+        The gap is accounted in stats.missed_packages once data arrives.
+        """
+        if self.__lost_state is not None:
+            was_started = self.__lost_state == ConnectionState.STARTED
+            lost_at = self.__lost_at
+        else:
+            was_started = self.__conn_state == ConnectionState.STARTED
+            lost_at = time.time()
+        # the replayed output setup resets the last timestamp
+        last_timestamp = self.__last_timestamp
+        reader = self.__lost_reader
+        if self.__reader is not None:
+            reader = self.__history.maxlen if self.__history is not None else 0
+        inputs = list(self.__input_setups)
+        self.disconnect()
+
+        backoff = RECONNECT_BACKOFF
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                self.__open()
+                self.__replay_setup(inputs)
+                if was_started and not self.send_start():
+                    raise RTDEException("Unable to restart synchronization")
+                break
+            except (RTDEException, socket.error) as e:
+                self.disconnect()
+                if max_attempts is not None and attempt >= max_attempts:
+                    raise RTDEException("Unable to reconnect: " + str(e))
+                _log.warning("Reconnect attempt %d failed: %s", attempt, e)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, RECONNECT_MAX_BACKOFF)
+
+        _log.info("RTDE reconnected after %d attempt(s)", attempt)
+        self.__stats.reconnects += 1
+        self.__lost_state = None
+        self.__lost_reader = None
+        self.__gap_start = (last_timestamp, lost_at)
+        if was_started and reader is not None:
+            self.start_reader(reader)
+
+    def __replay_setup(self, inputs):
+        self.__input_config = {}
+        self.__input_packets = {}
+        self.__input_packed = {}
+        self.__input_sent_at = {}
+        self.__input_setups = []
+        if self.__output_setup is not None:
+            variables, types, frequency = self.__output_setup
+            if not self.send_output_setup(variables, types, frequency):
+                raise RTDEException("Unable to replay output setup")
+        for variables, types, recipe_id in inputs:
+            data = self.send_input_setup(variables, types)
+            if data is None:
+                raise RTDEException("Unable to replay input setup")
+            if data.recipe_id != recipe_id:
+                raise RTDEException(
+                    "Input recipe id changed from %d to %d"
+                    % (recipe_id, data.recipe_id)
+                )
+
     def is_connected(self):
         return self.__conn_state is not ConnectionState.DISCONNECTED
 
@@ -146,7 +433,10 @@ class RTDE(object):
         cmd = Command.RTDE_CONTROL_PACKAGE_SETUP_INPUTS
         payload = bytearray(",".join(variables), "utf-8")
         result = self.__sendAndReceive(cmd, payload)
-        if len(types) != 0 and not self.__list_equals(result.types, types):
+        if result is None:
+            _log.error("No answer to input setup")
+            return None
+        if len(types) != 0 and not list_equals(result.types, types):
             _log.error(
                 "Data type inconsistency for input setup: "
                 + str(types)
@@ -156,14 +446,23 @@ class RTDE(object):
             return None
         result.names = variables
         self.__input_config[result.id] = result
-        return serialize.DataObject.create_empty(variables, result.id)
+        # preallocated packet with the header filled in, see send()
+        packet = bytearray(ring_buffer.HEADER_SIZE + struct.calcsize(result.fmt))
+        ring_buffer.HEADER.pack_into(packet, 0, len(packet), Command.RTDE_DATA_PACKAGE)
+        self.__input_packets[result.id] = packet
+        self.__input_packed.pop(result.id, None)
+        self.__input_setups.append((variables, types, result.id))
+        return serialize.InputDataObject.create_empty(variables, result.id)
 
     def send_output_setup(self, variables, types=[], frequency=125):
         cmd = Command.RTDE_CONTROL_PACKAGE_SETUP_OUTPUTS
         payload = struct.pack(">d", frequency)
         payload = payload + (",".join(variables).encode("utf-8"))
         result = self.__sendAndReceive(cmd, payload)
-        if len(types) != 0 and not self.__list_equals(result.types, types):
+        if result is None:
+            _log.error("No answer to output setup")
+            return False
+        if len(types) != 0 and not list_equals(result.types, types):
             _log.error(
                 "Data type inconsistency for output setup: "
                 + str(types)
@@ -173,6 +472,14 @@ class RTDE(object):
             return False
         result.names = variables
         self.__output_config = result
+        self.__output_setup = (variables, types, frequency)
+        self.__track_timestamp = "timestamp" in variables
+        self.__timestamp_decoder = None
+        self.__last_timestamp = None
+        if self.__timing is not None:
+            self.__timing.configure(frequency, self.__data_packet_size())
+        if self.__clock is not None:
+            self.__clock.configure(frequency)
         return True
 
     def send_start(self):
@@ -195,27 +502,128 @@ class RTDE(object):
             _log.error("RTDE synchronization failed to pause")
         return success
 
-    def send(self, input_data):
+    def send(self, input_data, keepalive=None):
+        """Send an input package.
+        With keepalive, in seconds, objects from send_input_setup only pack
+        the fields assigned as attributes since they were last sent, and a
+        package without assigned fields is not sent unless keepalive
+        seconds passed since it was last sent; suppressed sends return True
+        and are counted in suppressed_send_count. Fields changed in place,
+        e.g. through __dict__, are then not sent. Without keepalive every
+        field is packed.
+        """
         if self.__conn_state != ConnectionState.STARTED:
             _log.error("Cannot send when RTDE synchronization is inactive")
             return
         if not input_data.recipe_id in self.__input_config:
             _log.error("Input configuration id not found: " + str(input_data.recipe_id))
             return
-        config = self.__input_config[input_data.recipe_id]
-        return self.__sendall(Command.RTDE_DATA_PACKAGE, config.pack(input_data))
+        if keepalive is not None and self.__suppress(input_data, keepalive):
+            return True
+        packet = self.__pack_input(input_data, dirty_only=keepalive is not None)
+        if not self.__send_packets([packet]):
+            return False
+        self.__input_sent_at[input_data.recipe_id] = time.monotonic()
+        return True
+
+    def send_batch(self, inputs, keepalive=None):
+        """Send several input packages, e.g. a setpoint and a watchdog kick,
+        with a single system call. keepalive is applied to each as in send().
+        """
+        if self.__conn_state != ConnectionState.STARTED:
+            _log.error("Cannot send when RTDE synchronization is inactive")
+            return
+        packets = []
+        recipe_ids = set()
+        for input_data in inputs:
+            if not input_data.recipe_id in self.__input_config:
+                _log.error(
+                    "Input configuration id not found: " + str(input_data.recipe_id)
+                )
+                return
+            if keepalive is not None and self.__suppress(input_data, keepalive):
+                continue
+            # a recipe sent twice needs its own copy of the packet buffer
+            copy = input_data.recipe_id in recipe_ids
+            recipe_ids.add(input_data.recipe_id)
+            packets.append(
+                self.__pack_input(input_data, copy, dirty_only=keepalive is not None)
+            )
+        if not packets:
+            return True
+        if not self.__send_packets(packets):
+            return False
+        now = time.monotonic()
+        for recipe_id in recipe_ids:
+            self.__input_sent_at[recipe_id] = now
+        return True
+
+    def __suppress(self, input_data, keepalive):
+        """Whether an unchanged input package can be left unsent"""
+        recipe_id = input_data.recipe_id
+        if self.__input_packed.get(recipe_id) is not input_data:
+            return False
+        if getattr(input_data, "dirty_fields", None):
+            return False
+        sent_at = self.__input_sent_at.get(recipe_id)
+        if sent_at is None or time.monotonic() - sent_at >= keepalive:
+            return False
+        self.__suppressed_send_count += 1
+        return True
+
+    def __pack_input(self, input_data, copy=False, dirty_only=False):
+        recipe_id = input_data.recipe_id
+        packet = self.__input_packets[recipe_id]
+        config = self.__input_config[recipe_id]
+        if copy:
+            packet = bytearray(packet)
+            config.pack_into(packet, ring_buffer.HEADER_SIZE, input_data)
+            return packet
+        dirty = getattr(input_data, "dirty_fields", None)
+        if (
+            dirty_only
+            and dirty is not None
+            and self.__input_packed.get(recipe_id) is input_data
+        ):
+            # the packet still holds the other fields of this object
+            if dirty:
+                config.pack_fields_into(
+                    packet, ring_buffer.HEADER_SIZE, input_data, dirty
+                )
+                dirty.clear()
+            return packet
+        config.pack_into(packet, ring_buffer.HEADER_SIZE, input_data)
+        if dirty is not None:
+            dirty.clear()
+            self.__input_packed[recipe_id] = input_data
+        else:
+            self.__input_packed.pop(recipe_id, None)
+        return packet
 
     def receive(self, binary=False):
         """Recieve the latest data package.
         If muliple packages has been received, older ones are discarded
         and only the newest one will be returned. Will block untill a package
-        is received or the connection is lost
+        is received or the connection is lost. With auto_reconnect the
+        session is restored instead of raising when the connection is lost.
         """
         if self.__output_config is None:
             raise RTDEException("Output configuration not initialized")
+        if self.__should_reconnect():
+            self.reconnect()
         if self.__conn_state != ConnectionState.STARTED:
             raise RTDEException("Cannot receive when RTDE synchronization is inactive")
-        return self.__recv(Command.RTDE_DATA_PACKAGE, binary)
+        try:
+            if self.__reader is not None:
+                if binary:
+                    raise RTDEException("Binary receive is not supported by the reader")
+                return self.__receive_from_reader()
+            return self.__recv(Command.RTDE_DATA_PACKAGE, binary)
+        except RTDEException:
+            if not self.__should_reconnect():
+                raise
+        self.reconnect()
+        return self.receive(binary)
 
     def receive_buffered(self, binary=False, buffer_limit=None):
         """Recieve the next data package.
@@ -227,23 +635,383 @@ class RTDE(object):
         if self._RTDE__output_config is None:
             logging.error("Output configuration not initialized")
             return None
+        if self.__reader is not None:
+            raise RTDEException("Cannot receive buffered while the reader is running")
 
         try:
-            while (
-                self.is_connected()
-                and (buffer_limit == None or len(self.__buf) < buffer_limit)
-                and self.__recv_to_buffer(0)
-            ):
-                pass
+            if self.__queue is not None:
+                self.__fill_queue()
+            else:
+                while (
+                    self.is_connected()
+                    and (buffer_limit == None or len(self.__buf) < buffer_limit)
+                    and self.__recv_to_buffer(0)
+                ):
+                    pass
         except RTDEException as e:
-            data = self.__recv_from_buffer(Command.RTDE_DATA_PACKAGE, binary)
-            if data == None:
+            data = self.__next_buffered(binary)
+            if data == None and not self.__should_reconnect():
                 raise e
         else:
-            data = self.__recv_from_buffer(Command.RTDE_DATA_PACKAGE, binary)
+            data = self.__next_buffered(binary)
 
+        if data is None and self.__should_reconnect():
+            self.reconnect()
         return data
 
+    def set_buffer_policy(
+        self, policy, max_packets=packet_queue.DEFAULT_MAX_PACKETS, spill_dir=None
+    ):
+        """Bound the packages held by receive_buffered to max_packets.
+        When the limit is reached new packages either replace the oldest
+        one (packet_queue.DROP_OLDEST), are discarded (DROP_NEWEST), stay
+        unread in the socket (BLOCK) or are written to a temporary file in
+        spill_dir (SPILL_TO_DISK) and returned once the consumer catches up.
+        Drops and spills are counted in stats. buffer_limit of
+        receive_buffered is ignored while a policy is set. A policy of None
+        restores unbounded buffering and discards the queued packages.
+        """
+        if self.__queue is not None:
+            self.__queue.close()
+            self.__queue = None
+        if policy is not None:
+            self.__queue = packet_queue.PacketQueue(policy, max_packets, spill_dir)
+
+    @property
+    def queued_package_count(self):
+        """Packages held for receive_buffered under a buffer policy"""
+        if self.__queue is None:
+            return 0
+        return len(self.__queue)
+
+    def __fill_queue(self):
+        """Move the data packages from the socket to the bounded queue"""
+        queue = self.__queue
+        block = queue.policy == packet_queue.BLOCK
+        while True:
+            if block and queue.full():
+                return
+            packet = self.__buf.next_packet()
+            if packet is None:
+                if not (self.is_connected() and self.__recv_to_buffer(0)):
+                    return
+                continue
+            command, payload = packet
+            if command != Command.RTDE_DATA_PACKAGE:
+                self.__on_packet(command, payload)
+                continue
+            result = queue.put(payload, self.__buf.arrival)
+            if result == packet_queue.DROPPED:
+                self.__stats.dropped_packages += 1
+                if self.__clock is not None:
+                    self.__clock.skip()
+            elif result == packet_queue.SPILLED:
+                self.__stats.spilled_packages += 1
+
+    def __next_buffered(self, binary):
+        if self.__queue is None:
+            return self.__recv_from_buffer(Command.RTDE_DATA_PACKAGE, binary)
+        payload = self.__queue.get()
+        if payload is None:
+            return None
+        if binary:
+            return self.__binary_data(payload, self.__queue.arrival)
+        return self.__decode_data(payload, self.__queue.arrival)
+
+    def receive_batch(self, max_packets=None):
+        """Recieve all buffered data packages at once.
+        Reads whatever data is available without blocking and decodes all
+        complete data packages into a NumPy structured array with one field
+        per output variable. At most max_packets packages are returned, the
+        remaining ones stay buffered for the next call.
+        Returns an empty array if no data is available.
+        With timing or clock sync enabled, batch_arrivals then holds the
+        arrival time of each package and every package is decoded and timed
+        on its own, which is slower than decoding the batch at once.
+        """
+        if self.__output_config is None:
+            raise RTDEException("Output configuration not initialized")
+        if self.__reader is not None:
+            raise RTDEException("Cannot receive batch while the reader is running")
+
+        try:
+            while self.is_connected() and self.__recv_to_buffer(0):
+                pass
+        except RTDEException as e:
+            if len(self.__buf) == 0:
+                raise e
+
+        import numpy as np
+
+        config = self.__output_config
+        # header (size, command) and recipe id precede the fields
+        packet_size = ring_buffer.HEADER_SIZE + struct.calcsize(config.fmt)
+        frame_dtype = config.get_dtype(ring_buffer.HEADER_SIZE + 1, packet_size)
+        dtype = config.get_dtype()
+
+        batches = []
+        arrivals = []
+        count = 0
+        while max_packets is None or count < max_packets:
+            remaining = None if max_packets is None else max_packets - count
+            n, view = self.__buf.next_run(
+                Command.RTDE_DATA_PACKAGE, packet_size, remaining
+            )
+            if n:
+                frames = np.frombuffer(view, dtype=frame_dtype)
+                if self.__timing is None:
+                    # astype copies the records out of the receive buffer
+                    batches.append(frames.astype(dtype))
+                else:
+                    batches.append(self.__decode_timed(frames, dtype))
+                if self.__buf.arrivals is not None:
+                    arrivals.extend(self.__buf.arrivals)
+                count += n
+                self.__stats.decoded_packages += n
+                continue
+            packet = self.__buf.next_packet()
+            if packet is None:
+                break
+            self.__on_packet(packet[0], packet[1])
+
+        self.__batch_arrivals = None
+        if self.__timing is not None or self.__clock is not None:
+            self.__batch_arrivals = np.array(
+                [np.nan if t is None else t for t in arrivals], dtype=float
+            )
+        if len(batches) == 1:
+            return batches[0]
+        if len(batches) == 0:
+            return np.empty(0, dtype=dtype)
+        return np.concatenate(batches)
+
+    def __decode_timed(self, frames, dtype):
+        import numpy as np
+
+        batch = np.empty(len(frames), dtype=dtype)
+        arrivals = self.__buf.arrivals or [None] * len(frames)
+        for i in range(len(frames)):
+            start = time.perf_counter()
+            batch[i] = frames[i]
+            self.__timing.on_packages(1, time.perf_counter() - start, [arrivals[i]])
+        return batch
+
+    @property
+    def batch_arrivals(self):
+        """Monotonic arrival times of the packages of the last receive_batch,
+        NaN where unknown, None unless timing or clock sync is enabled
+        """
+        return self.__batch_arrivals
+
+    def receive_frames(self, max_packets=None):
+        """Recieve all buffered data packages undecoded.
+        Reads whatever data is available without blocking and returns
+        (count, frames), frames being the bytes of count complete data
+        packages including their headers, for decoding elsewhere, e.g. in
+        other processes. At most max_packets packages are returned.
+        """
+        if self.__output_config is None:
+            raise RTDEException("Output configuration not initialized")
+        if self.__reader is not None:
+            raise RTDEException("Cannot receive frames while the reader is running")
+
+        try:
+            while self.is_connected() and self.__recv_to_buffer(0):
+                pass
+        except RTDEException as e:
+            if len(self.__buf) == 0:
+                raise e
+
+        packet_size = self.__data_packet_size()
+        runs = []
+        arrivals = [] if self.__timing is not None else None
+        count = 0
+        while max_packets is None or count < max_packets:
+            remaining = None if max_packets is None else max_packets - count
+            n, view = self.__buf.next_run(
+                Command.RTDE_DATA_PACKAGE, packet_size, remaining
+            )
+            if n:
+                runs.append(bytes(view))
+                count += n
+                if arrivals is not None:
+                    arrivals.extend(self.__buf.arrivals)
+                continue
+            packet = self.__buf.next_packet()
+            if packet is None:
+                break
+            self.__on_packet(packet[0], packet[1])
+        self.__stats.decoded_packages += count
+        if self.__timing is not None and count:
+            self.__timing.on_packages(count, arrivals=arrivals)
+        return count, b"".join(runs)
+
+    def fileno(self):
+        """File descriptor of the connection, for use with selectors"""
+        if self.__sock is None:
+            raise RTDEException("Not connected")
+        return self.__sock.fileno()
+
+    def receive_ready(self):
+        """Recieve all data packages from a socket that is known to be readable.
+        Reads once without waiting and returns the decoded data packages that
+        are complete, oldest first. Intended for callers that multiplex many
+        connections on their own selector, like RTDEPool. With auto_reconnect
+        a lost session is restored, replacing the socket, see fileno().
+        """
+        if self.__output_config is None:
+            raise RTDEException("Output configuration not initialized")
+        if self.__reader is not None:
+            raise RTDEException("Cannot receive while the reader is running")
+        if self.__should_reconnect():
+            self.reconnect()
+            return []
+        if self.__sock is None:
+            raise RTDEException("Not connected")
+        packages = []
+        if not self.__buf.is_full():
+            try:
+                received = self.__buf.recv_into(self.__sock)
+            except socket.error as e:
+                _log.error("receive from Controller failed: " + str(e))
+                received = None
+            if not received:
+                if received == 0:
+                    _log.error(
+                        "received 0 bytes from Controller, probable cause: Controller has stopped"
+                    )
+                self.__trigger_disconnected()
+                if self.__should_reconnect():
+                    self.reconnect()
+                    return packages
+                raise RTDEException("receive from Controller failed")
+            if self.__timing is not None:
+                self.__timing.on_recv(received, len(self.__buf))
+        packet = self.__buf.next_packet()
+        while packet is not None:
+            command, payload = packet
+            data = self.__on_packet(command, payload)
+            if command == Command.RTDE_DATA_PACKAGE:
+                packages.append(data)
+            packet = self.__buf.next_packet()
+        return packages
+
+    def start_reader(self, history_size=0):
+        """Hand the connection over to a background reader thread.
+        The reader drains the socket continuously and publishes the newest
+        data package into a slot that get_latest() reads without blocking;
+        receive() then waits for a package it has not returned yet.
+        With history_size > 0 the last history_size packages are also kept
+        for receive_history(). Control commands stop the reader first.
+        """
+        if self.__output_config is None:
+            raise RTDEException("Output configuration not initialized")
+        if self.__conn_state != ConnectionState.STARTED:
+            raise RTDEException(
+                "Cannot start reader when RTDE synchronization is inactive"
+            )
+        if self.__reader is not None:
+            return
+
+        with self.__reader_cond:
+            self.__reader_error = None
+            self.__latest = None
+            self.__latest_unread = False
+            self.__latest_overwritten_count = 0
+            self.__history_overwritten_count = 0
+            if history_size > 0:
+                self.__history = collections.deque(maxlen=history_size)
+            else:
+                self.__history = None
+        self.__reader_stop.clear()
+        self.__reader = threading.Thread(
+            target=self.__reader_loop, name="rtde-reader", daemon=True
+        )
+        self.__reader.start()
+
+    def stop_reader(self):
+        """Stop the background reader, may take up to DEFAULT_TIMEOUT"""
+        reader = self.__reader
+        if reader is None:
+            return
+        self.__reader_stop.set()
+        if reader is not threading.current_thread():
+            reader.join()
+        self.__reader = None
+
+    def get_latest(self):
+        """The newest data package published by the reader, or None"""
+        with self.__reader_cond:
+            self.__latest_unread = False
+            return self.__latest
+
+    def receive_history(self):
+        """Returns and clears the packages kept by the reader, oldest first"""
+        with self.__reader_cond:
+            if self.__history is None:
+                return []
+            history = list(self.__history)
+            self.__history.clear()
+            return history
+
+    def __receive_from_reader(self):
+        with self.__reader_cond:
+            self.__reader_cond.wait_for(
+                lambda: self.__latest_unread or not self.__reader_alive(),
+                DEFAULT_TIMEOUT,
+            )
+            if self.__latest_unread:
+                self.__latest_unread = False
+                return self.__latest
+            if self.__reader_error is not None:
+                raise self.__reader_error
+            return None
+
+    def __reader_alive(self):
+        return self.__reader is not None and self.__reader.is_alive()
+
+    def __reader_loop(self):
+        keep_history = self.__history is not None
+        try:
+            while not self.__reader_stop.is_set() and self.is_connected():
+                try:
+                    self.__recv_to_buffer(DEFAULT_TIMEOUT)
+                except RTDETimeoutException:
+                    continue
+                if not keep_history:
+                    # only the newest package is decoded and published
+                    latest = self.__scan_to_latest_data()
+                    if latest is not None:
+                        self.__publish(self.__decode_data(*latest))
+                    continue
+                packet = self.__buf.next_packet()
+                while packet is not None:
+                    command, payload = packet
+                    data = self.__on_packet(command, payload)
+                    if command == Command.RTDE_DATA_PACKAGE:
+                        self.__publish(data)
+                    packet = self.__buf.next_packet()
+        except RTDEException as e:
+            self.__reader_error = e
+        except (socket.error, ValueError) as e:
+            if not self.__reader_stop.is_set():
+                self.__reader_error = RTDEException(str(e))
+        finally:
+            with self.__reader_cond:
+                self.__reader_cond.notify_all()
+
+    def __publish(self, data):
+        with self.__reader_cond:
+            if self.__latest_unread:
+                self.__latest_overwritten_count += 1
+            self.__latest = data
+            self.__latest_unread = True
+            if self.__history is not None:
+                if len(self.__history) == self.__history.maxlen:
+                    self.__history_overwritten_count += 1
+                self.__history.append(data)
+            self.__reader_cond.notify_all()
+
     def send_message(
         self, message, source="Python Client", type=serialize.Message.INFO_MESSAGE
     ):
@@ -253,47 +1021,125 @@ class RTDE(object):
         return self.__sendall(cmd, payload)
 
     def __on_packet(self, cmd, payload):
-        if cmd == Command.RTDE_REQUEST_PROTOCOL_VERSION:
-            return self.__unpack_protocol_version_package(payload)
-        elif cmd == Command.RTDE_GET_URCONTROL_VERSION:
-            return self.__unpack_urcontrol_version_package(payload)
-        elif cmd == Command.RTDE_TEXT_MESSAGE:
-            return self.__unpack_text_message(payload)
-        elif cmd == Command.RTDE_CONTROL_PACKAGE_SETUP_OUTPUTS:
-            return self.__unpack_setup_outputs_package(payload)
-        elif cmd == Command.RTDE_CONTROL_PACKAGE_SETUP_INPUTS:
-            return self.__unpack_setup_inputs_package(payload)
-        elif cmd == Command.RTDE_CONTROL_PACKAGE_START:
-            return self.__unpack_start_package(payload)
-        elif cmd == Command.RTDE_CONTROL_PACKAGE_PAUSE:
-            return self.__unpack_pause_package(payload)
-        elif cmd == Command.RTDE_DATA_PACKAGE:
-            return self.__unpack_data_package(payload, self.__output_config)
+        if cmd == Command.RTDE_DATA_PACKAGE:
+            return self.__decode_data(payload, self.__buf.arrival)
+        if cmd == Command.RTDE_TEXT_MESSAGE:
+            self.__stats.text_messages += 1
+        return unpack_packet(cmd, payload, self.__output_config, self.__protocolVersion)
+
+    def __decode_data(self, payload, arrival=None):
+        self.__stats.decoded_packages += 1
+        if self.__timing is not None:
+            start = time.perf_counter()
+        data = unpack_packet(
+            Command.RTDE_DATA_PACKAGE,
+            payload,
+            self.__output_config,
+            self.__protocolVersion,
+        )
+        if self.__timing is not None:
+            self.__timing.on_packages(1, time.perf_counter() - start, [arrival])
+        if self.__track_timestamp:
+            if self.__gap_start is not None:
+                self.__account_gap(data.timestamp)
+            self.__last_timestamp = data.timestamp
+            if self.__clock is not None:
+                data.host_time = self.__clock.update(
+                    data.timestamp, self.__wall_time(arrival)
+                )
+        return data
+
+    def __binary_data(self, payload, arrival=None):
+        """Count a data package that is returned undecoded.
+        Only the timestamp is decoded, for gap accounting.
+        """
+        self.__stats.decoded_packages += 1
+        if self.__timing is not None:
+            self.__timing.on_packages(1, arrivals=[arrival])
+        if self.__track_timestamp:
+            timestamp = self.__decode_timestamp(payload)
+            if self.__gap_start is not None:
+                self.__account_gap(timestamp)
+            self.__last_timestamp = timestamp
+            if self.__clock is not None:
+                self.__clock.update(timestamp, self.__wall_time(arrival))
+        return bytes(payload[1:])
+
+    def __decode_timestamp(self, payload):
+        if self.__timestamp_decoder is None:
+            config = self.__output_config
+            self.__timestamp_decoder = config.projection(["timestamp"])
+        return self.__timestamp_decoder(payload).timestamp
+
+    def __wall_time(self, arrival):
+        """Wall clock time of a monotonic arrival time"""
+        if arrival is None:
+            return time.time()
+        return arrival + (time.time() - time.monotonic())
+
+    def __skip_data(self, payload, arrival=None):
+        self.__stats.skipped_packages += 1
+        if self.__gap_start is not None and self.__track_timestamp:
+            # the gap ends at the first package received, decoded or not
+            timestamp = self.__decode_timestamp(payload)
+            self.__account_gap(timestamp)
+            self.__last_timestamp = timestamp
+        if self.__clock is not None:
+            self.__clock.skip()
+        if self.__timing is not None:
+            self.__timing.on_packages(1, arrivals=[arrival])
+
+    def __data_packet_size(self):
+        if self.__output_config is None:
+            return None
+        return ring_buffer.HEADER_SIZE + struct.calcsize(self.__output_config.fmt)
+
+    def __account_gap(self, timestamp):
+        last_timestamp, lost_at = self.__gap_start
+        self.__gap_start = None
+        frequency = self.__output_setup[2]
+        if last_timestamp is not None and timestamp > last_timestamp:
+            gap = timestamp - last_timestamp
         else:
-            _log.error("Unknown package command: " + str(cmd))
+            # the controller restarted and its clock started over
+            gap = time.time() - lost_at
+        missed = max(0, int(round(gap * frequency)) - 1)
+        self.__stats.missed_packages += missed
+        _log.warning("RTDE data gap of %.3f seconds, %d packages missed", gap, missed)
+
+    def __should_reconnect(self):
+        return self.__auto_reconnect and self.__lost_state is not None
 
     def __sendAndReceive(self, cmd, payload=b""):
+        self.stop_reader()
         if self.__sendall(cmd, payload):
             return self.__recv(cmd)
         else:
             return None
 
     def __sendall(self, command, payload=b""):
-        fmt = ">HB"
-        size = struct.calcsize(fmt) + len(payload)
-        buf = struct.pack(fmt, size, command) + payload
+        return self.__send_packets([pack_packet(command, payload)])
 
+    def __send_packets(self, packets):
         if self.__sock is None:
             _log.error("Unable to send: not connected to Robot")
             return False
 
-        _, writable, _ = select.select([], [self.__sock], [], DEFAULT_TIMEOUT)
-        if len(writable):
-            self.__sock.sendall(buf)
-            return True
-        else:
+        # the socket timeout bounds the time spent waiting for the peer
+        try:
+            if len(packets) == 1:
+                self.__sock.sendall(packets[0])
+            elif hasattr(self.__sock, "sendmsg"):
+                sent = self.__sock.sendmsg(packets)
+                if sent < sum(len(p) for p in packets):
+                    self.__sock.sendall(b"".join(packets)[sent:])
+            else:
+                self.__sock.sendall(b"".join(packets))
+        except socket.error as e:
+            _log.error("send to Controller failed: " + str(e))
             self.__trigger_disconnected()
             return False
+        return True
 
     def has_data(self):
         timeout = 0
@@ -307,47 +1153,68 @@ class RTDE(object):
             except RTDETimeoutException:
                 return None
 
-            # unpack_from requires a buffer of at least 3 bytes
-            while len(self.__buf) >= 3:
-                # Attempts to extract a packet
-                packet_header = serialize.ControlHeader.unpack(self.__buf)
+            if command == Command.RTDE_DATA_PACKAGE:
+                latest = self.__scan_to_latest_data()
+                if latest is None:
+                    continue
+                if binary:
+                    return self.__binary_data(*latest)
+                return self.__decode_data(*latest)
 
-                if len(self.__buf) >= packet_header.size:
-                    packet, self.__buf = (
-                        self.__buf[3 : packet_header.size],
-                        self.__buf[packet_header.size :],
-                    )
-                    data = self.__on_packet(packet_header.command, packet)
-                    if len(self.__buf) >= 3 and command == Command.RTDE_DATA_PACKAGE:
-                        next_packet_header = serialize.ControlHeader.unpack(self.__buf)
-                        if next_packet_header.command == command:
-                            _log.debug("skipping package(1)")
-                            self.__skipped_package_count += 1
-                            continue
-                    if packet_header.command == command:
-                        if binary:
-                            return packet[1:]
-
-                        return data
-                    else:
-                        _log.debug("skipping package(2)")
+            # Extract packets in place, directly from the receive buffer
+            packet = self.__buf.next_packet()
+            while packet is not None:
+                packet_command, payload = packet
+                if packet_command == command:
+                    return self.__on_packet(packet_command, payload)
+                elif packet_command == Command.RTDE_DATA_PACKAGE:
+                    _log.debug("skipping package(2)")
+                    self.__skip_data(payload, self.__buf.arrival)
                 else:
-                    break
+                    self.__on_packet(packet_command, payload)
+                packet = self.__buf.next_packet()
         raise RTDEException(" _recv() Connection lost ")
 
+    def __scan_to_latest_data(self):
+        """Consume all complete packets in the buffer.
+        Returns (payload, arrival) of the newest data package, or None,
+        without decoding the older data packages. Other packets are processed.
+        """
+        latest = None
+        packet = self.__buf.next_packet()
+        while packet is not None:
+            packet_command, payload = packet
+            if packet_command == Command.RTDE_DATA_PACKAGE:
+                if latest is not None:
+                    _log.debug("skipping package(1)")
+                    self.__skip_data(*latest)
+                latest = (payload, self.__buf.arrival)
+            else:
+                self.__on_packet(packet_command, payload)
+            packet = self.__buf.next_packet()
+        return latest
+
     def __recv_to_buffer(self, timeout):
+        if self.__buf.is_full():
+            return False
         readable, _, xlist = select.select([self.__sock], [], [self.__sock], timeout)
         if len(readable):
-            more = self.__sock.recv(4096)
+            try:
+                received = self.__buf.recv_into(self.__sock)
+            except socket.error as e:
+                _log.error("receive from Controller failed: " + str(e))
+                self.__trigger_disconnected()
+                raise RTDEException("receive from Controller failed")
             # When the controller stops while the script is running
-            if len(more) == 0:
+            if received == 0:
                 _log.error(
                     "received 0 bytes from Controller, probable cause: Controller has stopped"
                 )
                 self.__trigger_disconnected()
                 raise RTDEException("received 0 bytes from Controller")
 
-            self.__buf = self.__buf + more
+            if self.__timing is not None:
+                self.__timing.on_recv(received, len(self.__buf))
             return True
 
         if (
@@ -359,108 +1226,109 @@ class RTDE(object):
         return False
 
     def __recv_from_buffer(self, command, binary=False):
-        # unpack_from requires a buffer of at least 3 bytes
-        while len(self.__buf) >= 3:
-            # Attempts to extract a packet
-            packet_header = serialize.ControlHeader.unpack(self.__buf)
-
-            if len(self.__buf) >= packet_header.size:
-                packet, self.__buf = (
-                    self.__buf[3 : packet_header.size],
-                    self.__buf[packet_header.size :],
-                )
-                data = self.__on_packet(packet_header.command, packet)
-                if packet_header.command == command:
-                    if binary:
-                        return packet[1:]
+        packet = self.__buf.next_packet()
+        while packet is not None:
+            packet_command, payload = packet
+            if binary and packet_command == command == Command.RTDE_DATA_PACKAGE:
+                return self.__binary_data(payload, self.__buf.arrival)
+            data = self.__on_packet(packet_command, payload)
+            if packet_command == command:
+                if binary:
+                    return bytes(payload[1:])
 
-                    return data
-                else:
-                    _log.debug("skipping package(2)")
+                return data
             else:
-                return None
+                _log.debug("skipping package(2)")
+            packet = self.__buf.next_packet()
+        return None
 
     def __trigger_disconnected(self):
         _log.info("RTDE disconnected")
+        self.__lost_state = self.__conn_state
+        self.__lost_at = time.time()
+        if self.__reader is not None:
+            self.__lost_reader = (
+                self.__history.maxlen if self.__history is not None else 0
+            )
         self.disconnect()  # clean-up
 
-    def __unpack_protocol_version_package(self, payload):
-        if len(payload) != 1:
-            _log.error("RTDE_REQUEST_PROTOCOL_VERSION: Wrong payload size")
-            return None
-        result = serialize.ReturnValue.unpack(payload)
-        return result.success
+    @property
+    def output_config(self):
+        """serialize.DataConfig of the output recipe, None before output setup"""
+        return self.__output_config
 
-    def __unpack_urcontrol_version_package(self, payload):
-        if len(payload) != 16:
-            _log.error("RTDE_GET_URCONTROL_VERSION: Wrong payload size")
-            return None
-        version = serialize.ControlVersion.unpack(payload)
-        return version
+    @property
+    def suppressed_send_count(self):
+        """Input packages left unsent by keepalive because nothing changed"""
+        return self.__suppressed_send_count
 
-    def __unpack_text_message(self, payload):
-        if len(payload) < 1:
-            _log.error("RTDE_TEXT_MESSAGE: No payload")
+    @property
+    def output_frequency(self):
+        """Frequency requested in send_output_setup, None before output setup"""
+        if self.__output_setup is None:
             return None
-        if self.__protocolVersion == RTDE_PROTOCOL_VERSION_1:
-            msg = serialize.MessageV1.unpack(payload)
-        else:
-            msg = serialize.Message.unpack(payload)
+        return self.__output_setup[2]
 
-        if (
-            msg.level == serialize.Message.EXCEPTION_MESSAGE
-            or msg.level == serialize.Message.ERROR_MESSAGE
-        ):
-            _log.error(msg.source + ": " + msg.message)
-        elif msg.level == serialize.Message.WARNING_MESSAGE:
-            _log.warning(msg.source + ": " + msg.message)
-        elif msg.level == serialize.Message.INFO_MESSAGE:
-            _log.info(msg.source + ": " + msg.message)
-
-    def __unpack_setup_outputs_package(self, payload):
-        if len(payload) < 1:
-            _log.error("RTDE_CONTROL_PACKAGE_SETUP_OUTPUTS: No payload")
-            return None
-        output_config = serialize.DataConfig.unpack_recipe(payload)
-        return output_config
+    @property
+    def skipped_package_count(self):
+        """The skipped package count, resets on connect"""
+        return self.__stats.skipped_packages
 
-    def __unpack_setup_inputs_package(self, payload):
-        if len(payload) < 1:
-            _log.error("RTDE_CONTROL_PACKAGE_SETUP_INPUTS: No payload")
-            return None
-        input_config = serialize.DataConfig.unpack_recipe(payload)
-        return input_config
+    @property
+    def stats(self):
+        """ReceiveStats of the connection, resets on connect"""
+        return self.__stats
 
-    def __unpack_start_package(self, payload):
-        if len(payload) != 1:
-            _log.error("RTDE_CONTROL_PACKAGE_START: Wrong payload size")
-            return None
-        result = serialize.ReturnValue.unpack(payload)
-        return result.success
+    def enable_timing(self, bins=timing.JITTER_BINS):
+        """Start collecting receive latency and jitter, returns the
+        timing.ReceiveTiming that is updated from now on.
+        """
+        frequency = None
+        if self.__output_setup is not None:
+            frequency = self.__output_setup[2]
+        self.__timing = timing.ReceiveTiming(frequency, self.__data_packet_size(), bins)
+        self.__buf.track_arrival()
+        return self.__timing
 
-    def __unpack_pause_package(self, payload):
-        if len(payload) != 1:
-            _log.error("RTDE_CONTROL_PACKAGE_PAUSE: Wrong payload size")
-            return None
-        result = serialize.ReturnValue.unpack(payload)
-        return result.success
+    def enable_clock_sync(self, window=60.0):
+        """Start estimating host time from controller timestamps, returns
+        the clock.ClockModel that is updated from now on. Decoded packages
+        get a host_time attribute with the wall clock time at which the
+        controller sampled them. Requires timestamp in the output recipe.
+        """
+        frequency = None
+        if self.__output_setup is not None:
+            frequency = self.__output_setup[2]
+        self.__clock = clock.ClockModel(frequency, window)
+        self.__buf.track_arrival()
+        return self.__clock
 
-    def __unpack_data_package(self, payload, output_config):
-        if output_config is None:
-            _log.error("RTDE_DATA_PACKAGE: Missing output configuration")
-            return None
-        output = output_config.unpack(payload)
-        return output
+    def disable_clock_sync(self):
+        self.__clock = None
+        if self.__timing is None:
+            self.__buf.track_arrival(False)
 
-    def __list_equals(self, l1, l2):
-        if len(l1) != len(l2):
-            return False
-        for i in range(len((l1))):
-            if l1[i] != l2[i]:
-                return False
-        return True
+    @property
+    def clock(self):
+        """The clock.ClockModel in use, None unless enable_clock_sync was called"""
+        return self.__clock
+
+    def disable_timing(self):
+        self.__timing = None
+        if self.__clock is None:
+            self.__buf.track_arrival(False)
 
     @property
-    def skipped_package_count(self):
-        """The skipped package count, resets on connect"""
-        return self.__skipped_package_count
+    def timing(self):
+        """The timing.ReceiveTiming in use, None unless enable_timing was called"""
+        return self.__timing
+
+    @property
+    def latest_overwritten_count(self):
+        """Packages the reader replaced before they were read, resets on start_reader"""
+        return self.__latest_overwritten_count
+
+    @property
+    def history_overwritten_count(self):
+        """Packages dropped from the full reader history, resets on start_reader"""
+        return self.__history_overwritten_count
@@ -0,0 +1,342 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import asyncio
+import collections
+import socket
+import struct
+import logging
+
+from rtde import rtde
+from rtde import serialize
+from rtde import ring_buffer
+from rtde.rtde import (
+    Command,
+    ConnectionState,
+    RTDEException,
+    RTDETimeoutException,
+    RTDE_PROTOCOL_VERSION_1,
+    RTDE_PROTOCOL_VERSION_2,
+)
+
+_log = logging.getLogger(rtde.LOGNAME)
+
+
+class _RTDEProtocol(asyncio.BufferedProtocol):
+    """Receives straight into the client's ring buffer"""
+
+    def __init__(self, buf, on_data, on_connection_lost):
+        self.__buf = buf
+        self.__on_data = on_data
+        self.__on_connection_lost = on_connection_lost
+
+    def get_buffer(self, sizehint):
+        return self.__buf.get_buffer()
+
+    def buffer_updated(self, nbytes):
+        self.__buf.buffer_updated(nbytes)
+        self.__on_data()
+
+    def connection_lost(self, exc):
+        self.__on_connection_lost(exc)
+
+
+class AsyncRTDE(object):
+    """asyncio version of rtde.RTDE.
+
+    Control commands are coroutines that raise RTDETimeoutException when
+    the controller does not answer within timeout seconds. Data packages are
+    decoded as they arrive and queued; iterate the client with async for to
+    get them in order, or await receive() for only the newest one. When
+    queue_size is set, the oldest queued packages are dropped and counted in
+    skipped_package_count once the queue is full.
+    """
+
+    def __init__(
+        self,
+        hostname,
+        port=30004,
+        buffer_size=rtde.DEFAULT_BUFFER_SIZE,
+        timeout=rtde.DEFAULT_TIMEOUT,
+        queue_size=None,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.timeout = timeout
+        self.__buf = ring_buffer.RingBuffer(buffer_size)
+        self.__conn_state = ConnectionState.DISCONNECTED
+        self.__transport = None
+        self.__output_config = None
+        self.__input_config = {}
+        self.__skipped_package_count = 0
+        self.__protocolVersion = RTDE_PROTOCOL_VERSION_1
+        self.__pending = {}
+        self.__packages = collections.deque(maxlen=queue_size)
+        self.__data_event = None
+
+    async def connect(self):
+        if self.__transport:
+            return
+
+        loop = asyncio.get_running_loop()
+        self.__buf.clear()
+        self.__packages.clear()
+        self.__skipped_package_count = 0
+        self.__data_event = asyncio.Event()
+        try:
+            self.__transport, _ = await asyncio.wait_for(
+                loop.create_connection(
+                    lambda: _RTDEProtocol(
+                        self.__buf, self.__on_data, self.__on_connection_lost
+                    ),
+                    self.hostname,
+                    self.port,
+                ),
+                self.timeout,
+            )
+        except asyncio.TimeoutError:
+            raise RTDETimeoutException("Timeout connecting to " + self.hostname)
+        sock = self.__transport.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.__conn_state = ConnectionState.CONNECTED
+        if not await self.negotiate_protocol_version():
+            raise RTDEException("Unable to negotiate protocol version")
+
+    def disconnect(self):
+        transport = self.__transport
+        self.__transport = None
+        if transport:
+            transport.close()
+        self.__conn_state = ConnectionState.DISCONNECTED
+        self.__abort_pending(RTDEException("Disconnected"))
+
+    def is_connected(self):
+        return self.__conn_state is not ConnectionState.DISCONNECTED
+
+    async def get_controller_version(self):
+        cmd = Command.RTDE_GET_URCONTROL_VERSION
+        version = await self.__send_and_receive(cmd)
+        if version:
+            _log.info(
+                "Controller version: %d.%d.%d.%d",
+                version.major,
+                version.minor,
+                version.bugfix,
+                version.build,
+            )
+            return version.major, version.minor, version.bugfix, version.build
+        return None, None, None, None
+
+    async def negotiate_protocol_version(self):
+        cmd = Command.RTDE_REQUEST_PROTOCOL_VERSION
+        payload = struct.pack(">H", RTDE_PROTOCOL_VERSION_2)
+        success = await self.__send_and_receive(cmd, payload)
+        if success:
+            self.__protocolVersion = RTDE_PROTOCOL_VERSION_2
+        return success
+
+    async def send_input_setup(self, variables, types=[]):
+        cmd = Command.RTDE_CONTROL_PACKAGE_SETUP_INPUTS
+        payload = bytearray(",".join(variables), "utf-8")
+        result = await self.__send_and_receive(cmd, payload)
+        if result is None:
+            _log.error("No answer to input setup")
+            return None
+        if len(types) != 0 and not rtde.list_equals(result.types, types):
+            _log.error(
+                "Data type inconsistency for input setup: "
+                + str(types)
+                + " - "
+                + str(result.types)
+            )
+            return None
+        result.names = variables
+        self.__input_config[result.id] = result
+        return serialize.DataObject.create_empty(variables, result.id)
+
+    async def send_output_setup(self, variables, types=[], frequency=125):
+        cmd = Command.RTDE_CONTROL_PACKAGE_SETUP_OUTPUTS
+        payload = struct.pack(">d", frequency)
+        payload = payload + (",".join(variables).encode("utf-8"))
+        result = await self.__send_and_receive(cmd, payload)
+        if result is None:
+            _log.error("No answer to output setup")
+            return False
+        if len(types) != 0 and not rtde.list_equals(result.types, types):
+            _log.error(
+                "Data type inconsistency for output setup: "
+                + str(types)
+                + " - "
+                + str(result.types)
+            )
+            return False
+        result.names = variables
+        self.__output_config = result
+        return True
+
+    async def send_start(self):
+        cmd = Command.RTDE_CONTROL_PACKAGE_START
+        success = await self.__send_and_receive(cmd)
+        if success:
+            _log.info("RTDE synchronization started")
+            self.__conn_state = ConnectionState.STARTED
+        else:
+            _log.error("RTDE synchronization failed to start")
+        return success
+
+    async def send_pause(self):
+        cmd = Command.RTDE_CONTROL_PACKAGE_PAUSE
+        success = await self.__send_and_receive(cmd)
+        if success:
+            _log.info("RTDE synchronization paused")
+            self.__conn_state = ConnectionState.PAUSED
+            self.__data_event.set()
+        else:
+            _log.error("RTDE synchronization failed to pause")
+        return success
+
+    def send(self, input_data):
+        if self.__conn_state != ConnectionState.STARTED:
+            _log.error("Cannot send when RTDE synchronization is inactive")
+            return
+        if not input_data.recipe_id in self.__input_config:
+            _log.error("Input configuration id not found: " + str(input_data.recipe_id))
+            return
+        config = self.__input_config[input_data.recipe_id]
+        return self.__write(Command.RTDE_DATA_PACKAGE, config.pack(input_data))
+
+    async def receive(self, timeout=None):
+        """Recieve the latest data package.
+        Older queued packages are discarded. Waits until a package is
+        received, raises RTDETimeoutException if none arrives within timeout
+        and RTDEException if synchronization is paused meanwhile.
+        """
+        if self.__output_config is None:
+            raise RTDEException("Output configuration not initialized")
+        if self.__conn_state != ConnectionState.STARTED:
+            raise RTDEException("Cannot receive when RTDE synchronization is inactive")
+        await self.__wait_for_data(timeout)
+        if not self.__packages:
+            # paused while waiting
+            raise RTDEException("Cannot receive when RTDE synchronization is inactive")
+        self.__skipped_package_count += len(self.__packages) - 1
+        data = self.__packages.pop()
+        self.__packages.clear()
+        return data
+
+    def receive_buffered(self):
+        """Returns the next queued data package or None if none is queued"""
+        if self.__packages:
+            return self.__packages.popleft()
+        return None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.__packages:
+            if self.__conn_state != ConnectionState.STARTED:
+                raise StopAsyncIteration
+            await self.__wait_for_data(None)
+            if not self.__packages:
+                raise StopAsyncIteration
+        return self.__packages.popleft()
+
+    async def __wait_for_data(self, timeout):
+        if timeout is None:
+            timeout = self.timeout
+        while not self.__packages:
+            if self.__conn_state == ConnectionState.DISCONNECTED:
+                raise RTDEException("Connection lost")
+            if self.__conn_state != ConnectionState.STARTED:
+                return
+            self.__data_event.clear()
+            try:
+                await asyncio.wait_for(self.__data_event.wait(), timeout)
+            except asyncio.TimeoutError:
+                _log.warning("no data received in last %d seconds ", timeout)
+                raise RTDETimeoutException("no data received within timeout")
+
+    async def __send_and_receive(self, cmd, payload=b"", timeout=None):
+        if timeout is None:
+            timeout = self.timeout
+        future = asyncio.get_running_loop().create_future()
+        self.__pending[cmd] = future
+        try:
+            if not self.__write(cmd, payload):
+                return None
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise RTDETimeoutException(
+                "no answer to command " + str(cmd) + " within timeout"
+            )
+        finally:
+            if self.__pending.get(cmd) is future:
+                del self.__pending[cmd]
+
+    def __write(self, command, payload=b""):
+        if self.__transport is None:
+            _log.error("Unable to send: not connected to Robot")
+            return False
+        self.__transport.write(rtde.pack_packet(command, payload))
+        return True
+
+    def __on_data(self):
+        packet = self.__buf.next_packet()
+        while packet is not None:
+            command, payload = packet
+            data = rtde.unpack_packet(
+                command, payload, self.__output_config, self.__protocolVersion
+            )
+            if command == Command.RTDE_DATA_PACKAGE:
+                if len(self.__packages) == self.__packages.maxlen:
+                    self.__skipped_package_count += 1
+                self.__packages.append(data)
+                self.__data_event.set()
+            else:
+                future = self.__pending.pop(command, None)
+                if future is not None and not future.done():
+                    future.set_result(data)
+            packet = self.__buf.next_packet()
+
+    def __on_connection_lost(self, exc):
+        if self.__transport is None:
+            return  # closed by disconnect()
+        _log.info("RTDE disconnected")
+        self.__transport = None
+        self.__conn_state = ConnectionState.DISCONNECTED
+        self.__abort_pending(RTDEException("Connection lost"))
+
+    def __abort_pending(self, exc):
+        for future in self.__pending.values():
+            if not future.done():
+                future.set_exception(exc)
+        self.__pending.clear()
+        if self.__data_event is not None:
+            self.__data_event.set()
+
+    @property
+    def skipped_package_count(self):
+        """The skipped package count, resets on connect"""
+        return self.__skipped_package_count
@@ -0,0 +1,148 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import collections
+import selectors
+import socket
+import logging
+
+from rtde import rtde
+from rtde.rtde import RTDEException
+
+_log = logging.getLogger(rtde.LOGNAME)
+
+
+class _Subscription(object):
+    __slots__ = ["con", "callback", "queue", "dropped", "reconnects"]
+
+    def __init__(self, con, callback, queue):
+        self.con = con
+        self.callback = callback
+        self.queue = queue
+        self.dropped = 0
+        self.reconnects = con.stats.reconnects
+
+
+class RTDEPool(object):
+    """Receives data packages from many RTDE connections on one selector.
+
+    Connections are set up and started as usual and then registered with
+    the pool. Every call to poll() waits once for any of the sockets to
+    become readable and delivers the decoded packages of each ready
+    connection, in order, to its callback or queue. Connections with
+    auto_reconnect are registered again with their new socket after a
+    reconnect.
+    """
+
+    def __init__(self):
+        self.__selector = selectors.DefaultSelector()
+        self.__running = False
+
+    def register(self, con, callback=None, queue_size=None):
+        """Add a started connection to the pool.
+        If callback is given it is called as callback(con, package) for each
+        data package. Otherwise packages are appended to a deque, bounded by
+        queue_size, which is returned; when it is full the oldest package is
+        dropped and counted in dropped_count.
+        """
+        queue = None
+        if callback is None:
+            queue = collections.deque(maxlen=queue_size)
+        subscription = _Subscription(con, callback, queue)
+        self.__selector.register(con.fileno(), selectors.EVENT_READ, subscription)
+        return queue
+
+    def unregister(self, con):
+        for key in list(self.__selector.get_map().values()):
+            if key.data.con is con:
+                self.__selector.unregister(key.fileobj)
+                return
+
+    @property
+    def connections(self):
+        return [key.data.con for key in self.__selector.get_map().values()]
+
+    def dropped_count(self, con):
+        """Packages dropped from the full queue of con"""
+        for key in self.__selector.get_map().values():
+            if key.data.con is con:
+                return key.data.dropped
+        return 0
+
+    def poll(self, timeout=rtde.DEFAULT_TIMEOUT):
+        """Deliver packages from all connections that are ready within timeout.
+        Connections that are lost are logged and unregistered.
+        Returns the number of packages delivered.
+        """
+        self.__register_reconnected()
+        delivered = 0
+        for key, _ in self.__selector.select(timeout):
+            subscription = key.data
+            try:
+                packages = subscription.con.receive_ready()
+            except (RTDEException, socket.error) as e:
+                _log.error(
+                    "Connection to " + subscription.con.hostname + " lost: " + str(e)
+                )
+                self.__selector.unregister(key.fileobj)
+                continue
+            if subscription.callback is not None:
+                for package in packages:
+                    subscription.callback(subscription.con, package)
+            else:
+                queue = subscription.queue
+                if queue.maxlen is not None:
+                    overflow = len(queue) + len(packages) - queue.maxlen
+                    if overflow > 0:
+                        subscription.dropped += overflow
+                queue.extend(packages)
+            delivered += len(packages)
+        return delivered
+
+    def __register_reconnected(self):
+        # the socket of a reconnected connection is new, even if its
+        # descriptor number was reused
+        for key in list(self.__selector.get_map().values()):
+            subscription = key.data
+            reconnects = subscription.con.stats.reconnects
+            if reconnects == subscription.reconnects:
+                continue
+            subscription.reconnects = reconnects
+            self.__selector.unregister(key.fileobj)
+            if subscription.con.is_connected():
+                self.__selector.register(
+                    subscription.con.fileno(), selectors.EVENT_READ, subscription
+                )
+
+    def run(self, timeout=rtde.DEFAULT_TIMEOUT):
+        """Poll until stop() is called or no connections are left"""
+        self.__running = True
+        while self.__running and self.__selector.get_map():
+            self.poll(timeout)
+
+    def stop(self):
+        self.__running = False
+
+    def close(self):
+        """Unregister all connections, the connections are left open"""
+        self.__selector.close()
@@ -22,6 +22,7 @@
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import struct
+import keyword
 
 
 class ControlHeader(object):
@@ -103,6 +104,31 @@ def get_item_size(data_type):
     return 1
 
 
+def get_struct_format(data_type):
+    """struct format characters of data_type, without byte order"""
+    if data_type == "INT32":
+        return "i"
+    elif data_type == "UINT32":
+        return "I"
+    elif data_type == "VECTOR6D":
+        return "d" * 6
+    elif data_type == "VECTOR3D":
+        return "d" * 3
+    elif data_type == "VECTOR6INT32":
+        return "i" * 6
+    elif data_type == "VECTOR6UINT32":
+        return "I" * 6
+    elif data_type == "DOUBLE":
+        return "d"
+    elif data_type == "UINT64":
+        return "Q"
+    elif data_type == "UINT8":
+        return "B"
+    elif data_type == "BOOL":
+        return "?"
+    raise ValueError("Unknown data type: " + data_type)
+
+
 def unpack_field(data, offset, data_type):
     size = get_item_size(data_type)
     if data_type == "VECTOR6D" or data_type == "VECTOR3D":
@@ -122,8 +148,47 @@ def unpack_field(data, offset, data_type):
     raise ValueError("unpack_field: unknown data type: " + data_type)
 
 
+def get_field_structs(names, types):
+    """Map of name to (Struct, offset, is_vector) for each field of a recipe.
+    Offsets count from the start of the payload, after the recipe id.
+    """
+    fields = {}
+    offset = 1
+    for name, data_type in zip(names, types):
+        compiled = struct.Struct(">" + get_struct_format(data_type))
+        fields[name] = (compiled, offset, data_type.startswith("VECTOR"))
+        offset += compiled.size
+    return fields
+
+
+def get_numpy_type(data_type):
+    """Big-endian NumPy type and shape matching the struct format of data_type"""
+    if data_type == "VECTOR6D":
+        return ">f8", (6,)
+    elif data_type == "VECTOR3D":
+        return ">f8", (3,)
+    elif data_type == "VECTOR6INT32":
+        return ">i4", (6,)
+    elif data_type == "VECTOR6UINT32":
+        return ">u4", (6,)
+    elif data_type == "DOUBLE":
+        return ">f8", ()
+    elif data_type == "UINT64":
+        return ">u8", ()
+    elif data_type == "UINT32":
+        return ">u4", ()
+    elif data_type == "INT32":
+        return ">i4", ()
+    elif data_type == "UINT8":
+        return "u1", ()
+    elif data_type == "BOOL":
+        return "?", ()
+    raise ValueError("get_numpy_type: unknown data type: " + data_type)
+
+
 class DataObject(object):
     recipe_id = None
+    host_time = None
 
     def pack(self, names, types):
         if len(names) != len(types):
@@ -161,8 +226,155 @@ class DataObject(object):
         return obj
 
 
+class InputDataObject(DataObject):
+    """Input DataObject that records the fields assigned since it was packed.
+    Only assignments are seen; a vector changed in place must be assigned
+    again to be sent.
+    """
+
+    def __init__(self):
+        self.__dict__["dirty_fields"] = set()
+
+    def __setattr__(self, name, value):
+        self.__dict__[name] = value
+        self.dirty_fields.add(name)
+
+    @staticmethod
+    def create_empty(names, recipe_id):
+        obj = InputDataObject()
+        for i in range(len(names)):
+            obj.__dict__[names[i]] = None
+        obj.__dict__["recipe_id"] = recipe_id
+        return obj
+
+
+class DataRecord(object):
+    """Base of the record classes generated by compile_decoder"""
+
+    __slots__ = ["host_time"]
+
+    def __getattr__(self, name):
+        # only reached for unset slots, host_time is set by clock sync
+        if name == "host_time":
+            return None
+        raise AttributeError(name)
+
+    def __repr__(self):
+        fields = ", ".join(
+            name + "=" + repr(getattr(self, name)) for name in self.__slots__
+        )
+        return type(self).__name__ + "(" + fields + ")"
+
+
+def compile_decoder(names, types, fmt, recipe_id=None):
+    """Generate a decoder function for a recipe.
+    The decoder unpacks a data package payload with a precompiled Struct into
+    an instance of a generated DataRecord class with a slot per field, so no
+    per field type dispatch is done when decoding. Vector fields are tuples.
+    If recipe_id is given, fmt and the payload start after the recipe id.
+    Falls back to DataObject.unpack if a name is not a valid identifier.
+    """
+    if len(names) != len(types):
+        raise ValueError("List sizes are not identical.")
+    compiled = struct.Struct(fmt)
+    for name in names:
+        if not _is_identifier(name) or name == "recipe_id":
+            prefix = () if recipe_id is None else (recipe_id,)
+
+            def decode_object(data):
+                values = prefix + compiled.unpack_from(data)
+                return DataObject.unpack(values, names, types)
+
+            return decode_object
+
+    record = type("DataRecord", (DataRecord,), {"__slots__": ["recipe_id"] + names})
+    lines = [
+        "def decode(data):",
+        "    v = unpack_from(data)",
+        "    obj = new(record)",
+    ]
+    if recipe_id is None:
+        lines.append("    obj.recipe_id = v[0]")
+        offset = 1
+    else:
+        lines.append("    obj.recipe_id = %d" % recipe_id)
+        offset = 0
+    for i in range(len(names)):
+        size = get_item_size(types[i])
+        if types[i].startswith("VECTOR"):
+            value = "v[%d:%d]" % (offset, offset + size)
+        else:
+            value = "v[%d]" % offset
+        lines.append("    obj.%s = %s" % (names[i], value))
+        offset += size
+    lines.append("    return obj")
+    namespace = {
+        "unpack_from": compiled.unpack_from,
+        "new": object.__new__,
+        "record": record,
+    }
+    exec("\n".join(lines), namespace)
+    return namespace["decode"]
+
+
+def compile_encoder(names, types, fmt):
+    """Generate an encoder function for a recipe.
+    The encoder writes the recipe id and the fields of an input DataObject
+    into a writable buffer at an offset with a precompiled Struct, without
+    building an intermediate list. Falls back to DataObject.pack if a name
+    is not a valid identifier.
+    """
+    if len(names) != len(types):
+        raise ValueError("List sizes are not identical.")
+    compiled = struct.Struct(fmt)
+    for name in names:
+        if not _is_identifier(name) or name == "recipe_id":
+
+            def encode_object(buf, offset, obj):
+                compiled.pack_into(buf, offset, *obj.pack(names, types))
+
+            return encode_object
+
+    lines = ["def encode(buf, offset, obj):"]
+    values = ["obj.recipe_id"]
+    for i in range(len(names)):
+        size = get_item_size(types[i])
+        if types[i].startswith("VECTOR"):
+            lines.append("    v%d = obj.%s" % (i, names[i]))
+            values.extend("v%d[%d]" % (i, j) for j in range(size))
+        else:
+            values.append("obj.%s" % names[i])
+    lines.append("    pack_into(buf, offset, %s)" % ", ".join(values))
+    namespace = {"pack_into": compiled.pack_into}
+    exec("\n".join(lines), namespace)
+    encode = namespace["encode"]
+
+    def encode_checked(buf, offset, obj):
+        try:
+            encode(buf, offset, obj)
+        except (struct.error, TypeError):
+            # raises a ValueError naming an uninitialized field, if any
+            obj.pack(names, types)
+            raise
+
+    return encode_checked
+
+
+def _is_identifier(name):
+    if keyword.iskeyword(name):
+        return False
+    if hasattr(name, "isidentifier"):
+        return name.isidentifier()
+    return name.replace("_", "a").isalnum() and not name[0].isdigit()
+
+
 class DataConfig(object):
-    __slots__ = ["id", "names", "types", "fmt"]
+    __slots__ = ["id", "names", "types", "fmt", "__decoder", "__encoder", "__fields"]
+
+    def __init__(self):
+        self.__decoder = None
+        self.__encoder = None
+        self.__fields = None
 
     @staticmethod
     def unpack_recipe(buf):
@@ -171,36 +383,92 @@ class DataConfig(object):
         rmd.types = buf.decode("utf-8")[1:].split(",")
         rmd.fmt = ">B"
         for i in rmd.types:
-            if i == "INT32":
-                rmd.fmt += "i"
-            elif i == "UINT32":
-                rmd.fmt += "I"
-            elif i == "VECTOR6D":
-                rmd.fmt += "d" * 6
-            elif i == "VECTOR3D":
-                rmd.fmt += "d" * 3
-            elif i == "VECTOR6INT32":
-                rmd.fmt += "i" * 6
-            elif i == "VECTOR6UINT32":
-                rmd.fmt += "I" * 6
-            elif i == "DOUBLE":
-                rmd.fmt += "d"
-            elif i == "UINT64":
-                rmd.fmt += "Q"
-            elif i == "UINT8":
-                rmd.fmt += "B"
-            elif i == "BOOL":
-                rmd.fmt += "?"
-            elif i == "IN_USE":
+            if i == "IN_USE":
                 raise ValueError("An input parameter is already in use.")
-            else:
-                raise ValueError("Unknown data type: " + i)
+            rmd.fmt += get_struct_format(i)
         return rmd
 
     def pack(self, state):
-        l = state.pack(self.names, self.types)
-        return struct.pack(self.fmt, *l)
+        buf = bytearray(struct.calcsize(self.fmt))
+        self.pack_into(buf, 0, state)
+        return bytes(buf)
+
+    def pack_into(self, buf, offset, state):
+        """Pack state into a writable buffer at offset"""
+        # the encoder is generated on first use, once names have been set
+        if self.__encoder is None:
+            self.__encoder = compile_encoder(self.names, self.types, self.fmt)
+        self.__encoder(buf, offset, state)
+
+    def pack_fields_into(self, buf, offset, state, names):
+        """Pack only the fields in names into a buffer at offset that already
+        holds a packed package of this recipe. Other names are ignored.
+        """
+        if self.__fields is None:
+            self.__fields = get_field_structs(self.names, self.types)
+        for name in names:
+            field = self.__fields.get(name)
+            if field is None:
+                continue
+            compiled, field_offset, vector = field
+            value = getattr(state, name)
+            if value is None:
+                raise ValueError("Uninitialized parameter: " + name)
+            if vector:
+                compiled.pack_into(buf, offset + field_offset, *value)
+            else:
+                compiled.pack_into(buf, offset + field_offset, value)
 
     def unpack(self, data):
-        li = struct.unpack_from(self.fmt, data)
-        return DataObject.unpack(li, self.names, self.types)
+        # the decoder is generated on first use, once names have been set
+        if self.__decoder is None:
+            self.__decoder = compile_decoder(self.names, self.types, self.fmt)
+        return self.__decoder(data)
+
+    def projection(self, names, with_id=True):
+        """Decoder of only the given fields of a data package.
+        The other fields are skipped as pad bytes and never converted. The
+        record has the fields in recipe order. with_id=False decodes payloads
+        that start after the recipe id, as returned by binary receives.
+        """
+        fmt = ">B" if with_id else ">"
+        fields = []
+        types = []
+        for name, data_type in zip(self.names, self.types):
+            code = get_struct_format(data_type)
+            if name in names:
+                fmt += code
+                fields.append(name)
+                types.append(data_type)
+            else:
+                fmt += "%dx" % struct.calcsize(">" + code)
+        missing = set(names) - set(fields)
+        if missing:
+            raise ValueError("Not in recipe: " + ", ".join(sorted(missing)))
+        return compile_decoder(fields, types, fmt, None if with_id else self.id)
+
+    def get_dtype(self, offset=0, itemsize=None):
+        """NumPy structured dtype for the fields of a data package.
+        Fields are big-endian and laid out as in fmt, excluding the recipe id.
+        offset is the position of the first field and itemsize the record
+        stride, which allows describing packets with their header in front.
+        """
+        import numpy as np
+
+        formats = []
+        offsets = []
+        for data_type in self.types:
+            np_type, shape = get_numpy_type(data_type)
+            formats.append(np.dtype((np_type, shape)))
+            offsets.append(offset)
+            offset += formats[-1].itemsize
+        if itemsize is None:
+            itemsize = offset
+        return np.dtype(
+            {
+                "names": list(self.names),
+                "formats": formats,
+                "offsets": offsets,
+                "itemsize": itemsize,
+            }
+        )
@@ -0,0 +1,310 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Fan-out of one RTDE stream to local processes through shared memory.
+
+A publisher owns the controller connection and writes data packages into
+a ring in multiprocessing.shared_memory. Readers in other processes attach
+by name and get NumPy views of the records, without copying or pickling.
+
+Layout of the shared memory block, little-endian:
+
+    0   magic b"RTDESHM1"
+    8   uint32 capacity, in records
+    12  uint32 record size, in bytes
+    16  uint32 recipe size, in bytes
+    20  uint32 closed flag, set when the publisher stops
+    24  double frequency
+    32  uint64 sequence number of the newest record, 0 while empty
+    40  recipe, "names;types" with comma separated lists
+        records, at the next multiple of 64 bytes
+
+Each record starts with its uint64 sequence number followed by the output
+fields in recipe order, in native byte order. Sequence numbers start at 1
+and record seq is stored in slot (seq - 1) % capacity.
+"""
+
+import logging
+import select
+import struct
+import sys
+import weakref
+
+import numpy as np
+
+from rtde import serialize
+from rtde.rtde import DEFAULT_TIMEOUT, LOGNAME, RTDEException
+
+_log = logging.getLogger(LOGNAME)
+
+MAGIC = b"RTDESHM1"
+HEADER = struct.Struct("<8sIIIId")
+SEQUENCE = struct.Struct("<Q")
+SEQUENCE_OFFSET = 32
+RECIPE_OFFSET = 40
+DEFAULT_CAPACITY = 1 << 14
+
+
+def get_record_dtype(names, types):
+    """Structured dtype of a ring record, sequence number first"""
+    formats = [np.dtype("=u8")]
+    for data_type in types:
+        np_type, shape = serialize.get_numpy_type(data_type)
+        formats.append(np.dtype((np_type.lstrip(">"), shape)))
+    return np.dtype({"names": ["seq"] + list(names), "formats": formats})
+
+
+def _data_offset(recipe_size):
+    return (RECIPE_OFFSET + recipe_size + 63) // 64 * 64
+
+
+def _attach(name):
+    from multiprocessing import resource_tracker, shared_memory
+
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    # readers must not register the block, the resource tracker would
+    # unlink it when a reader exits
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name)
+    finally:
+        resource_tracker.register = register
+
+
+class SharedRingWriter(object):
+    """Creates the shared memory ring and appends records to it"""
+
+    def __init__(
+        self, names, types, frequency=0.0, capacity=DEFAULT_CAPACITY, name=None
+    ):
+        from multiprocessing import shared_memory
+
+        recipe = (",".join(names) + ";" + ",".join(types)).encode("utf-8")
+        self.__dtype = get_record_dtype(names, types)
+        offset = _data_offset(len(recipe))
+        size = offset + capacity * self.__dtype.itemsize
+        self.__shm = shared_memory.SharedMemory(name, create=True, size=size)
+        buf = self.__shm.buf
+        HEADER.pack_into(
+            buf, 0, MAGIC, capacity, self.__dtype.itemsize, len(recipe), 0, frequency
+        )
+        SEQUENCE.pack_into(buf, SEQUENCE_OFFSET, 0)
+        buf[RECIPE_OFFSET : RECIPE_OFFSET + len(recipe)] = recipe
+        self.__records = np.ndarray(capacity, self.__dtype, buffer=buf, offset=offset)
+        self.__fields = self.__records[list(names)]
+        self.__capacity = capacity
+        self.__sequence = 0
+
+    @property
+    def name(self):
+        return self.__shm.name
+
+    @property
+    def sequence(self):
+        """Sequence number of the newest record"""
+        return self.__sequence
+
+    def write(self, batch):
+        """Append a structured array with one field per output variable"""
+        count = len(batch)
+        if count > self.__capacity:
+            self.__sequence += count - self.__capacity
+            batch = batch[count - self.__capacity :]
+            count = self.__capacity
+        done = 0
+        while done < count:
+            start = (self.__sequence + done) % self.__capacity
+            n = min(count - done, self.__capacity - start)
+            records = self.__records[start : start + n]
+            # readers detect records that are overwritten while in use
+            records["seq"] = 0
+            self.__fields[start : start + n] = batch[done : done + n]
+            first = self.__sequence + done + 1
+            records["seq"] = np.arange(first, first + n, dtype=np.uint64)
+            done += n
+        self.__sequence += count
+        SEQUENCE.pack_into(self.__shm.buf, SEQUENCE_OFFSET, self.__sequence)
+
+    def close(self):
+        """Mark the ring closed for readers and remove it"""
+        if self.__shm is None:
+            return
+        struct.pack_into("<I", self.__shm.buf, 20, 1)
+        self.__records = None
+        self.__fields = None
+        self.__shm.close()
+        self.__shm.unlink()
+        self.__shm = None
+
+
+class SharedRingReader(object):
+    """Attaches to a ring by name and reads records with sequence numbers.
+
+    Records are returned as views into shared memory. A record may be
+    overwritten once the publisher has written capacity newer records;
+    is_valid(seq) tells whether record seq was still intact after use.
+    Views stay readable after close(), the memory is unmapped once the
+    last of them is released.
+    """
+
+    def __init__(self, name, oldest=False):
+        self.__shm = _attach(name)
+        buf = self.__shm.buf
+        magic, capacity, itemsize, recipe_size, _, frequency = HEADER.unpack_from(
+            buf, 0
+        )
+        if magic != MAGIC:
+            self.__shm.close()
+            raise RTDEException("Not an RTDE shared memory ring: " + name)
+        recipe = bytes(buf[RECIPE_OFFSET : RECIPE_OFFSET + recipe_size])
+        names, types = recipe.decode("utf-8").split(";")
+        self.names = names.split(",")
+        self.types = types.split(",")
+        self.frequency = frequency
+        self.capacity = capacity
+        dtype = get_record_dtype(self.names, self.types)
+        if dtype.itemsize != itemsize:
+            self.__shm.close()
+            raise RTDEException("Record size mismatch in shared memory ring: " + name)
+        self.records = np.ndarray(
+            capacity, dtype, buffer=buf, offset=_data_offset(recipe_size)
+        )
+        self.missed = 0
+        newest = self.__newest()
+        if oldest:
+            self.sequence = max(1, newest - capacity + 1)
+        else:
+            self.sequence = newest + 1
+
+    def __newest(self):
+        return SEQUENCE.unpack_from(self.__shm.buf, SEQUENCE_OFFSET)[0]
+
+    @property
+    def publisher_closed(self):
+        return struct.unpack_from("<I", self.__shm.buf, 20)[0] != 0
+
+    def available(self):
+        """Number of records published that have not been read"""
+        return max(0, self.__newest() - self.sequence + 1)
+
+    def read(self, max_count=None):
+        """Views of the records not read yet, oldest first.
+        Returns at most max_count records and never wraps around the end of
+        the ring, so a second call may return more. Records that were
+        overwritten before they could be read are counted in missed.
+        """
+        newest = self.__newest()
+        oldest = newest - self.capacity + 1
+        if self.sequence < oldest:
+            self.missed += oldest - self.sequence
+            self.sequence = oldest
+        count = newest - self.sequence + 1
+        if count <= 0:
+            return self.records[:0]
+        start = (self.sequence - 1) % self.capacity
+        count = min(count, self.capacity - start)
+        if max_count is not None:
+            count = min(count, max_count)
+        self.sequence += count
+        return self.records[start : start + count]
+
+    def latest(self):
+        """View of the newest record, None while the ring is empty"""
+        newest = self.__newest()
+        if newest == 0:
+            return None
+        return self.records[(newest - 1) % self.capacity]
+
+    def is_valid(self, seq):
+        """Whether record seq has not been overwritten"""
+        return self.records["seq"][(seq - 1) % self.capacity] == seq
+
+    def close(self):
+        if self.__shm is None:
+            return
+        # every view keeps records alive, unmap only after the last one
+        records, self.records = self.records, None
+        weakref.finalize(records, self.__shm.close)
+        self.__shm = None
+
+
+class SharedMemoryPublisher(object):
+    """Publishes the data packages of one RTDE connection to a shared ring.
+
+    The connection must be connected and have negotiated the protocol
+    version; the output recipe is set up here. Readers attach with
+    SharedRingReader(publisher.name).
+    """
+
+    def __init__(
+        self, con, names, types, frequency=125, capacity=DEFAULT_CAPACITY, name=None
+    ):
+        if not con.send_output_setup(names, types, frequency):
+            raise RTDEException("Unable to configure output")
+        self.__con = con
+        self.__ring = SharedRingWriter(names, types, frequency, capacity, name)
+        self.__running = False
+
+    @property
+    def name(self):
+        return self.__ring.name
+
+    @property
+    def sequence(self):
+        return self.__ring.sequence
+
+    def poll(self, timeout=DEFAULT_TIMEOUT):
+        """Publish the packages received within timeout, returns their number"""
+        readable, _, _ = select.select([self.__con], [], [], timeout)
+        if not readable:
+            return 0
+        batch = self.__con.receive_batch()
+        if len(batch):
+            self.__ring.write(batch)
+        return len(batch)
+
+    def run(self, timeout=DEFAULT_TIMEOUT):
+        """Start synchronization and publish until stop() is called. If the
+        connection fails the ring is closed, so readers do not wait for a
+        publisher that is gone, and the exception is raised.
+        """
+        stopped = False
+        try:
+            if not self.__con.send_start():
+                raise RTDEException("Unable to start synchronization")
+            self.__running = True
+            while self.__running:
+                self.poll(timeout)
+            stopped = True
+        finally:
+            if not stopped:
+                self.__ring.close()
+
+    def stop(self):
+        self.__running = False
+
+    def close(self):
+        """Remove the ring, readers see publisher_closed"""
+        self.__ring.close()
@@ -0,0 +1,173 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import collections
+import logging
+import select
+
+from rtde import rtde
+from rtde.rtde import RTDEException
+
+_log = logging.getLogger(rtde.LOGNAME)
+
+
+class Subscription(object):
+    """Fields and rate one subscriber receives, created by SubscriptionManager"""
+
+    def __init__(self, names, frequency, callback, queue_size):
+        self.names = list(names)
+        self.frequency = frequency
+        self.callback = callback
+        self.queue = None
+        if callback is None:
+            self.queue = collections.deque(maxlen=queue_size)
+        self.dropped = 0
+        self.decimation = 1
+        self.decode = None
+        self.count = 0
+
+    def deliver(self, data):
+        package = self.decode(data)
+        if self.callback is not None:
+            self.callback(package)
+            return
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append(package)
+
+
+class SubscriptionManager(object):
+    """Shares one output recipe of an RTDE connection between subscribers.
+
+    Each subscriber names the fields it needs and optionally a lower
+    frequency. start() sets up the union of all fields at the highest
+    frequency. Every data package is then decoded once per subscriber that
+    is due, for only the fields of that subscriber, and decimated to its
+    frequency.
+    """
+
+    def __init__(self, con):
+        self.__con = con
+        self.__subscriptions = []
+        self.__frequency = None
+        self.__running = False
+
+    def subscribe(self, names, frequency=None, callback=None, queue_size=None):
+        """Add a subscriber. After start() it is delivered to right away if
+        the shared recipe has its fields, otherwise from the next start().
+        frequency defaults to the highest frequency of all subscribers.
+        If callback is given it is called as callback(package) for each
+        package, otherwise packages are appended to subscription.queue, bounded
+        by queue_size; when it is full the oldest package is dropped and
+        counted in subscription.dropped.
+        """
+        subscription = Subscription(names, frequency, callback, queue_size)
+        config = self.__con.output_config
+        if self.__frequency is not None and config is not None:
+            if set(subscription.names) <= set(config.names):
+                self.__prepare(subscription, config)
+        self.__subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Stop delivering to subscription, the recipe is kept until start()"""
+        self.__subscriptions.remove(subscription)
+
+    @property
+    def subscriptions(self):
+        return list(self.__subscriptions)
+
+    @property
+    def frequency(self):
+        """Frequency of the shared recipe, None before start()"""
+        return self.__frequency
+
+    def start(self, default_frequency=125):
+        """Set up the union recipe and start synchronization.
+        The connection is paused first if it is already synchronizing.
+        default_frequency is used if no subscriber asks for one.
+        """
+        if not self.__subscriptions:
+            raise RTDEException("No subscriptions")
+        names = []
+        for subscription in self.__subscriptions:
+            for name in subscription.names:
+                if name not in names:
+                    names.append(name)
+        frequencies = [s.frequency for s in self.__subscriptions if s.frequency]
+        frequency = max(frequencies) if frequencies else default_frequency
+
+        con = self.__con
+        if con.is_connected() and con.output_config is not None:
+            con.send_pause()
+        if not con.send_output_setup(names, frequency=frequency):
+            raise RTDEException("Unable to configure output")
+        self.__frequency = frequency
+        for subscription in self.__subscriptions:
+            self.__prepare(subscription, con.output_config)
+        _log.info(
+            "Shared recipe of %d fields at %s Hz for %d subscribers",
+            len(names),
+            frequency,
+            len(self.__subscriptions),
+        )
+        if not con.send_start():
+            raise RTDEException("Unable to start synchronization")
+
+    def __prepare(self, subscription, config):
+        subscription.decimation = 1
+        if subscription.frequency:
+            subscription.decimation = max(
+                1, int(round(self.__frequency / float(subscription.frequency)))
+            )
+        subscription.decode = config.projection(subscription.names, False)
+        subscription.count = 0
+
+    def poll(self, timeout=rtde.DEFAULT_TIMEOUT):
+        """Deliver the packages received within timeout.
+        Returns the number of packages received.
+        """
+        readable, _, _ = select.select([self.__con], [], [], timeout)
+        if not readable:
+            return 0
+        received = 0
+        data = self.__con.receive_buffered(True)
+        while data is not None:
+            received += 1
+            for subscription in self.__subscriptions:
+                if subscription.decode is None:
+                    continue  # waits for the next start()
+                if subscription.count % subscription.decimation == 0:
+                    subscription.deliver(data)
+                subscription.count += 1
+            data = self.__con.receive_buffered(True)
+        return received
+
+    def run(self, timeout=rtde.DEFAULT_TIMEOUT):
+        """Poll until stop() is called"""
+        self.__running = True
+        while self.__running:
+            self.poll(timeout)
+
+    def stop(self):
+        self.__running = False
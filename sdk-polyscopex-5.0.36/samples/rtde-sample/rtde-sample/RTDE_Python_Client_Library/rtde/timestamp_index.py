@@ -0,0 +1,272 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Sparse timestamp index of a recording.
+
+Every stride-th sample's timestamp is stored with its position: the byte
+offset of the row for CSV recordings, the record number for binary ones.
+Readers use it to seek to a time window instead of scanning the file.
+
+The index is kept next to the recording in <recording>.tsidx, a UTF-8
+JSON object with
+    "key": [file size, mtime in ns] of the recording when indexed
+    "unit": "byte" or "record"
+    "timestamps", "positions": the index entries
+    "monotonic": false if any timestamp is smaller than the one before
+    "stride": samples between index entries
+The index is ignored when the recording has changed since. record.py
+writes it while recording, otherwise it is built on first read.
+
+Timestamps start over when a recording spans a controller restart. Such
+an index is kept but does not narrow the search, readers then scan the
+whole recording.
+"""
+
+import bisect
+import json
+import logging
+import os
+
+import numpy as np
+
+from .rtde import LOGNAME
+from .fields import timestamp
+
+_log = logging.getLogger(LOGNAME)
+
+INDEX_EXTENSION = ".tsidx"
+DEFAULT_STRIDE = 1000
+
+
+def get_file_key(filename):
+    st = os.stat(filename)
+    return [st.st_size, st.st_mtime_ns]
+
+
+class TimestampIndex(object):
+    def __init__(
+        self, timestamps, positions, unit, monotonic=True, stride=DEFAULT_STRIDE
+    ):
+        self.timestamps = list(timestamps)
+        self.positions = list(positions)
+        self.unit = unit
+        self.monotonic = monotonic and self.timestamps == sorted(self.timestamps)
+        self.stride = stride
+
+    def seek_row(self, row):
+        """Position of the last indexed sample at or before sample number
+        row and the number of samples from there to row.
+        """
+        if not self.positions:
+            return (None, row)
+        i = min(row // self.stride, len(self.positions) - 1)
+        return (self.positions[i], row - i * self.stride)
+
+    def lookup(self, start):
+        """Position of the last indexed sample at or before start, reading
+        from there finds every sample from start on.
+        """
+        return self.span(start)[0]
+
+    def span(self, t):
+        """Positions of the indexed samples around timestamp t, the second
+        is None if t is after the last indexed sample. Without monotonic
+        timestamps that is the whole recording.
+        """
+        if not self.positions:
+            return (None, None)
+        if not self.monotonic:
+            return (self.positions[0], None)
+        i = max(bisect.bisect_right(self.timestamps, t) - 1, 0)
+        if i + 1 < len(self.positions):
+            return (self.positions[i], self.positions[i + 1])
+        return (self.positions[i], None)
+
+    def save(self, filename):
+        """Writes the index of the recording filename, returns False if
+        that is not possible.
+        """
+        try:
+            tmp = filename + INDEX_EXTENSION + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(
+                    {
+                        "key": get_file_key(filename),
+                        "unit": self.unit,
+                        "timestamps": self.timestamps,
+                        "positions": self.positions,
+                        "monotonic": self.monotonic,
+                        "stride": self.stride,
+                    },
+                    f,
+                )
+            os.replace(tmp, filename + INDEX_EXTENSION)
+        except OSError as e:
+            _log.warning("Unable to write timestamp index: " + str(e))
+            return False
+        return True
+
+
+def load_index(filename):
+    """The saved index of the recording filename, None if there is none
+    or the recording changed after indexing.
+    """
+    try:
+        with open(filename + INDEX_EXTENSION) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get("key") != get_file_key(filename) or "monotonic" not in index:
+        return None
+    return TimestampIndex(
+        index["timestamps"],
+        index["positions"],
+        index["unit"],
+        index["monotonic"],
+        index.get("stride", DEFAULT_STRIDE),
+    )
+
+
+def build_csv_index(filename, delimiter=" ", stride=DEFAULT_STRIDE):
+    timestamps = []
+    positions = []
+    sep = delimiter.encode("utf-8")
+    with open(filename, "rb") as f:
+        offset = 0
+        column = None
+        row = 0
+        previous = None
+        monotonic = True
+        for line in f:
+            position = offset
+            offset += len(line)
+            if not line.strip():
+                continue
+            if column is None:
+                header = line.decode("utf-8").split(delimiter)
+                header = [name.strip() for name in header]
+                if timestamp not in header:
+                    raise ValueError("No timestamp column in " + filename)
+                column = header.index(timestamp)
+                continue
+            sample_timestamp = float(line.split(sep)[column])
+            if previous is not None and sample_timestamp < previous:
+                monotonic = False
+            previous = sample_timestamp
+            if row % stride == 0:
+                timestamps.append(sample_timestamp)
+                positions.append(position)
+            row += 1
+    return TimestampIndex(timestamps, positions, "byte", monotonic, stride)
+
+
+def get_csv_index(filename, delimiter=" "):
+    """The saved index of a CSV recording, built and saved if missing"""
+    index = load_index(filename)
+    if index is None:
+        index = build_csv_index(filename, delimiter)
+        index.save(filename)
+    return index
+
+
+def build_binary_index(records, stride=DEFAULT_STRIDE):
+    """Index of a binary_reader records array. Checking the timestamps
+    are monotonic reads the timestamp column, see get_binary_index.
+    """
+    times = np.asarray(records[timestamp], dtype=float)
+    monotonic = bool(np.all(np.diff(times) >= 0))
+    positions = range(0, len(records), stride)
+    return TimestampIndex(
+        times[::stride].tolist(), positions, "record", monotonic, stride
+    )
+
+
+def get_binary_index(filename, records):
+    """The saved index of a binary recording, built and saved if missing"""
+    index = load_index(filename)
+    if index is None or index.unit != "record":
+        index = build_binary_index(records)
+        index.save(filename)
+    return index
+
+
+def find_records(records, start=None, end=None, index=None):
+    """Slice of the records with start <= timestamp <= end, a boolean mask
+    if the timestamps are not monotonic.
+    """
+    if index is None:
+        index = build_binary_index(records)
+    times = records[timestamp]
+    if not index.monotonic:
+        times = np.asarray(times)
+        mask = np.ones(len(records), dtype=bool)
+        if start is not None:
+            mask &= times >= start
+        if end is not None:
+            mask &= times <= end
+        return mask
+    lo, hi = 0, len(records)
+    if start is not None and lo < hi:
+        first, last = index.span(start)
+        chunk = np.asarray(times[first : last and last + 1])
+        lo = first + int(np.searchsorted(chunk, start, side="left"))
+    if end is not None and lo < hi:
+        first, last = index.span(end)
+        chunk = np.asarray(times[first : last and last + 1])
+        hi = first + int(np.searchsorted(chunk, end, side="right"))
+    return slice(lo, max(lo, hi))
+
+
+class TimestampIndexer(object):
+    """Builds the index of a CSV recording while it is written. Call
+    update with the timestamp of each sample before writing its row, and
+    save after closing the file.
+    """
+
+    def __init__(self, csvfile, stride=DEFAULT_STRIDE):
+        self.__file = csvfile
+        self.__stride = stride
+        self.__rows = 0
+        self.__timestamps = []
+        self.__positions = []
+        self.__previous = None
+        self.__monotonic = True
+
+    def update(self, sample_timestamp):
+        if self.__previous is not None and sample_timestamp < self.__previous:
+            self.__monotonic = False
+        self.__previous = sample_timestamp
+        if self.__rows % self.__stride == 0:
+            self.__timestamps.append(float(sample_timestamp))
+            self.__positions.append(self.__file.tell())
+        self.__rows += 1
+
+    def save(self, filename):
+        index = TimestampIndex(
+            self.__timestamps,
+            self.__positions,
+            "byte",
+            self.__monotonic,
+            self.__stride,
+        )
+        return index.save(filename)
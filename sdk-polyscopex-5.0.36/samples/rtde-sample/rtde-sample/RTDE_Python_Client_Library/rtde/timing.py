@@ -0,0 +1,171 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import bisect
+import time
+
+# Upper edges in seconds of the inter-arrival jitter histogram bins, jitter
+# being the deviation of the inter-arrival time from the configured period.
+JITTER_BINS = (
+    -0.005,
+    -0.002,
+    -0.001,
+    -0.0005,
+    -0.0002,
+    0.0002,
+    0.0005,
+    0.001,
+    0.002,
+    0.005,
+)
+
+
+class ReceiveTiming(object):
+    """Opt-in instrumentation of the receive path, see RTDE.enable_timing().
+
+    Packages are stamped with the monotonic host time of the recv call that
+    completed them, when their bytes were read into the receive buffer, not
+    when they were taken from it; packages delivered by the same recv share
+    a timestamp. Data waiting in the socket is only stamped once read, so
+    receiving less often than the output frequency shows up as bursts.
+    The inter-arrival time of consecutive data packages is compared with
+    the period of the frequency requested in send_output_setup.
+    """
+
+    def __init__(self, frequency=None, packet_size=None, bins=JITTER_BINS):
+        self.bins = tuple(bins)
+        self.configure(frequency, packet_size)
+        self.reset()
+
+    def configure(self, frequency, packet_size):
+        """Set the output frequency and the data package size in bytes"""
+        self.frequency = frequency
+        self.period = 1.0 / frequency if frequency else None
+        self.packet_size = packet_size
+
+    def reset(self):
+        self.recv_calls = 0
+        self.bytes_received = 0
+        self.max_recv_bytes = 0
+        self.buffered_bytes = 0
+        self.max_buffered_bytes = 0
+        self.packages = 0
+        self.decoded_packages = 0
+        self.decode_time = 0.0
+        self.max_decode_time = 0.0
+        self.last_receive_time = None
+        self.interval_count = 0
+        self.interval_sum = 0.0
+        self.min_interval = None
+        self.max_interval = None
+        self.late_packages = 0
+        self.histogram = [0] * (len(self.bins) + 1)
+        self.__previous_arrival = None
+
+    def on_recv(self, nbytes, buffered_bytes):
+        """Called after every recv with the bytes read and now buffered"""
+        self.last_receive_time = time.monotonic()
+        self.recv_calls += 1
+        self.bytes_received += nbytes
+        if nbytes > self.max_recv_bytes:
+            self.max_recv_bytes = nbytes
+        self.buffered_bytes = buffered_bytes
+        if buffered_bytes > self.max_buffered_bytes:
+            self.max_buffered_bytes = buffered_bytes
+
+    def on_packages(self, count=1, decode_time=None, arrivals=None):
+        """Called for count data packages taken from the buffer.
+        decode_time is the time spent decoding them, None if skipped.
+        arrivals are their arrival times, see RingBuffer.track_arrival, by
+        default the time of the last recv.
+        """
+        self.packages += count
+        if decode_time is not None:
+            self.decoded_packages += count
+            self.decode_time += decode_time
+            if decode_time > self.max_decode_time:
+                self.max_decode_time = decode_time
+        if arrivals is None:
+            if self.last_receive_time is None:
+                return
+            # the packages of a burst arrived together
+            arrivals = [self.last_receive_time] * count
+        for arrival in arrivals:
+            if arrival is None:
+                continue
+            if self.__previous_arrival is not None:
+                self.__add_interval(arrival - self.__previous_arrival)
+            self.__previous_arrival = arrival
+
+    def __add_interval(self, interval):
+        self.interval_count += 1
+        self.interval_sum += interval
+        if self.min_interval is None or interval < self.min_interval:
+            self.min_interval = interval
+        if self.max_interval is None or interval > self.max_interval:
+            self.max_interval = interval
+        if self.period is not None:
+            jitter = interval - self.period
+            self.histogram[bisect.bisect_left(self.bins, jitter)] += 1
+            if interval > 1.5 * self.period:
+                self.late_packages += 1
+
+    @property
+    def buffered_packages(self):
+        """Data packages in the receive buffer after the last recv"""
+        if not self.packet_size:
+            return None
+        return self.buffered_bytes // self.packet_size
+
+    @property
+    def mean_interval(self):
+        if self.interval_count == 0:
+            return None
+        return self.interval_sum / self.interval_count
+
+    @property
+    def mean_decode_time(self):
+        if self.decoded_packages == 0:
+            return None
+        return self.decode_time / self.decoded_packages
+
+    def summary(self):
+        """The collected values as a dictionary"""
+        return {
+            "frequency": self.frequency,
+            "recv_calls": self.recv_calls,
+            "bytes_received": self.bytes_received,
+            "max_recv_bytes": self.max_recv_bytes,
+            "max_buffered_bytes": self.max_buffered_bytes,
+            "buffered_packages": self.buffered_packages,
+            "packages": self.packages,
+            "decoded_packages": self.decoded_packages,
+            "mean_decode_time": self.mean_decode_time,
+            "max_decode_time": self.max_decode_time,
+            "mean_interval": self.mean_interval,
+            "min_interval": self.min_interval,
+            "max_interval": self.max_interval,
+            "late_packages": self.late_packages,
+            "jitter_bins": self.bins,
+            "jitter_histogram": list(self.histogram),
+        }
@@ -0,0 +1,124 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import types
+
+import numpy as np
+import pytest
+
+from rtde import binary_reader
+from rtde import csv_binary_writer
+from rtde import rtde
+from rtde.mock_server import MockRTDEServer
+
+NAMES = ["timestamp", "actual_q", "runtime_state"]
+TYPES = ["DOUBLE", "VECTOR6D", "UINT32"]
+SAMPLES = 20
+PERIOD = 0.002
+
+
+def make_samples():
+    return [
+        types.SimpleNamespace(
+            recipe_id=1,
+            timestamp=i * PERIOD,
+            actual_q=[i + j / 10.0 for j in range(6)],
+            runtime_state=2 if 5 <= i < 15 else 1,
+        )
+        for i in range(SAMPLES)
+    ]
+
+
+def write(filename, samples):
+    with open(filename, "wb") as f:
+        writer = csv_binary_writer.CSVBinaryWriter(f, NAMES, TYPES, frequency=500)
+        writer.writeheader()
+        for s in samples:
+            writer.writerow(s)
+        return f.tell()
+
+
+def test_round_trip(tmp_path):
+    filename = str(tmp_path / "data.bin")
+    write(filename, make_samples())
+    assert binary_reader.is_binary_recording(filename)
+    reader = binary_reader.BinaryReader(filename)
+    assert reader.names == NAMES
+    assert reader.frequency == 500
+    assert reader.get_samples() == SAMPLES
+    # records start aligned and are mapped, not copied
+    assert reader.records.offset % csv_binary_writer.ALIGNMENT == 0
+    assert isinstance(reader.records, np.memmap)
+    assert reader.records["actual_q"].shape == (SAMPLES, 6)
+    assert np.array_equal(reader.timestamp, np.arange(SAMPLES) * PERIOD)
+    assert np.array_equal(reader.actual_q_5, np.arange(SAMPLES) + 0.5)
+
+
+def test_filter_and_select(tmp_path):
+    filename = str(tmp_path / "data.bin")
+    write(filename, make_samples())
+    reader = binary_reader.BinaryReader(filename, filter_running_program=True)
+    assert reader.get_samples() == 10
+    assert np.array_equal(reader.actual_q_0, np.arange(5, 15))
+    reader = binary_reader.BinaryReader(filename, start=0.004, end=0.01)
+    assert np.array_equal(reader.actual_q_0, np.arange(2, 6))
+    reader = binary_reader.BinaryReader(filename, rows=slice(3, 7))
+    assert np.array_equal(reader.actual_q_0, np.arange(3, 7))
+
+
+def test_interrupted_recording(tmp_path):
+    filename = str(tmp_path / "data.bin")
+    write(filename, make_samples())
+    with open(filename, "ab") as f:
+        f.write(b"\0" * 10)
+    assert binary_reader.BinaryReader(filename).get_samples() == SAMPLES
+    with open(filename, "wb") as f:
+        writer = csv_binary_writer.CSVBinaryWriter(f, NAMES, TYPES)
+        writer.writeheader()
+        with pytest.raises(ValueError):
+            writer.writerow(b"\0" * 10)
+    assert binary_reader.BinaryReader(filename).get_samples() == 0
+
+
+def test_record_binary_receive(tmp_path):
+    filename = str(tmp_path / "data.bin")
+    with MockRTDEServer(rate=500) as server:
+        con = rtde.RTDE("127.0.0.1", server.port)
+        con.connect()
+        assert con.send_output_setup(NAMES, TYPES, frequency=500)
+        assert con.send_start()
+        with open(filename, "wb") as f:
+            writer = csv_binary_writer.CSVBinaryWriter(f, NAMES, TYPES, 500)
+            writer.writeheader()
+            written = 0
+            while written < SAMPLES:
+                # None until a package has arrived
+                data = con.receive_buffered(binary=True)
+                if data is not None:
+                    writer.writerow(data)
+                    written += 1
+        con.disconnect()
+    reader = binary_reader.BinaryReader(filename)
+    assert reader.get_samples() == SAMPLES
+    assert np.allclose(np.diff(reader.timestamp), PERIOD)
+    assert np.all(reader.runtime_state == 2)
@@ -0,0 +1,100 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import random
+import time
+
+import pytest
+
+from rtde import rtde
+from rtde.clock import ClockModel
+from rtde.mock_server import MockRTDEServer
+
+PERIOD = 0.002
+
+
+def feed(model, count, offset=100.0, drift=0.0, start=0.0, jitter=0.0001):
+    rng = random.Random(1)
+    for n in range(count):
+        t = start + n * PERIOD
+        model.update(t, t + offset + drift * t + rng.uniform(0.0, jitter))
+
+
+def test_estimates_offset_and_drift():
+    model = ClockModel(frequency=500)
+    assert model.host_time(1.0) is None
+    feed(model, 5000, drift=1e-4)
+    assert model.samples == 5000
+    assert model.resets == 0
+    assert model.offset == pytest.approx(100.0, abs=0.001)
+    assert model.drift == pytest.approx(1e-4, abs=2e-5)
+    t = 10.0
+    assert model.host_time(t) == pytest.approx(t + 100.0 + 1e-4 * t, abs=0.001)
+
+
+def test_rejects_late_samples():
+    model = ClockModel(frequency=500)
+    feed(model, 1000)
+    before = model.host_time(2.0)
+    # a package that waited 50 ms in a buffer before it was read
+    assert model.update(2.0, 2.0 + 100.05) == pytest.approx(before)
+    assert model.rejected_samples == 1
+
+
+def test_resets_when_clock_jumps():
+    model = ClockModel(frequency=500)
+    feed(model, 1000)
+    feed(model, 1000, offset=500.0, start=2.0)
+    assert model.resets == 1
+    assert model.offset == pytest.approx(500.0, abs=0.001)
+
+
+def test_counts_gaps_not_skips():
+    model = ClockModel(frequency=500)
+    model.update(0.0, 100.0)
+    model.update(PERIOD, 100.0 + PERIOD)
+    model.skip(2)
+    model.update(4 * PERIOD, 100.0 + 4 * PERIOD)
+    assert model.gap_count == 0
+    model.update(10 * PERIOD, 100.0 + 10 * PERIOD)
+    assert model.gap_count == 1
+    assert model.missed_packages == 5
+    assert list(model.gaps) == [(pytest.approx(4 * PERIOD), 5)]
+
+
+def test_enable_clock_sync():
+    with MockRTDEServer(rate=500) as server:
+        con = rtde.RTDE("127.0.0.1", server.port)
+        con.connect()
+        assert con.send_output_setup(["timestamp"], ["DOUBLE"], frequency=500)
+        model = con.enable_clock_sync()
+        assert model.frequency == 500
+        assert con.send_start()
+        for _ in range(50):
+            data = con.receive()
+        now = time.time()
+        con.disconnect()
+    assert model.samples >= 1
+    # the mock starts its timestamps at 0 when it starts sending
+    assert data.host_time == pytest.approx(now, abs=0.05)
+    assert model.host_time(data.timestamp) == data.host_time
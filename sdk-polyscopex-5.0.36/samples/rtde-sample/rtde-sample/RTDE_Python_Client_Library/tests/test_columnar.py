@@ -0,0 +1,107 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import types
+
+import numpy as np
+import pytest
+
+from rtde import columnar
+
+NAMES = ["timestamp", "actual_q", "runtime_state", "output_bit_registers0_to_31"]
+TYPES = ["DOUBLE", "VECTOR6D", "UINT32", "UINT32"]
+SAMPLES = 20
+
+
+def make_samples():
+    return [
+        types.SimpleNamespace(
+            timestamp=i * 0.002,
+            actual_q=[i + j / 10.0 for j in range(6)],
+            runtime_state=2 if 5 <= i < 15 else 1,
+            output_bit_registers0_to_31=2**31 + i,
+        )
+        for i in range(SAMPLES)
+    ]
+
+
+def write(filename, samples, **kwargs):
+    with open(filename, "wb") as f:
+        writer = columnar.ColumnarWriter(f, NAMES, TYPES, rows_per_group=7, **kwargs)
+        writer.writeheader()
+        for s in samples:
+            writer.writerow(s)
+        writer.close()
+
+
+@pytest.mark.parametrize("compression", ["zlib", "none"])
+def test_round_trip(tmp_path, compression):
+    filename = str(tmp_path / ("data" + columnar.EXTENSION))
+    write(filename, make_samples(), compression=compression)
+    reader = columnar.ColumnarReader(filename)
+    assert reader.names == NAMES
+    assert reader.types == TYPES
+    assert [group["rows"] for group in reader.row_groups] == [7, 7, 6]
+    assert reader.get_samples() == SAMPLES
+    assert np.array_equal(reader.timestamp, np.arange(SAMPLES) * 0.002)
+    for j in range(6):
+        column = getattr(reader, "actual_q_%d" % j)
+        assert np.array_equal(column, np.arange(SAMPLES) + j / 10.0)
+    assert reader.read_field("actual_q").shape == (SAMPLES, 6)
+    assert reader.output_bit_registers0_to_31[-1] == 2**31 + SAMPLES - 1
+    with pytest.raises(AttributeError):
+        reader.actual_q_6
+
+
+def test_filter_running_program(tmp_path):
+    filename = str(tmp_path / ("data" + columnar.EXTENSION))
+    write(filename, make_samples())
+    reader = columnar.ColumnarReader(filename, filter_running_program=True)
+    assert reader.get_samples() == 10
+    assert np.array_equal(reader.actual_q_0, np.arange(5, 15))
+    assert np.all(reader.runtime_state == 2)
+
+
+def test_select_window(tmp_path):
+    filename = str(tmp_path / ("data" + columnar.EXTENSION))
+    write(filename, make_samples())
+    reader = columnar.ColumnarReader(filename, start=0.016, end=0.03)
+    assert np.array_equal(reader.actual_q_0, np.arange(8, 16))
+    reader = columnar.ColumnarReader(filename, rows=slice(6, 15))
+    assert reader.get_samples() == 9
+    assert np.array_equal(reader.actual_q_0, np.arange(6, 15))
+    with pytest.raises(ValueError):
+        columnar.ColumnarReader(filename, start=0.0, rows=slice(1))
+
+
+def test_unclosed_recording(tmp_path):
+    filename = str(tmp_path / ("data" + columnar.EXTENSION))
+    with open(filename, "wb") as f:
+        writer = columnar.ColumnarWriter(f, NAMES, TYPES)
+        writer.writeheader()
+        writer.writerow(make_samples()[0])
+        writer.flush()
+    with pytest.raises(ValueError, match="not closed"):
+        columnar.ColumnarReader(filename)
+    with pytest.raises(ValueError):
+        columnar.ColumnarWriter(f, NAMES, TYPES, compression="lz4")
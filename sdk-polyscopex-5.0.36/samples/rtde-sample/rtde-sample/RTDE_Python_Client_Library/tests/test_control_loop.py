@@ -0,0 +1,145 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import time
+
+import pytest
+
+from rtde import rtde
+from rtde.control_loop import ControlLoop, ControlLoopOverrun, SKIP, STOP
+from rtde.mock_server import MockRTDEServer
+
+SETPOINT = "input_double_register_0"
+SAFE = "input_double_register_1"
+WATCHDOG = "input_int_register_0"
+
+
+@pytest.fixture
+def server():
+    with MockRTDEServer(rate=500) as server:
+        yield server
+
+
+@pytest.fixture
+def con(server):
+    con = rtde.RTDE("127.0.0.1", server.port)
+    con.connect()
+    assert con.send_output_setup(["timestamp"], ["DOUBLE"], frequency=500)
+    yield con
+    con.disconnect()
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def make_input(con, name, value):
+    inputs = con.send_input_setup([name], ["DOUBLE"])
+    setattr(inputs, name, value)
+    return inputs
+
+
+def test_run_sends_inputs_and_watchdog(server, con):
+    setp = make_input(con, SETPOINT, 0.0)
+    watchdog = con.send_input_setup([WATCHDOG], ["INT32"])
+    setattr(watchdog, WATCHDOG, 7)
+    received = []
+
+    def callback(state):
+        received.append(state.timestamp)
+        setattr(setp, SETPOINT, float(len(received)))
+        return setp
+
+    loop = ControlLoop(con, callback, watchdog=watchdog, watchdog_interval=0.0)
+    assert con.send_start()
+    loop.run(cycles=20)
+    assert loop.cycles == len(received) == 20
+    assert received == sorted(received)
+    assert wait_until(lambda: server.inputs.get(SETPOINT) == 20.0)
+    assert wait_until(lambda: server.inputs.get(WATCHDOG) == 7)
+    summary = loop.summary()
+    assert summary["cycles"] == 20
+    assert summary["overruns"] == 0
+    assert 0.0 < summary["p50_cycle_time"] <= summary["worst_cycle_time"]
+    assert len(loop.cycle_times) == 20
+
+
+def test_skip_policy_keeps_last_inputs(server, con):
+    setp = make_input(con, SETPOINT, 1.0)
+
+    def callback(state):
+        if loop.cycles == 0:
+            return setp
+        time.sleep(0.005)
+        setattr(setp, SETPOINT, 2.0)
+        return setp
+
+    loop = ControlLoop(con, callback, deadline=0.001, overrun_policy=SKIP)
+    assert con.send_start()
+    loop.run(cycles=5)
+    assert loop.overruns == 4
+    time.sleep(0.05)
+    assert server.inputs.get(SETPOINT) == 1.0
+
+
+def test_stop_policy_sends_safe_inputs(server, con):
+    setp = make_input(con, SETPOINT, 2.0)
+    safe = make_input(con, SAFE, -1.0)
+
+    def callback(state):
+        time.sleep(0.005)
+        return setp
+
+    loop = ControlLoop(
+        con, callback, deadline=0.001, overrun_policy=STOP, safe_inputs=safe
+    )
+    assert con.send_start()
+    with pytest.raises(ControlLoopOverrun):
+        loop.run()
+    assert loop.cycles == 0
+    assert loop.overruns == 1
+    assert wait_until(lambda: server.inputs.get(SAFE) == -1.0)
+    assert SETPOINT not in server.inputs
+
+
+def test_custom_policy(con):
+    calls = []
+
+    def policy(loop, state, inputs, cycle_time):
+        calls.append((state.timestamp, inputs, cycle_time))
+        return None
+
+    def callback(state):
+        time.sleep(0.005)
+        return "not sent"
+
+    loop = ControlLoop(con, callback, deadline=0.001, overrun_policy=policy)
+    assert con.send_start()
+    loop.run(cycles=3)
+    assert len(calls) == 3
+    assert all(inputs == "not sent" and t > 0.001 for _, inputs, t in calls)
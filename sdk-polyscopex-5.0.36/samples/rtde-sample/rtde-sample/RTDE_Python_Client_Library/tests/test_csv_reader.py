@@ -0,0 +1,126 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import types
+
+import numpy as np
+import pytest
+
+from rtde import csv_reader
+from rtde import csv_writer
+
+NAMES = ["timestamp", "actual_q", "runtime_state"]
+TYPES = ["DOUBLE", "VECTOR6D", "UINT32"]
+SAMPLES = 25
+
+
+def write(filename, samples=SAMPLES):
+    with open(filename, "w") as f:
+        writer = csv_writer.CSVWriter(f, NAMES, TYPES)
+        writer.writeheader()
+        for i in range(samples):
+            writer.writerow(
+                types.SimpleNamespace(
+                    timestamp=i * 0.002,
+                    actual_q=[i + j / 10.0 for j in range(6)],
+                    runtime_state=2 if 5 <= i < 15 else 1,
+                )
+            )
+
+
+def read(filename, **kwargs):
+    with open(filename) as f:
+        return csv_reader.CSVReader(f, **kwargs)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000])
+def test_chunked_parse(tmp_path, chunk_size):
+    filename = str(tmp_path / "data.csv")
+    write(filename)
+    reader = read(filename, chunk_size=chunk_size, cache=False)
+    assert reader.get_samples() == SAMPLES
+    assert np.array_equal(reader.timestamp, np.arange(SAMPLES) * 0.002)
+    assert np.array_equal(reader.actual_q_3, np.arange(SAMPLES) + 0.3)
+    reader = read(
+        filename, chunk_size=chunk_size, cache=False, filter_running_program=True
+    )
+    assert reader.get_samples() == 10
+    assert np.array_equal(reader.actual_q_0, np.arange(5, 15))
+
+
+def test_column_projection(tmp_path):
+    filename = str(tmp_path / "data.csv")
+    write(filename)
+    header = open(filename).readline().split()
+    assert csv_reader.get_projection(header, ["actual_q"]) == list(range(1, 7))
+    assert csv_reader.get_projection(header, ["runtime_state", "actual_q_2"]) == [3, 7]
+    assert csv_reader.get_projection(header, ["unknown"]) == []
+    reader = read(filename, columns=["actual_q"], cache=False)
+    assert np.array_equal(reader.actual_q_5, np.arange(SAMPLES) + 0.5)
+    with pytest.raises(AttributeError):
+        reader.timestamp
+    # the state column is parsed for filtering even if not asked for
+    reader = read(
+        filename, columns=["timestamp"], cache=False, filter_running_program=True
+    )
+    assert np.array_equal(reader.timestamp, np.arange(5, 15) * 0.002)
+
+
+def no_parsing(*args, **kwargs):
+    raise AssertionError("parsed a cached column")
+
+
+def test_cache_sidecar(tmp_path, monkeypatch):
+    filename = str(tmp_path / "data.csv")
+    write(filename)
+    read(filename, columns=["timestamp"])
+    path = filename + csv_reader.CACHE_EXTENSION
+    assert sorted(os.listdir(path)) == ["meta.json", "timestamp.npy"]
+    # only the columns not cached yet are parsed
+    reader = read(filename, columns=["actual_q", "runtime_state"])
+    assert reader.get_samples() == SAMPLES
+    monkeypatch.setattr(csv_reader.np, "loadtxt", no_parsing)
+    reader = read(filename, filter_running_program=True)
+    assert "timestamp" not in reader.__dict__
+    assert reader.get_samples() == 10
+    assert np.array_equal(reader.timestamp, np.arange(5, 15) * 0.002)
+    assert np.array_equal(reader.actual_q_1, np.arange(5, 15) + 0.1)
+
+
+def test_cache_invalidated_on_change(tmp_path):
+    filename = str(tmp_path / "data.csv")
+    write(filename)
+    assert read(filename).get_samples() == SAMPLES
+    write(filename, SAMPLES + 5)
+    reader = read(filename)
+    assert reader.get_samples() == SAMPLES + 5
+    assert np.array_equal(reader.actual_q_0, np.arange(SAMPLES + 5))
+
+
+def test_cache_disabled(tmp_path):
+    filename = str(tmp_path / "data.csv")
+    write(filename)
+    read(filename, cache=False)
+    read(filename, start=0.0, end=0.01)
+    assert not os.path.exists(filename + csv_reader.CACHE_EXTENSION)
@@ -0,0 +1,149 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import concurrent.futures
+import time
+
+import numpy as np
+import pytest
+
+from rtde import decode_pool
+from rtde import rtde
+from rtde.mock_server import MockRTDEServer
+
+OUTPUT_NAMES = ["timestamp", "actual_q"]
+OUTPUT_TYPES = ["DOUBLE", "VECTOR6D"]
+PERIOD = 0.002
+
+
+@pytest.fixture
+def server():
+    with MockRTDEServer(rate=500) as server:
+        yield server
+
+
+def start(server):
+    con = rtde.RTDE("127.0.0.1", server.port)
+    con.connect()
+    assert con.send_output_setup(OUTPUT_NAMES, OUTPUT_TYPES, frequency=500)
+    assert con.send_start()
+    return con
+
+
+def poll_until(pool, condition, polls=100):
+    for _ in range(polls):
+        pool.poll(0.1)
+        if condition():
+            return True
+    return False
+
+
+class SlowFirstExecutor(object):
+    """Threads where the first batch finishes after the ones submitted later"""
+
+    def __init__(self):
+        self.__executor = concurrent.futures.ThreadPoolExecutor(4)
+        self.submitted = 0
+
+    def submit(self, fn, *args):
+        delay = 0.2 if self.submitted == 0 else 0.0
+        self.submitted += 1
+        return self.__executor.submit(self.__call, delay, fn, args)
+
+    @staticmethod
+    def __call(delay, fn, args):
+        time.sleep(delay)
+        return fn(*args)
+
+    def shutdown(self):
+        self.__executor.shutdown()
+
+
+def test_decode_in_worker_processes(server):
+    cons = [start(server) for _ in range(2)]
+    batches = {con: [] for con in cons}
+    pool = decode_pool.DecodePool(max_workers=2)
+    try:
+        for con in cons:
+            pool.register(con, lambda con, columns: batches[con].append(columns))
+        assert poll_until(
+            pool, lambda: all(len(b) >= 3 for b in batches.values()), polls=300
+        )
+    finally:
+        pool.close()
+        for con in cons:
+            con.disconnect()
+    for columns in batches[cons[0]]:
+        assert set(columns) == set(OUTPUT_NAMES)
+        assert columns["actual_q"].shape == (len(columns["timestamp"]), 6)
+        assert columns["timestamp"].dtype.isnative
+    for received in batches.values():
+        times = np.concatenate([columns["timestamp"] for columns in received])
+        assert np.allclose(np.diff(times), PERIOD)
+
+
+def test_batches_delivered_in_read_order(server):
+    con = start(server)
+    batches = []
+    executor = SlowFirstExecutor()
+    pool = decode_pool.DecodePool(executor=executor)
+    try:
+        pool.register(con, lambda con, columns: batches.append(columns))
+        assert poll_until(pool, lambda: executor.submitted >= 3)
+        # nothing is delivered while the first batch is still decoding
+        assert batches == []
+        pool.flush()
+        assert pool.pending_count == 0
+    finally:
+        pool.close()
+        con.disconnect()
+    assert len(batches) == executor.submitted
+    times = np.concatenate([columns["timestamp"] for columns in batches])
+    assert np.allclose(np.diff(times), PERIOD)
+
+
+def test_register_requires_output_setup(server):
+    con = rtde.RTDE("127.0.0.1", server.port)
+    con.connect()
+    pool = decode_pool.DecodePool(executor=SlowFirstExecutor())
+    try:
+        with pytest.raises(rtde.RTDEException):
+            pool.register(con, lambda con, columns: None)
+    finally:
+        pool.close()
+        con.disconnect()
+
+
+def test_run_ends_when_connection_lost(server):
+    con = start(server)
+    batches = []
+    pool = decode_pool.DecodePool(executor=SlowFirstExecutor())
+    try:
+        pool.register(con, lambda con, columns: batches.append(columns))
+        assert poll_until(pool, lambda: len(batches) > 0)
+        server.drop_connections()
+        pool.run(0.1)
+        assert pool.pending_count == 0
+    finally:
+        pool.close()
+        con.disconnect()
@@ -0,0 +1,58 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import numpy as np
+import pytest
+
+from rtde import fields
+
+NAMES = ["timestamp", "actual_q"]
+VALUES = {
+    "timestamp": np.arange(4, dtype="<f8"),
+    "actual_q": np.arange(24, dtype="<f8").reshape(4, 6),
+}
+
+
+def read(name, mask=None):
+    return fields.read_column(NAMES, name, VALUES.__getitem__, mask)
+
+
+def test_scalar_and_vector_columns():
+    assert np.array_equal(read("timestamp"), [0, 1, 2, 3])
+    assert np.array_equal(read("actual_q_2"), [2, 8, 14, 20])
+    mask = np.array([True, False, True, False])
+    assert np.array_equal(read("actual_q_5", mask), [5, 17])
+
+
+def test_columns_are_float():
+    values = {"runtime_state": np.array([1, 2], dtype=np.uint32)}
+    column = fields.read_column(["runtime_state"], "runtime_state", values.get)
+    assert column.dtype == float
+
+
+@pytest.mark.parametrize(
+    "name", ["actual_qd", "actual_q_6", "actual_q_9", "actual_q_x", "timestamp_0"]
+)
+def test_unknown_columns(name):
+    with pytest.raises(AttributeError):
+        read(name)
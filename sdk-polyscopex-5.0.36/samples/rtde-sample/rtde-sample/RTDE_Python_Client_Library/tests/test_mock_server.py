@@ -0,0 +1,277 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Smoke tests of the clients against rtde.mock_server"""
+
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from rtde import rtde
+from rtde import rtde_async
+from rtde.mock_server import MockRTDEServer
+
+OUTPUT_NAMES = ["timestamp", "actual_q", "runtime_state"]
+OUTPUT_TYPES = ["DOUBLE", "VECTOR6D", "UINT32"]
+INPUT_NAMES = ["input_double_register_0"]
+INPUT_TYPES = ["DOUBLE"]
+
+
+@pytest.fixture
+def server():
+    with MockRTDEServer(rate=500) as server:
+        yield server
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_sync_client(server):
+    con = rtde.RTDE("127.0.0.1", server.port)
+    con.connect()
+    try:
+        assert con.get_controller_version() == server.controller_version
+        assert con.send_output_setup(OUTPUT_NAMES, OUTPUT_TYPES, frequency=500)
+        setp = con.send_input_setup(INPUT_NAMES, INPUT_TYPES)
+        assert setp is not None
+        assert con.send_start()
+
+        timestamps = []
+        for _ in range(10):
+            state = con.receive()
+            assert len(state.actual_q) == 6
+            timestamps.append(state.timestamp)
+        assert timestamps == sorted(timestamps)
+
+        setp.input_double_register_0 = 1.5
+        assert con.send(setp)
+        assert wait_until(lambda: server.inputs.get(INPUT_NAMES[0]) == 1.5)
+
+        assert con.send_pause()
+        with pytest.raises(rtde.RTDEException):
+            con.receive()
+    finally:
+        con.disconnect()
+    assert not con.is_connected()
+
+
+def test_async_client(server):
+    async def session():
+        con = rtde_async.AsyncRTDE("127.0.0.1", server.port)
+        await con.connect()
+        try:
+            version = await con.get_controller_version()
+            assert version == server.controller_version
+            assert await con.send_output_setup(OUTPUT_NAMES, OUTPUT_TYPES, 500)
+            setp = await con.send_input_setup(INPUT_NAMES, INPUT_TYPES)
+            assert setp is not None
+            assert await con.send_start()
+
+            state = await con.receive()
+            assert len(state.actual_q) == 6
+            count = 0
+            async for state in con:
+                assert state.timestamp >= 0.0
+                count += 1
+                if count == 10:
+                    break
+
+            setp.input_double_register_0 = 2.5
+            assert con.send(setp)
+            assert await con.send_pause()
+        finally:
+            con.disconnect()
+        assert not con.is_connected()
+
+    asyncio.run(session())
+    assert wait_until(lambda: server.inputs.get(INPUT_NAMES[0]) == 2.5)
+
+
+def test_async_pause_during_receive():
+    async def session(port):
+        con = rtde_async.AsyncRTDE("127.0.0.1", port)
+        await con.connect()
+        try:
+            assert await con.send_output_setup(OUTPUT_NAMES, OUTPUT_TYPES, 1)
+            assert await con.send_start()
+            await con.receive()
+            # the next package is a second away, pause while waiting for it
+            pending = asyncio.ensure_future(con.receive())
+            await asyncio.sleep(0.1)
+            assert await con.send_pause()
+            with pytest.raises(rtde.RTDEException):
+                await pending
+            assert con.skipped_package_count == 0
+        finally:
+            con.disconnect()
+
+    with MockRTDEServer() as server:
+        asyncio.run(session(server.port))
+
+
+def test_reconnect_counts_missed_packages(server):
+    con = rtde.RTDE("127.0.0.1", server.port, auto_reconnect=True)
+    con.connect()
+    try:
+        assert con.send_output_setup(OUTPUT_NAMES, OUTPUT_TYPES, frequency=500)
+        assert con.send_start()
+        last = con.receive().timestamp
+        # the controller clock runs on by 2 s while the connection is down
+        server.time_offset = last + 2.0
+        server.drop_connections()
+        state = con.receive()
+        while state.timestamp < server.time_offset:
+            state = con.receive()
+        assert con.stats.reconnects == 1
+        assert con.stats.missed_packages == 999
+    finally:
+        con.disconnect()
+
+
+def test_reconnect_replays_recipes(server):
+    con = rtde.RTDE("127.0.0.1", server.port, auto_reconnect=True)
+    con.connect()
+    try:
+        assert con.send_output_setup(OUTPUT_NAMES, OUTPUT_TYPES, frequency=500)
+        watchdog = con.send_input_setup(["input_int_register_0"], ["INT32"])
+        setp = con.send_input_setup(INPUT_NAMES, INPUT_TYPES)
+        assert con.send_start()
+        con.receive()
+        server.drop_connections()
+        while con.stats.reconnects == 0:
+            con.receive()
+        state = con.receive()
+        assert len(state.actual_q) == 6
+        # the input objects of the lost session keep working
+        setp.input_double_register_0 = 4.5
+        watchdog.input_int_register_0 = 3
+        assert con.send_batch([setp, watchdog])
+        assert wait_until(lambda: server.inputs.get(INPUT_NAMES[0]) == 4.5)
+        assert wait_until(lambda: server.inputs.get("input_int_register_0") == 3)
+    finally:
+        con.disconnect()
+
+
+def test_timing_measures_arrival_not_consumer_pace(server):
+    con = rtde.RTDE("127.0.0.1", server.port)
+    con.connect()
+    try:
+        assert con.send_output_setup(OUTPUT_NAMES, OUTPUT_TYPES, frequency=500)
+        timing = con.enable_timing()
+        assert con.send_start()
+        # consume at half the output rate, the intervals must still follow
+        # the controller and not the consumer
+        for _ in range(150):
+            time.sleep(0.004)
+            con.receive_buffered()
+        assert timing.packages > 100
+        assert abs(timing.mean_interval - 0.002) < 0.0007
+    finally:
+        con.disconnect()
+
+
+def test_send_packs_every_field(server):
+    con = rtde.RTDE("127.0.0.1", server.port)
+    con.connect()
+    try:
+        setp = con.send_input_setup(INPUT_NAMES, INPUT_TYPES)
+        assert con.send_output_setup(OUTPUT_NAMES, OUTPUT_TYPES, frequency=500)
+        assert con.send_start()
+        setp.input_double_register_0 = 1.0
+        assert con.send(setp)
+        assert wait_until(lambda: server.inputs.get(INPUT_NAMES[0]) == 1.0)
+        # assigned without setattr, as the control loop example does
+        setp.__dict__[INPUT_NAMES[0]] = 2.0
+        assert con.send(setp)
+        assert wait_until(lambda: server.inputs.get(INPUT_NAMES[0]) == 2.0)
+    finally:
+        con.disconnect()
+
+
+def test_send_keepalive_packs_assigned_fields(server):
+    con = rtde.RTDE("127.0.0.1", server.port)
+    con.connect()
+    try:
+        setp = con.send_input_setup(INPUT_NAMES, INPUT_TYPES)
+        assert con.send_output_setup(OUTPUT_NAMES, OUTPUT_TYPES, frequency=500)
+        assert con.send_start()
+        setp.input_double_register_0 = 1.0
+        assert con.send(setp, keepalive=10.0)
+        assert wait_until(lambda: server.inputs.get(INPUT_NAMES[0]) == 1.0)
+        # unchanged, left unsent until the keepalive passes
+        assert con.send(setp, keepalive=10.0)
+        assert con.suppressed_send_count == 1
+        setp.input_double_register_0 = 3.0
+        assert con.send(setp, keepalive=10.0)
+        assert wait_until(lambda: server.inputs.get(INPUT_NAMES[0]) == 3.0)
+        assert con.suppressed_send_count == 1
+    finally:
+        con.disconnect()
+
+
+def test_receive_batch_arrivals_and_decode_times(server):
+    con = rtde.RTDE("127.0.0.1", server.port)
+    con.connect()
+    try:
+        assert con.send_output_setup(OUTPUT_NAMES, OUTPUT_TYPES, frequency=500)
+        assert con.send_start()
+        time.sleep(0.05)
+        batch = con.receive_batch()
+        assert len(batch) and con.batch_arrivals is None
+        timing = con.enable_timing()
+        time.sleep(0.05)
+        batch = con.receive_batch()
+        arrivals = con.batch_arrivals
+        assert len(arrivals) == len(batch) == timing.decoded_packages
+        assert np.all(np.diff(arrivals) >= 0)
+        # decoded one by one, the same as the batch decode
+        assert np.allclose(np.diff(batch["timestamp"]), 0.002)
+        assert batch["actual_q"].shape == (len(batch), 6)
+        # timed per package, not per batch
+        assert len(batch) > 1
+        assert timing.max_decode_time < timing.decode_time
+    finally:
+        con.disconnect()
+
+
+def accept_threads():
+    return [t for t in threading.enumerate() if "__accept" in t.name]
+
+
+def test_stop_without_clients():
+    before = len(accept_threads())
+    server = MockRTDEServer().start()
+    assert len(accept_threads()) == before + 1
+    started = time.monotonic()
+    server.stop()
+    assert time.monotonic() - started < 1.0
+    assert len(accept_threads()) == before
@@ -0,0 +1,53 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import pytest
+
+from rtde import packet_queue
+from rtde import rtde
+
+
+def test_default_max_packets():
+    queue = packet_queue.PacketQueue(packet_queue.DROP_OLDEST)
+    assert queue.max_packets == packet_queue.DEFAULT_MAX_PACKETS
+    with pytest.raises(ValueError):
+        packet_queue.PacketQueue(packet_queue.DROP_OLDEST, None)
+
+
+def test_set_buffer_policy_default():
+    con = rtde.RTDE("127.0.0.1")
+    con.set_buffer_policy(packet_queue.DROP_NEWEST)
+    assert con.queued_package_count == 0
+    con.set_buffer_policy(None)
+
+
+def test_spill_keeps_order_and_arrival(tmp_path):
+    queue = packet_queue.PacketQueue(packet_queue.SPILL_TO_DISK, 2, str(tmp_path))
+    results = [queue.put(bytes([i]), float(i) if i % 2 else None) for i in range(5)]
+    assert results == [packet_queue.QUEUED] * 2 + [packet_queue.SPILLED] * 3
+    assert len(queue) == 5
+    for i in range(5):
+        assert queue.get() == bytes([i])
+        assert queue.arrival == (float(i) if i % 2 else None)
+    assert queue.get() is None
+    queue.close()
@@ -0,0 +1,110 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import types
+
+import numpy as np
+import pytest
+
+from rtde import columnar
+from rtde import csv_binary_writer
+from rtde import program_runs
+
+NAMES = ["timestamp", "runtime_state", "output_int_register_0"]
+TYPES = ["DOUBLE", "UINT32", "INT32"]
+RUNS = [(100, 4100), (4300, 9300), (9350, 10350)]
+SAMPLES = 10360
+
+
+def make_samples():
+    # the controller restarted before the second run, so the timestamps
+    # of the later runs overlap those of the first
+    timestamps = np.arange(SAMPLES) * 0.002
+    timestamps[4200:] -= timestamps[4200]
+    state = np.ones(SAMPLES, dtype=int)
+    for start, end in RUNS:
+        state[start:end] = 2
+    return [
+        types.SimpleNamespace(
+            recipe_id=1,
+            timestamp=float(timestamps[i]),
+            runtime_state=int(state[i]),
+            output_int_register_0=i,
+        )
+        for i in range(SAMPLES)
+    ]
+
+
+def write_csv(filename, samples):
+    with open(filename, "w") as f:
+        f.write(" ".join(NAMES) + "\n")
+        for s in samples:
+            f.write(
+                "%r %d %d\n" % (s.timestamp, s.runtime_state, s.output_int_register_0)
+            )
+
+
+def write_binary(filename, samples):
+    with open(filename, "wb") as f:
+        writer = csv_binary_writer.CSVBinaryWriter(f, NAMES, TYPES)
+        writer.writeheader()
+        for s in samples:
+            writer.writerow(s)
+
+
+def write_columnar(filename, samples):
+    with open(filename, "wb") as f:
+        writer = columnar.ColumnarWriter(f, NAMES, TYPES, rows_per_group=1000)
+        writer.writeheader()
+        for s in samples:
+            writer.writerow(s)
+        writer.close()
+
+
+@pytest.mark.parametrize(
+    "name, write",
+    [
+        ("run.csv", write_csv),
+        ("run.bin", write_binary),
+        ("run" + columnar.EXTENSION, write_columnar),
+    ],
+)
+def test_cycles_across_restart(tmp_path, name, write):
+    filename = str(tmp_path / name)
+    write(filename, make_samples())
+    cycles = program_runs.ProgramCycles(filename)
+    assert [(run.start, run.end) for run in cycles.runs] == RUNS
+    assert all(run.duration > 0 for run in cycles.runs)
+    for run, cycle in zip(cycles.runs, cycles):
+        assert cycle.get_samples() == run.samples
+        expected = np.arange(run.start, run.end, dtype=float)
+        assert np.array_equal(cycle.output_int_register_0, expected)
+    # found once, then loaded from the sidecar
+    assert program_runs.load_program_runs(filename) is not None
+
+
+def test_restart_while_running_splits_run():
+    state = [1, 2, 2, 2, 2, 2, 1]
+    timestamps = [0.0, 0.1, 0.2, 0.0, 0.1, 0.2, 0.3]
+    runs = program_runs.find_program_runs(state, timestamps)
+    assert [(run.start, run.end) for run in runs] == [(1, 3), (3, 6)]
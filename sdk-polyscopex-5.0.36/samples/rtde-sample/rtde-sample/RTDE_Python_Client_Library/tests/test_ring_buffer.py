@@ -0,0 +1,73 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import socket
+
+from rtde import ring_buffer
+from rtde.rtde import Command, pack_packet
+
+
+def test_packets_across_receives():
+    buf = ring_buffer.RingBuffer()
+    a, b = socket.socketpair()
+    try:
+        packet = pack_packet(Command.RTDE_DATA_PACKAGE, b"\x01abcd")
+        a.sendall(packet + packet[:4])
+        buf.recv_into(b)
+        assert buf.next_packet() == (Command.RTDE_DATA_PACKAGE, b"\x01abcd")
+        assert buf.next_packet() is None
+        a.sendall(packet[4:])
+        buf.recv_into(b)
+        assert buf.next_packet() == (Command.RTDE_DATA_PACKAGE, b"\x01abcd")
+        assert len(buf) == 0
+    finally:
+        a.close()
+        b.close()
+
+
+def test_arrival_is_time_of_completing_receive():
+    buf = ring_buffer.RingBuffer()
+    buf.track_arrival()
+    a, b = socket.socketpair()
+    try:
+        packet = pack_packet(Command.RTDE_DATA_PACKAGE, b"\x01abcd")
+        a.sendall(packet * 2 + packet[:3])
+        buf.recv_into(b)
+        a.sendall(packet[3:] + packet)
+        buf.recv_into(b)
+        first, second = buf._stamps[0][1], buf._stamps[1][1]
+        assert first < second
+
+        # the first two packets arrived with the first receive even though
+        # they are consumed after the second one
+        count, _ = buf.next_run(Command.RTDE_DATA_PACKAGE, len(packet), 2)
+        assert count == 2
+        assert buf.arrivals == [first, first]
+        buf.next_packet()
+        assert buf.arrival == second
+        buf.next_packet()
+        assert buf.arrival == second
+        assert buf.next_packet() is None
+    finally:
+        a.close()
+        b.close()
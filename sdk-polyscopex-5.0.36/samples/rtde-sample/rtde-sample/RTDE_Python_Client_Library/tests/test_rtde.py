@@ -0,0 +1,112 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import time
+
+import numpy as np
+import pytest
+
+from rtde import rtde
+from rtde.mock_server import MockRTDEServer
+
+OUTPUT_NAMES = ["timestamp", "actual_q", "runtime_state"]
+OUTPUT_TYPES = ["DOUBLE", "VECTOR6D", "UINT32"]
+PERIOD = 0.002
+
+
+@pytest.fixture
+def server():
+    with MockRTDEServer(rate=500) as server:
+        yield server
+
+
+@pytest.fixture
+def con(server):
+    con = rtde.RTDE("127.0.0.1", server.port)
+    con.connect()
+    assert con.send_output_setup(OUTPUT_NAMES, OUTPUT_TYPES, frequency=500)
+    yield con
+    con.disconnect()
+
+
+def test_receive_batch(con):
+    with pytest.raises(rtde.RTDEException):
+        rtde.RTDE("127.0.0.1").receive_batch()
+    assert con.send_start()
+    time.sleep(0.05)
+    batch = con.receive_batch(max_packets=5)
+    assert batch.dtype.names == tuple(OUTPUT_NAMES)
+    assert batch["actual_q"].shape == (5, 6)
+    assert np.all(batch["runtime_state"] == 2)
+    # the rest stays buffered for the next call, no package is lost
+    rest = con.receive_batch()
+    times = np.concatenate((batch["timestamp"], rest["timestamp"]))
+    assert len(rest) > 5
+    assert np.allclose(np.diff(times), PERIOD)
+    assert con.stats.decoded_packages == len(times)
+
+
+def test_reader_thread(con):
+    assert con.send_start()
+    con.start_reader(history_size=100)
+    first = con.receive()
+    second = con.receive()
+    # receive waits for a package it has not returned yet
+    assert second.timestamp > first.timestamp
+    time.sleep(0.05)
+    assert con.get_latest().timestamp > second.timestamp
+    history = [package.timestamp for package in con.receive_history()]
+    assert len(history) >= 20
+    assert np.allclose(np.diff(history), PERIOD)
+    with pytest.raises(rtde.RTDEException):
+        con.receive_batch()
+    # control commands stop the reader first
+    assert con.send_pause()
+    con.receive_batch()
+
+
+def test_reader_reports_lost_connection(server, con):
+    assert con.send_start()
+    con.start_reader()
+    assert con.receive() is not None
+    server.drop_connections()
+    with pytest.raises(rtde.RTDEException):
+        for _ in range(100):
+            con.receive()
+
+
+def test_receive_decodes_only_newest(con):
+    assert con.send_start()
+    first = con.receive()
+    time.sleep(0.05)
+    decoded = con.stats.decoded_packages
+    skipped = con.skipped_package_count
+    latest = con.receive()
+    skipped = con.skipped_package_count - skipped
+    # the backlog was skipped without decoding it
+    assert skipped >= 10
+    assert con.stats.decoded_packages == decoded + 1
+    assert latest.timestamp == pytest.approx(first.timestamp + (skipped + 1) * PERIOD)
+    batch = con.receive_batch()
+    if len(batch):
+        assert batch["timestamp"][0] > latest.timestamp
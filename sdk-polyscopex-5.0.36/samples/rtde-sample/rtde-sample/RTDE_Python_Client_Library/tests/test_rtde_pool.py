@@ -0,0 +1,123 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import pytest
+
+from rtde import rtde
+from rtde import rtde_pool
+from rtde.mock_server import MockRTDEServer
+
+OUTPUT_NAMES = ["timestamp", "actual_q"]
+OUTPUT_TYPES = ["DOUBLE", "VECTOR6D"]
+
+
+@pytest.fixture
+def server():
+    with MockRTDEServer(rate=500) as server:
+        yield server
+
+
+def start(server, **kwargs):
+    con = rtde.RTDE("127.0.0.1", server.port, **kwargs)
+    con.connect()
+    assert con.send_output_setup(OUTPUT_NAMES, OUTPUT_TYPES, frequency=500)
+    assert con.send_start()
+    return con
+
+
+def poll_until(pool, condition, polls=100):
+    for _ in range(polls):
+        pool.poll(0.1)
+        if condition():
+            return True
+    return False
+
+
+def test_packages_in_order_per_connection(server):
+    cons = [start(server) for _ in range(3)]
+    pool = rtde_pool.RTDEPool()
+    try:
+        queues = [pool.register(con) for con in cons]
+        received = []
+        callback_con = start(server)
+        pool.register(callback_con, lambda con, package: received.append(package))
+        assert len(pool.connections) == 4
+        assert poll_until(
+            pool, lambda: all(len(q) >= 20 for q in queues) and len(received) >= 20
+        )
+        for packages in queues + [received]:
+            times = [package.timestamp for package in packages]
+            assert times == sorted(times)
+        pool.unregister(cons[0])
+        assert cons[0] not in pool.connections
+    finally:
+        pool.close()
+        for con in cons + [callback_con]:
+            con.disconnect()
+
+
+def test_bounded_queue_counts_drops(server):
+    con = start(server)
+    pool = rtde_pool.RTDEPool()
+    try:
+        queue = pool.register(con, queue_size=5)
+        assert poll_until(pool, lambda: pool.dropped_count(con) > 0)
+        assert len(queue) == 5
+    finally:
+        pool.close()
+        con.disconnect()
+
+
+def test_reconnected_connection_is_registered_again(server):
+    kept = start(server, auto_reconnect=True)
+    lost = start(server)
+    pool = rtde_pool.RTDEPool()
+    try:
+        queue = pool.register(kept)
+        pool.register(lost)
+        assert poll_until(pool, lambda: len(queue) > 0)
+        server.drop_connections()
+        assert poll_until(pool, lambda: kept.stats.reconnects == 1)
+        # the lost connection is dropped, the other one still delivers
+        assert poll_until(pool, lambda: pool.connections == [kept])
+        queue.clear()
+        assert poll_until(pool, lambda: len(queue) >= 20)
+    finally:
+        pool.close()
+        kept.disconnect()
+        lost.disconnect()
+
+
+def test_run_ends_without_connections(server):
+    con = start(server)
+    pool = rtde_pool.RTDEPool()
+    try:
+        queue = pool.register(con)
+        assert poll_until(pool, lambda: len(queue) > 0)
+        server.drop_connections()
+        # returns once the lost connection is unregistered
+        pool.run(0.1)
+        assert pool.connections == []
+    finally:
+        pool.close()
+        con.disconnect()
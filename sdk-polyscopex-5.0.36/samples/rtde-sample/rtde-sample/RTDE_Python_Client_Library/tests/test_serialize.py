@@ -0,0 +1,137 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import struct
+
+import pytest
+
+from rtde import serialize
+
+TYPES = [
+    "DOUBLE",
+    "VECTOR6D",
+    "VECTOR3D",
+    "INT32",
+    "UINT32",
+    "VECTOR6INT32",
+    "VECTOR6UINT32",
+    "UINT64",
+    "UINT8",
+    "BOOL",
+]
+NAMES = ["field_%d" % i for i in range(len(TYPES))]
+VALUES = [
+    1.5,
+    [0.5, -1.0, 2.0, 3.25, -4.5, 5.0],
+    [1.0, 2.0, 3.0],
+    -7,
+    7,
+    [-1, 2, -3, 4, -5, 6],
+    [1, 2, 3, 4, 5, 6],
+    2**40,
+    255,
+    True,
+]
+
+
+def plain(value):
+    return list(value) if isinstance(value, (list, tuple)) else value
+
+
+def make_config(names=NAMES, recipe_id=3):
+    config = serialize.DataConfig.unpack_recipe(
+        bytes(bytearray([recipe_id])) + ",".join(TYPES).encode("utf-8")
+    )
+    config.names = list(names)
+    return config
+
+
+def make_payload(config):
+    flat = [config.id]
+    for value in VALUES:
+        flat.extend(value if isinstance(value, list) else [value])
+    return struct.pack(config.fmt, *flat)
+
+
+def test_generated_decoder_matches_data_object():
+    config = make_config()
+    payload = make_payload(config)
+    record = config.unpack(payload)
+    expected = serialize.DataObject.unpack(
+        struct.unpack(config.fmt, payload), NAMES, TYPES
+    )
+    assert isinstance(record, serialize.DataRecord)
+    assert record.recipe_id == expected.recipe_id == 3
+    for name, value in zip(NAMES, VALUES):
+        assert plain(getattr(record, name)) == plain(getattr(expected, name))
+        assert plain(getattr(record, name)) == value
+    assert record.host_time is None
+
+
+def test_decoder_falls_back_for_invalid_identifiers():
+    names = list(NAMES)
+    names[0] = "not an identifier"
+    config = make_config(names)
+    data = config.unpack(make_payload(config))
+    assert isinstance(data, serialize.DataObject)
+    assert getattr(data, "not an identifier") == 1.5
+
+
+def make_input(config):
+    state = serialize.InputDataObject.create_empty(NAMES, config.id)
+    for name, value in zip(NAMES, VALUES):
+        setattr(state, name, value)
+    return state
+
+
+def test_pack_into_preallocated_buffer():
+    config = make_config()
+    state = make_input(config)
+    buf = bytearray(3 + struct.calcsize(config.fmt))
+    config.pack_into(buf, 3, state)
+    assert bytes(buf[3:]) == config.pack(state) == make_payload(config)
+    assert buf[:3] == b"\0\0\0"
+
+
+def test_pack_uninitialized_field():
+    config = make_config()
+    state = serialize.InputDataObject.create_empty(NAMES, config.id)
+    with pytest.raises(ValueError, match="field_0"):
+        config.pack(state)
+
+
+def test_pack_fields_into_keeps_other_fields():
+    config = make_config()
+    state = make_input(config)
+    buf = bytearray(config.pack(state))
+    assert state.dirty_fields == set(NAMES)
+    state.dirty_fields.clear()
+    state.field_0 = -2.5
+    state.field_1 = [0.0] * 6
+    config.pack_fields_into(buf, 0, state, state.dirty_fields)
+    values = struct.unpack(config.fmt, bytes(buf))
+    assert values[1:8] == (-2.5,) + (0.0,) * 6
+    assert (
+        bytes(buf[struct.calcsize(">Bd6d") :])
+        == make_payload(config)[struct.calcsize(">Bd6d") :]
+    )
@@ -0,0 +1,123 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from rtde import rtde
+from rtde import shared_ring
+from rtde.mock_server import MockRTDEServer
+
+NAMES = ["timestamp", "actual_q"]
+TYPES = ["DOUBLE", "VECTOR6D"]
+
+
+def make_batch(start, count):
+    batch = np.zeros(count, dtype=[("timestamp", "f8"), ("actual_q", "f8", (6,))])
+    batch["timestamp"] = np.arange(start, start + count)
+    return batch
+
+
+def is_mapped(name):
+    with open("/proc/self/maps") as f:
+        return any(name.lstrip("/") in line for line in f)
+
+
+@pytest.fixture
+def writer():
+    writer = shared_ring.SharedRingWriter(NAMES, TYPES, 500.0, capacity=8)
+    yield writer
+    writer.close()
+
+
+def test_read_and_missed(writer):
+    reader = shared_ring.SharedRingReader(writer.name)
+    writer.write(make_batch(0, 4))
+    assert list(reader.read()["timestamp"]) == [0, 1, 2, 3]
+    writer.write(make_batch(4, 12))
+    records = reader.read()
+    assert reader.missed == 4
+    assert list(records["timestamp"]) == [8, 9, 10, 11, 12, 13, 14, 15]
+    assert reader.latest()["timestamp"] == 15
+    reader.close()
+
+
+def test_views_stay_valid_after_close(writer):
+    reader = shared_ring.SharedRingReader(writer.name, oldest=True)
+    writer.write(make_batch(0, 5))
+    records = reader.read()
+    latest = reader.latest()
+    reader.close()
+    writer.close()
+    assert list(records["timestamp"]) == [0, 1, 2, 3, 4]
+    assert latest["timestamp"] == 4
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="uses /proc")
+def test_close_unmaps_after_last_view(writer):
+    reader = shared_ring.SharedRingReader(writer.name)
+    writer.write(make_batch(0, 3))
+    records = reader.read()
+    name = writer.name
+    reader.close()
+    writer.close()
+    assert is_mapped(name)
+    del records
+    assert not is_mapped(name)
+
+
+def test_publisher_closes_ring_when_connection_fails():
+    with MockRTDEServer(rate=500) as server:
+        con = rtde.RTDE("127.0.0.1", server.port)
+        con.connect()
+        publisher = shared_ring.SharedMemoryPublisher(con, NAMES, TYPES, 500)
+        reader = shared_ring.SharedRingReader(publisher.name)
+        errors = []
+
+        def run():
+            try:
+                publisher.run(0.1)
+            except rtde.RTDEException as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        try:
+            deadline = time.monotonic() + 2.0
+            while reader.available() == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            server.drop_connections()
+            thread.join(5.0)
+            assert not thread.is_alive()
+            assert errors
+            assert reader.publisher_closed
+        finally:
+            publisher.stop()
+            thread.join()
+            reader.close()
+            publisher.close()
+            con.disconnect()
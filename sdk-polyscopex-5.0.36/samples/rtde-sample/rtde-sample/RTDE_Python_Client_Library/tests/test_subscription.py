@@ -0,0 +1,73 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import pytest
+
+from rtde import rtde
+from rtde import subscription
+from rtde.mock_server import MockRTDEServer
+
+
+@pytest.fixture
+def con():
+    with MockRTDEServer(rate=500) as server:
+        con = rtde.RTDE("127.0.0.1", server.port)
+        con.connect()
+        yield con
+        con.disconnect()
+
+
+def poll_until(manager, condition, polls=100):
+    for _ in range(polls):
+        manager.poll(0.1)
+        if condition():
+            return True
+    return False
+
+
+def test_projection_and_decimation(con):
+    manager = subscription.SubscriptionManager(con)
+    fast = manager.subscribe(["timestamp", "actual_q"], 500)
+    slow = manager.subscribe(["runtime_state"], 100)
+    manager.start()
+    assert manager.frequency == 500
+    assert slow.decimation == 5
+    assert poll_until(manager, lambda: len(fast.queue) >= 50)
+    package = fast.queue[0]
+    assert len(package.actual_q) == 6
+    assert not hasattr(package, "runtime_state")
+    assert abs(len(fast.queue) / float(len(slow.queue)) - 5) < 1
+
+
+def test_subscribe_after_start(con):
+    manager = subscription.SubscriptionManager(con)
+    manager.subscribe(["timestamp", "actual_q"])
+    manager.start()
+    received = []
+    late = manager.subscribe(["actual_q"], callback=received.append)
+    # not in the shared recipe, delivered only after the next start()
+    pending = manager.subscribe(["runtime_state"])
+    assert poll_until(manager, lambda: len(received) >= 5)
+    assert len(pending.queue) == 0
+    manager.start()
+    assert poll_until(manager, lambda: len(pending.queue) >= 5)
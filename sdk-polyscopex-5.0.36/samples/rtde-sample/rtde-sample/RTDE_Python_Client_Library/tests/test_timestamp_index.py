@@ -0,0 +1,108 @@
+# Copyright (c) 2016-2022, Universal Robots A/S,
+# All rights reserved.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#    * Redistributions of source code must retain the above copyright
+#      notice, this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright
+#      notice, this list of conditions and the following disclaimer in the
+#      documentation and/or other materials provided with the distribution.
+#    * Neither the name of the Universal Robots A/S nor the names of its
+#      contributors may be used to endorse or promote products derived
+#      from this software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL UNIVERSAL ROBOTS A/S BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import types
+
+import numpy as np
+
+from rtde import binary_reader
+from rtde import columnar
+from rtde import csv_binary_writer
+from rtde import csv_reader
+from rtde import timestamp_index
+
+# two runs of 3 s at 500 Hz, the controller restarted in between
+TIMES = np.concatenate([np.arange(1500) * 0.002] * 2)
+START, END = 2.5, 2.6
+EXPECTED = 2 * int(np.sum((TIMES[:1500] >= START) & (TIMES[:1500] <= END)))
+
+
+def test_monotonic_index():
+    index = timestamp_index.TimestampIndex([0.0, 2.0], [10, 20], "byte")
+    assert index.span(1.0) == (10, 20)
+    index = timestamp_index.TimestampIndex([0.0, 2.0, 1.0], [10, 20, 30], "byte")
+    assert not index.monotonic
+    assert index.span(1.5) == (10, None)
+
+
+def test_csv_window_across_restart(tmp_path):
+    filename = str(tmp_path / "restart.csv")
+    with open(filename, "w") as f:
+        f.write("timestamp runtime_state\n")
+        for t in TIMES:
+            f.write("%r 2\n" % float(t))
+    index = timestamp_index.get_csv_index(filename)
+    assert not index.monotonic
+    assert not timestamp_index.load_index(filename).monotonic
+    with open(filename) as f:
+        reader = csv_reader.CSVReader(f, chunk_size=100, start=START, end=END)
+    assert reader.get_samples() == EXPECTED
+    assert np.all((reader.timestamp >= START) & (reader.timestamp <= END))
+
+
+def test_binary_window_across_restart():
+    records = np.zeros(len(TIMES), dtype=[("timestamp", "<f8")])
+    records["timestamp"] = TIMES
+    selected = records[timestamp_index.find_records(records, START, END)]
+    assert len(selected) == EXPECTED
+    sorted_records = records[:1500]
+    selected = timestamp_index.find_records(sorted_records, START, END)
+    assert isinstance(selected, slice)
+    assert len(sorted_records[selected]) == EXPECTED // 2
+
+
+def test_binary_file_window_across_restart(tmp_path, monkeypatch):
+    filename = str(tmp_path / "restart.bin")
+    with open(filename, "wb") as f:
+        writer = csv_binary_writer.CSVBinaryWriter(f, ["timestamp"], ["DOUBLE"])
+        writer.writeheader()
+        for t in TIMES:
+            writer.writerow(types.SimpleNamespace(recipe_id=1, timestamp=t))
+    reader = binary_reader.BinaryReader(filename, start=START, end=END)
+    assert reader.get_samples() == EXPECTED
+    index = timestamp_index.load_index(filename)
+    assert index.unit == "record" and not index.monotonic
+
+    # later windowed reads use the saved index
+    def build(records, stride=timestamp_index.DEFAULT_STRIDE):
+        raise AssertionError("index rebuilt")
+
+    monkeypatch.setattr(timestamp_index, "build_binary_index", build)
+    reader = binary_reader.BinaryReader(filename, start=START, end=END)
+    assert reader.get_samples() == EXPECTED
+    assert np.all((reader.timestamp >= START) & (reader.timestamp <= END))
+
+
+def test_columnar_window_across_restart(tmp_path):
+    filename = str(tmp_path / "restart.rtdc")
+    with open(filename, "wb") as f:
+        writer = columnar.ColumnarWriter(
+            f, ["timestamp"], ["DOUBLE"], rows_per_group=100
+        )
+        writer.writeheader()
+        for t in TIMES:
+            writer.writerow(types.SimpleNamespace(timestamp=t))
+        writer.close()
+    reader = columnar.ColumnarReader(filename, start=START, end=END)
+    assert reader.get_samples() == EXPECTED
+    assert len(reader.timestamp) == EXPECTED